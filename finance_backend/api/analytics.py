@@ -0,0 +1,210 @@
+# api/analytics.py
+"""
+Watchlist analytics over daily closes.
+
+For a set of symbols, daily closes for the window (a yfinance-style period,
+e.g. "1y") are fetched together with the benchmark's in one batched
+history call (through the local history store, so only bars it lacks
+are downloaded), aligned on bar date, and reduced column-wise in NumPy:
+
+- return        total return over the window (last / first close - 1)
+- volatility    annualized standard deviation of daily returns
+- max_drawdown  deepest fall from a running peak (negative fraction)
+- beta          cov(symbol, benchmark) / var(benchmark) of daily returns,
+                over the days both have a bar
+- correlation   pairwise correlation matrix of daily returns
+
+Results are cached in the shared quote store under a key of (symbol set,
+window, benchmark, session date). The session date is the date of the
+last complete-or-forming bar, so the key changes when a new bar appears
+and repeat views in between cost nothing. While the market is open that
+bar is still moving, and cached results older than
+ANALYTICS_INTRADAY_MAX_AGE are recomputed.
+"""
+from datetime import timedelta
+import hashlib
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from . import history_store, market_hours
+from .quote_cache import QuoteCache
+from .quote_store import shared_store
+from .singleflight import upstream_flight
+
+TRADING_DAYS = 252
+WINDOWS = ("1mo", "3mo", "6mo", "1y", "2y", "5y")
+DEFAULT_WINDOW = getattr(settings, "ANALYTICS_DEFAULT_WINDOW", "1y")
+BENCHMARK = getattr(settings, "ANALYTICS_BENCHMARK", "SPY")
+INTRADAY_MAX_AGE = getattr(settings, "ANALYTICS_INTRADAY_MAX_AGE", 300)
+STATS = ("return", "volatility", "max_drawdown", "beta", "bars")
+
+# Entries are also keyed on the session date, so the TTL only bounds how
+# long a finished session's result is kept
+_results = QuoteCache(
+    ttl=getattr(settings, "ANALYTICS_CACHE_TTL", 24 * 3600),
+    max_size=512,
+    store=shared_store,
+    namespace="analytics",
+)
+
+
+def cache_key(symbols, window, benchmark, day):
+    digest = hashlib.blake2b(",".join(sorted(set(symbols))).encode(), digest_size=12).hexdigest()
+    return f"{window}:{benchmark}:{day.isoformat()}:{digest}"
+
+
+def load_closes(symbols, window):
+    """
+    Daily closes for symbols over window from one history call: DataFrame
+    indexed by bar date, one column per symbol (all NaN if it had no data).
+    """
+    data = history_store.history(list(symbols), period=window, interval="1d")
+    if data is None or data.empty:
+        return pd.DataFrame(columns=list(symbols), dtype=float)
+    closes = data["Close"]
+    if isinstance(closes, pd.Series):   # single symbol without a column level
+        closes = closes.to_frame(symbols[0])
+    closes = closes.reindex(columns=list(symbols)).astype(float)
+    # One row per bar date, dropping dates none of the symbols traded
+    closes.index = pd.DatetimeIndex(closes.index).tz_localize(None).normalize()
+    closes = closes[~closes.index.duplicated(keep="last")].sort_index()
+    return closes.dropna(how="all")
+
+
+def compute(closes, benchmark):
+    """
+    Statistics over a close-price frame (rows = bars, columns = symbols,
+    benchmark among them), every one computed over all columns at once.
+    Returns ({column: {stat: value}}, correlation DataFrame).
+    """
+    prices = closes.to_numpy(dtype=float)
+    # Gaps carry the last close, so a return spans the days since it
+    filled = closes.ffill().to_numpy(dtype=float)
+    nothing = np.full(prices.shape[1], np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = prices[1:] / filled[:-1] - 1
+        valid = ~np.isnan(returns)
+        bars = valid.sum(axis=0)
+        r = np.where(valid, returns, 0.0)
+
+        if len(prices):
+            total = filled[-1] / closes.bfill().to_numpy(dtype=float)[0] - 1
+            drawdown = np.min(np.where(np.isnan(filled), 0.0, filled / np.fmax.accumulate(filled, axis=0) - 1), axis=0)
+            drawdown[np.isnan(filled[-1])] = np.nan
+        else:
+            total = drawdown = nothing
+
+        # Sample standard deviation of daily returns, annualized
+        mean = r.sum(axis=0) / bars
+        variance = (np.where(valid, r - mean, 0.0) ** 2).sum(axis=0) / (bars - 1)
+        volatility = np.where(bars > 1, np.sqrt(variance * TRADING_DAYS), np.nan)
+
+        # Beta over the days both the symbol and the benchmark have a return
+        bench = returns[:, closes.columns.get_loc(benchmark)][:, None]
+        both = valid & ~np.isnan(bench)
+        n = both.sum(axis=0)
+        x = np.where(both, returns, 0.0)
+        y = np.where(both, bench, 0.0)
+        dx = np.where(both, x - x.sum(axis=0) / n, 0.0)
+        dy = np.where(both, y - y.sum(axis=0) / n, 0.0)
+        beta = np.where(n > 1, (dx * dy).sum(axis=0) / (dy * dy).sum(axis=0), np.nan)
+
+    stats = {
+        column: dict(zip(STATS, values))
+        for column, values in zip(closes.columns, zip(
+            _finite(total), _finite(volatility), _finite(drawdown), _finite(beta), bars.tolist()))
+    }
+    correlation = pd.DataFrame(_correlation(r, valid, mean), index=closes.columns, columns=closes.columns)
+    return stats, correlation
+
+
+def _correlation(r, valid, mean):
+    """
+    Pairwise-complete Pearson correlation of the columns of r (zeros where
+    not valid), like DataFrame.corr but as a few matrix products: every
+    pairwise count and sum over the rows both columns have is a product
+    with the validity mask.
+    """
+    mask = valid.astype(float)
+    x = np.where(valid, r - np.nan_to_num(mean), 0.0)   # centred for precision
+    n = mask.T @ mask
+    sx = x.T @ mask             # sx[i, j]: sum of column i over rows i and j share
+    sxx = (x * x).T @ mask
+    sxy = x.T @ x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = (n * sxy - sx * sx.T) / np.sqrt((n * sxx - sx ** 2) * (n * sxx.T - sx.T ** 2))
+    corr[n < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _finite(values):
+    # Python floats, None for NaN / infinity (cached as JSON)
+    out = values.astype(object)
+    out[~np.isfinite(values)] = None
+    return out.tolist()
+
+
+def _analyze(symbols, window, benchmark, day):
+    columns = list(dict.fromkeys([*symbols, benchmark]))
+    closes = load_closes(columns, window)
+    stats, correlation = compute(closes, benchmark)
+    correlation = correlation.loc[symbols, symbols]
+    return {
+        "window": window,
+        "benchmark": benchmark,
+        "session": day.isoformat(),
+        "as_of": closes.index[-1].date().isoformat() if len(closes) else None,
+        "symbols": {symbol: stats[symbol] for symbol in symbols},
+        "benchmark_stats": stats[benchmark],
+        "missing": [symbol for symbol in symbols if stats[symbol]["bars"] == 0],
+        "correlation": {
+            "symbols": list(correlation.columns),
+            "matrix": [_finite(row) for row in correlation.to_numpy(dtype=float)],
+        },
+    }
+
+
+def analyze(symbols, window=None, benchmark=None, now=None):
+    """
+    Analytics for symbols (see the module docstring), cached. Returns
+    (result, age in seconds or None if just computed). Raises on upstream
+    failure.
+    """
+    window = window or DEFAULT_WINDOW
+    benchmark = (benchmark or BENCHMARK).upper()
+    symbols = sorted(set(symbols))
+    day = market_hours.session_date(now)
+    key = cache_key(symbols, window, benchmark, day)
+
+    max_age = INTRADAY_MAX_AGE if market_hours.market_is_open(now) else None
+    cached = _results.get_many([key], max_age).get(key)
+    if cached is not None:
+        return cached, _results.get_stale(key)[1]
+
+    # Identical requests (e.g. a watchlist open in several tabs) compute once
+    result = upstream_flight.do(("analytics", key), _analyze, symbols, window, benchmark, day)
+    _results.set(key, result)
+    return result, None
+
+
+def stale_result(symbols, window=None, benchmark=None, max_age=None):
+    """
+    (result, age) of the last analytics computed for this symbol set and
+    window on any session, or (None, None). For when the upstream fails.
+    """
+    window = window or DEFAULT_WINDOW
+    benchmark = (benchmark or BENCHMARK).upper()
+    symbols = sorted(set(symbols))
+    day = market_hours.session_date()
+    for _ in range(7):   # the last few sessions, newest first
+        result, age = _results.get_stale(cache_key(symbols, window, benchmark, day), max_age)
+        if result is not None:
+            return result, age
+        day -= timedelta(days=1)
+    return None, None
+
+
+def stats():
+    return _results.stats()
@@ -1,6 +1,29 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        _check_async_client()
+
+
+def _check_async_client():
+    """
+    httpx is optional, but without it the async views call Yahoo from a
+    thread per request; say so at startup rather than under load.
+    """
+    if not getattr(settings, "API_ASYNC_VIEWS", False):
+        return
+    if getattr(settings, "MARKET_DATA_PROVIDER", "yahoo") not in ("yahoo", "record"):
+        return
+    from .providers import yahoo
+    if yahoo.httpx is None:
+        logger.warning("API_ASYNC_VIEWS is on but httpx is not installed; "
+                       "async upstream calls will fall back to threads")
@@ -0,0 +1,128 @@
+# api/circuit_breaker.py
+"""
+Circuit breaker for the market-data provider.
+
+closed     calls go through; consecutive failures are counted
+open       after `failure_threshold` consecutive failures every call fails
+           immediately with CircuitOpenError for `reset_timeout` seconds
+half-open  once the timeout has passed a single probe call is let through;
+           success closes the circuit, failure opens it for another timeout
+
+Failing fast keeps worker threads from piling up behind a rate-limited or
+hung upstream; callers serve stale cached values instead (see QuoteCache.get_stale).
+"""
+from threading import Lock
+import time
+
+from django.conf import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling upstream while the circuit is open.
+    """
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = Lock()
+        self.rejected = 0   # calls failed fast while open
+        self.opened = 0     # times the circuit has opened
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError unless a call may go upstream now.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            waited = time.monotonic() - self._opened_at
+            if self.state == OPEN and waited >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(0.0, self.reset_timeout - waited))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self.state = CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release_probe(self):
+        """
+        Give back a half-open probe slot without judging the upstream.
+        """
+        with self._lock:
+            self._probing = False
+
+    def call(self, fn, *args, **kwargs):
+        self.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Interrupted, not an upstream failure
+            self.release_probe()
+            raise
+        self.record_success()
+        return result
+
+    async def acall(self, fn, *args, **kwargs):
+        self.before_call()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (e.g. the client went away), not an upstream failure
+            self.release_probe()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+upstream_breaker = CircuitBreaker(
+    "market-data",
+    failure_threshold=getattr(settings, "UPSTREAM_BREAKER_FAILURES", 5),
+    reset_timeout=getattr(settings, "UPSTREAM_BREAKER_RESET_TIMEOUT", 30.0),
+)
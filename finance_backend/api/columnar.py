@@ -0,0 +1,184 @@
+# api/columnar.py
+"""
+Compact binary columnar format for the company universe.
+
+Layout (little-endian):
+
+    8 bytes   magic  b"FDCOLS01"
+    8 bytes   uint64 length of the JSON header
+    N bytes   JSON header: row count + per-column block offsets
+    ...       data blocks, each aligned to 8 bytes
+
+Column kinds:
+- "string": uint32 offsets (rows + 1) into a UTF-8 string heap
+- "dict":   uint16 codes (one per row) into a list of distinct values kept in
+            the header (used for low-cardinality columns like sector/exchange)
+
+Readers memory-map the file and wrap the blocks with numpy without copying,
+so every worker process mapping the same file shares its pages through the
+OS page cache. Writers always replace the file atomically; a process that
+still maps the old file keeps reading the old inode safely.
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b"FDCOLS01"
+_ALIGN = 8
+
+
+class StringColumn:
+    """
+    Sequence of strings stored as offsets into a UTF-8 heap.
+    """
+
+    def __init__(self, offsets, heap):
+        self.offsets = offsets
+        self.heap = heap
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = [str(v).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, memoryview(b"".join(encoded)))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.heap[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class DictColumn:
+    """
+    Dictionary-encoded column: small integer codes into a list of values.
+    """
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+
+    @classmethod
+    def from_values(cls, values):
+        values = [str(v) for v in values]
+        distinct = sorted(set(values))
+        if len(distinct) > np.iinfo(np.uint16).max:
+            raise ValueError("too many distinct values for a dictionary column")
+        lookup = {v: code for code, v in enumerate(distinct)}
+        codes = np.fromiter((lookup[v] for v in values), dtype="<u2", count=len(values))
+        return cls(codes, distinct)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+    def __iter__(self):
+        for code in self.codes:
+            yield self.values[code]
+
+
+def _pad(n):
+    return (-n) % _ALIGN
+
+
+def write_columnar(path, columns, dict_columns=()):
+    """
+    Write columns ({name: list of str}, all the same length) to path.
+    Columns named in dict_columns are dictionary-encoded. The file is written
+    to a temporary file and moved into place atomically.
+    """
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("all columns must have the same length")
+    rows = lengths.pop() if lengths else 0
+
+    blocks = []
+    header = {"rows": rows, "columns": {}}
+    for name, values in columns.items():
+        if name in dict_columns:
+            col = DictColumn.from_values(values)
+            header["columns"][name] = {"kind": "dict", "values": col.values, "codes": len(blocks)}
+            blocks.append(col.codes.tobytes())
+        else:
+            col = StringColumn.from_values(values)
+            header["columns"][name] = {"kind": "string", "offsets": len(blocks), "heap": len(blocks) + 1}
+            blocks.append(col.offsets.tobytes())
+            blocks.append(bytes(col.heap))
+
+    # Block offsets depend on the header size and vice versa, so repeat until
+    # the encoded header length stops changing.
+    header["blocks"] = [[0, len(b)] for b in blocks]
+    header_bytes = b""
+    while True:
+        pos = len(MAGIC) + 8 + len(header_bytes)
+        for i, block in enumerate(blocks):
+            header["blocks"][i] = [pos, len(block)]
+            pos += len(block) + _pad(len(block))
+        encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        encoded += b" " * _pad(len(encoded))
+        if len(encoded) == len(header_bytes):
+            header_bytes = encoded
+            break
+        header_bytes = encoded
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".columnar-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header_bytes)))
+            f.write(header_bytes)
+            for block in blocks:
+                f.write(block)
+                f.write(b"\0" * _pad(len(block)))
+        # Readable by every worker, whichever user runs them
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_columnar(path):
+    """
+    Memory-map path and return {name: StringColumn | DictColumn}.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            raise ValueError(f"{path} is empty")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    buf = memoryview(mm)
+    if bytes(buf[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a columnar universe file")
+    (header_len,) = struct.unpack_from("<Q", buf, len(MAGIC))
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(buf[start:start + header_len]))
+    rows = header["rows"]
+
+    def block(i):
+        offset, length = header["blocks"][i]
+        return buf[offset:offset + length]
+
+    columns = {}
+    for name, spec in header["columns"].items():
+        if spec["kind"] == "dict":
+            codes = np.frombuffer(block(spec["codes"]), dtype="<u2", count=rows)
+            columns[name] = DictColumn(codes, spec["values"])
+        else:
+            offsets = np.frombuffer(block(spec["offsets"]), dtype="<u4", count=rows + 1)
+            columns[name] = StringColumn(offsets, block(spec["heap"]))
+    return columns
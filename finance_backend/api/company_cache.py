@@ -0,0 +1,235 @@
+# api/company_cache.py
+"""
+Two-tier stale-while-revalidate cache behind company/<symbol>/.
+
+The provider's info() call is a heavy payload, but most of it changes
+rarely. The cache splits it into two tiers:
+
+profile  long name, exchange, sector, industry, summary, website and country.
+         Stored in the CompanyProfile table, so it is shared by all workers
+         and survives restarts. Fresh for COMPANY_PROFILE_TTL.
+price    price, change and change percent, from the price engine (one cheap
+         history call that bypasses the engine's own quote cache). Fresh
+         for COMPANY_PRICE_TTL, in process and in the shared quote store.
+
+Only a symbol's first view waits for info(). After that an expired entry
+of either tier is returned immediately, and a background thread refreshes
+it for the next caller. Refreshes are deduplicated per symbol and tier. A
+price served past COMPANY_PRICE_TTL is returned with its age, so callers
+can flag it as stale; one older than UPSTREAM_STALE_MAX_AGE is refetched.
+
+An info() without a name or price (an unknown symbol) is stored in neither
+tier; it goes through the quote cache's short negative TTL instead.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from . import price_engine
+from .models import CompanyProfile
+from .providers import get_provider
+from .quote_cache import QuoteCache, quote_cache
+from .quote_store import shared_store
+from .serializers import STALE_MAX_AGE
+from .singleflight import async_upstream_flight, upstream_flight
+
+PROFILE_TTL = getattr(settings, "COMPANY_PROFILE_TTL", 7 * 24 * 3600)
+PRICE_TTL = getattr(settings, "COMPANY_PRICE_TTL", 15)
+
+# info() key -> CompanyProfile field
+PROFILE_FIELDS = {
+    "longName": "long_name",
+    "exchangeName": "exchange_name",
+    "sector": "sector",
+    "industry": "industry",
+    "longBusinessSummary": "long_business_summary",
+    "website": "website",
+    "country": "country",
+}
+PRICE_FIELDS = {
+    "regularMarketPrice": "current_price",
+    "regularMarketChange": "change",
+    "regularMarketChangePercent": "change_percent",
+}
+
+# Expired prices stay readable through get_stale(); the TTL here only bounds
+# how long an entry may be served while its refresh is pending
+_prices = QuoteCache(
+    ttl=PRICE_TTL, max_size=getattr(settings, "QUOTE_CACHE_MAX_SIZE", 2048),
+    store=shared_store, namespace="company_price",
+)
+_refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="company-refresh")
+_refreshing = set()
+_lock = Lock()
+_stats = {"fresh": 0, "stale": 0, "miss": 0, "refreshes": 0, "refresh_failures": 0}
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+def _load_profile(symbol):
+    """
+    Return (profile dict, expired) for symbol, or (None, None) if it has
+    never been fetched.
+    """
+    row = CompanyProfile.objects.filter(symbol=symbol).first()
+    if row is None:
+        return None, None
+    profile = {key: getattr(row, field) or None for key, field in PROFILE_FIELDS.items()}
+    return profile, timezone.now() - row.fetched_at > timedelta(seconds=PROFILE_TTL)
+
+
+def _store_profile(symbol, info):
+    defaults = {field: info.get(key) or "" for key, field in PROFILE_FIELDS.items()}
+    defaults["fetched_at"] = timezone.now()
+    CompanyProfile.objects.update_or_create(symbol=symbol, defaults=defaults)
+
+
+def _known(info):
+    return bool(info) and (bool(info.get("longName")) or info.get("regularMarketPrice") is not None)
+
+
+def _fetch_info(symbol):
+    # Concurrent clicks on the same company share one upstream call; an
+    # unknown symbol comes back as {} so the quote cache doesn't keep it
+    info = upstream_flight.do(("details", symbol), get_provider().info, symbol)
+    return info if _known(info) else {}
+
+
+async def _afetch_info(symbol):
+    info = await async_upstream_flight.do(("details", symbol), get_provider().ainfo, symbol)
+    return info if _known(info) else {}
+
+
+def _store(symbol, info):
+    """
+    Split a full info() payload into both tiers. The quote cache already
+    has the whole payload, from get_or_fetch.
+    """
+    if not _known(info):
+        return
+    _store_profile(symbol, info)
+    if info.get("regularMarketPrice") is not None:
+        _prices.set(symbol, {key: info.get(key) for key in PRICE_FIELDS})
+
+
+def _store_price(symbol, result):
+    if result["status"] == price_engine.STATUS_OK:
+        _prices.set(symbol, {key: result[field] for key, field in PRICE_FIELDS.items()})
+
+
+def _refresh_profile(symbol):
+    info = _fetch_info(symbol)
+    if info:
+        _store_profile(symbol, info)
+
+
+def _refresh_price(symbol):
+    # refresh=True: the engine's own cache lives for QUOTE_CACHE_TTL, longer
+    # than this tier's TTL, and would hand back the price being replaced
+    _store_price(symbol, price_engine.fetch_prices([symbol], refresh=True)[symbol])
+
+
+def _run_refresh(key, fn, symbol):
+    try:
+        fn(symbol)
+        _count("refreshes")
+    except Exception:
+        # Keep serving the old entry; the next request after this retries
+        _count("refresh_failures")
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+        # Connections are per thread; don't leave this one open between refreshes
+        connections.close_all()
+
+
+def _schedule(tier, fn, symbol):
+    key = (tier, symbol)
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    _refresher.submit(_run_refresh, key, fn, symbol)
+
+
+def _price_from_cache(symbol):
+    """
+    Return (cached price fields, age) for symbol, scheduling a refresh if
+    they have expired; the age is None while they are fresh. (None, None)
+    if the symbol has no cached price younger than STALE_MAX_AGE.
+    """
+    price, age = _prices.get_stale(symbol, STALE_MAX_AGE)
+    if price is None or age < PRICE_TTL:
+        return price, None
+    _schedule("price", _refresh_price, symbol)
+    return price, round(age, 1)
+
+
+def _merge(symbol, profile, price):
+    info = dict(profile, symbol=symbol)
+    info.update(price or dict.fromkeys(PRICE_FIELDS))
+    return info
+
+
+def get_company_info(symbol):
+    """
+    Return (info, price age) for symbol: an info()-shaped dict with the
+    profile and price fields, and the age in seconds of a price served past
+    COMPANY_PRICE_TTL, else None. The info is {} for an unknown symbol.
+    Raises if the symbol has never been fetched and the upstream call fails.
+    """
+    symbol = symbol.upper()
+    profile, expired = _load_profile(symbol)
+    if profile is None:
+        _count("miss")
+        info = quote_cache.get_or_fetch(symbol, _fetch_info)
+        _store(symbol, info)
+        return info, None
+
+    _count("stale" if expired else "fresh")
+    if expired:
+        _schedule("profile", _refresh_profile, symbol)
+    price, age = _price_from_cache(symbol)
+    if price is None:
+        result = price_engine.fetch_prices([symbol])[symbol]
+        _store_price(symbol, result)
+        price = {key: result[field] for key, field in PRICE_FIELDS.items()}
+    return _merge(symbol, profile, price), age
+
+
+async def aget_company_info(symbol):
+    """
+    get_company_info for the async views: the first fetch and a missing
+    price go through the provider's async client on the event loop.
+    Background refreshes still run on the refresh thread pool.
+    """
+    symbol = symbol.upper()
+    profile, expired = await sync_to_async(_load_profile)(symbol)
+    if profile is None:
+        _count("miss")
+        info = await quote_cache.aget_or_fetch(symbol, _afetch_info)
+        await sync_to_async(_store)(symbol, info)
+        return info, None
+
+    _count("stale" if expired else "fresh")
+    if expired:
+        _schedule("profile", _refresh_profile, symbol)
+    price, age = await sync_to_async(_price_from_cache)(symbol)
+    if price is None:
+        result = (await price_engine.fetch_prices_async([symbol]))[symbol]
+        await sync_to_async(_store_price)(symbol, result)
+        price = {key: result[field] for key, field in PRICE_FIELDS.items()}
+    return _merge(symbol, profile, price), age
+
+
+def stats():
+    with _lock:
+        return dict(_stats, refreshing=len(_refreshing), prices=_prices.stats()["size"])
@@ -0,0 +1,109 @@
+# api/fast_json.py
+"""
+Fast JSON encoding for the API responses.
+
+dumps() uses orjson when it is installed: numpy scalars and arrays are
+encoded natively and NaN / Infinity are written as null, in one pass in C.
+Without it the stdlib encoder is used after replacing non-finite floats,
+which strict JSON can't represent. Either way the output is compact UTF-8.
+
+Large, fixed-shape lists are encoded straight from column arrays instead:
+json_strings() JSON-encodes every value of a column once, and
+encode_objects() assembles whole JSON objects from those arrays with
+elementwise string concatenation, without building a dict per row. The
+company universe keeps both per snapshot, so a listing is one join of
+strings (json_array), wrapped in RawJSON for
+api.renderers.FastJSONRenderer to write out as-is.
+
+No Django imports, so the universe can use it outside a configured project.
+"""
+import json
+from json.encoder import encode_basestring
+import math
+
+import numpy as np
+
+from .columnar import DictColumn
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class RawJSON(bytes):
+    """
+    Already-encoded JSON, passed through unchanged by the renderer.
+    """
+
+
+def finite(data):
+    """
+    data with NaN / Infinity replaced by None and numpy values by Python
+    ones, for the stdlib encoder.
+    """
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, dict):
+        return {key: finite(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [finite(value) for value in data]
+    if isinstance(data, np.ndarray):
+        return finite(data.tolist())
+    if isinstance(data, np.generic):
+        return finite(data.item())
+    return data
+
+
+def dumps(data, default=None):
+    """
+    Compact UTF-8 JSON bytes for data. default(obj) is called for types
+    neither encoder knows, like json.dumps' default.
+    """
+    if isinstance(data, RawJSON):
+        return bytes(data)
+    if orjson is not None:
+        return orjson.dumps(data, default=default, option=_ORJSON_OPTIONS)
+    return json.dumps(finite(data), default=default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode()
+
+
+def json_strings(column):
+    """
+    Object array holding every value of a string column JSON-encoded.
+    Dictionary columns encode each distinct value once.
+    """
+    if isinstance(column, DictColumn):
+        values = np.empty(len(column.values), dtype=object)
+        values[:] = [encode_basestring(v) for v in column.values]
+        return values[column.codes]
+    encoded = np.empty(len(column), dtype=object)
+    encoded[:] = [encode_basestring(v) for v in column]
+    return encoded
+
+
+def encode_objects(columns, fields, rows=None):
+    """
+    Object array with one JSON object string ({field: value, ...}) per row,
+    built from {field: json_strings(column)} by elementwise concatenation.
+    rows selects row positions (default all).
+    """
+    parts = None
+    for i, field in enumerate(fields):
+        key = ("{" if i == 0 else ",") + encode_basestring(field) + ":"
+        values = columns[field] if rows is None else columns[field][rows]
+        parts = key + values if parts is None else parts + key + values
+    if parts is None:
+        n = len(next(iter(columns.values()))) if rows is None else len(rows)
+        parts = np.full(n, "{", dtype=object)
+    return parts + "}"
+
+
+def json_array(items):
+    """
+    RawJSON array of already-encoded JSON strings.
+    """
+    return RawJSON(("[" + ",".join(list(items)) + "]").encode())
@@ -0,0 +1,414 @@
+# api/history_store.py
+"""
+Local store of OHLCV bars, so each bar is downloaded once.
+
+One file per symbol and interval, HISTORY_STORE_DIR/<interval>/<SYMBOL>.bars
+(little-endian):
+
+    8 bytes   magic b"FDBARS01"
+    8 bytes   int64 coverage start: every bar from this time (epoch
+              seconds) up to the last record is stored
+    ...       records of BAR_DTYPE (48 bytes each), sorted by time
+
+Only complete bars are written: daily bars of sessions that closed more
+than HISTORY_STORE_SETTLE seconds ago, intraday bars whose interval has
+ended. New bars are appended in place; a backfill (bars before the first
+record) rewrites the file to a temporary file that is moved into place.
+Files therefore never shrink under a reader, and reads memory-map them
+without locking: a range read is two binary searches over the time
+column. Writers serialize on a lock file per interval directory.
+
+history() is a drop-in for provider.history() that asks the upstream only
+for what the store lacks, per symbol:
+
+- nothing, when the latest complete bar is stored and no bar is forming
+- "1d", the newest bar, while a session's bar is still forming
+- the smallest period covering the bars since the last stored one
+- the requested period, when it reaches back before the stored coverage
+
+Symbols needing the same period are fetched in one batched call. The
+forming bar is returned but never stored.
+"""
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import mmap
+import os
+import shutil
+import tempfile
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from . import market_hours
+from .providers import get_provider
+from .providers.synthetic import period_days
+
+try:
+    import fcntl
+except ImportError:  # optional: not on Windows, where writers only serialize within a process
+    fcntl = None
+
+MAGIC = b"FDBARS01"
+HEADER_SIZE = 16
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+BAR_DTYPE = np.dtype([
+    ("t", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8"),
+])
+_EMPTY = np.empty(0, dtype=BAR_DTYPE)
+
+# Smallest first: a gap is fetched with the first period covering it
+PERIODS = ("1d", "2d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y")
+INTERVAL_SECONDS = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "90m": 5400, "1h": 3600, "1d": 86400,
+}
+# A session's daily bar is final this long after the close
+SETTLE = getattr(settings, "HISTORY_STORE_SETTLE", 1800)
+
+
+class HistoryStore:
+    def __init__(self, root):
+        self.root = str(root)
+        self._lock = Lock()
+        self.counts = {"appended": 0, "rewritten": 0, "write_errors": 0}
+
+    def path(self, symbol, interval="1d"):
+        # Tickers like "^GSPC" or "BRK/B" escaped to a safe file name
+        name = "".join(ch if ch.isalnum() or ch in "-_.=" else f"%{ord(ch):02X}" for ch in symbol.upper())
+        return os.path.join(self.root, interval, name + ".bars")
+
+    def _open(self, path):
+        """
+        (coverage start, records memory-mapped read-only), or (None, empty)
+        if the file doesn't exist or isn't a bar file.
+        """
+        try:
+            with open(path, "rb") as f:
+                header = f.read(HEADER_SIZE)
+                if len(header) < HEADER_SIZE or header[:8] != MAGIC:
+                    return None, _EMPTY
+                coverage = int.from_bytes(header[8:], "little", signed=True)
+                rows = (os.fstat(f.fileno()).st_size - HEADER_SIZE) // BAR_DTYPE.itemsize
+                if rows == 0:
+                    return coverage, _EMPTY
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None, _EMPTY
+        return coverage, np.frombuffer(mm, dtype=BAR_DTYPE, count=rows, offset=HEADER_SIZE)
+
+    def info(self, symbol, interval="1d"):
+        """
+        (coverage start, time of the last stored bar), None for either if
+        nothing is stored.
+        """
+        try:
+            with open(self.path(symbol, interval), "rb") as f:
+                header = f.read(HEADER_SIZE)
+                if len(header) < HEADER_SIZE or header[:8] != MAGIC:
+                    return None, None
+                rows = (os.fstat(f.fileno()).st_size - HEADER_SIZE) // BAR_DTYPE.itemsize
+                last = None
+                if rows:
+                    f.seek(HEADER_SIZE + (rows - 1) * BAR_DTYPE.itemsize)
+                    last = int.from_bytes(f.read(8), "little", signed=True)
+        except FileNotFoundError:
+            return None, None
+        return int.from_bytes(header[8:], "little", signed=True), last
+
+    def read(self, symbol, interval="1d", start=None, end=None):
+        """
+        Stored bars with start <= t < end (epoch seconds, either optional),
+        as a BAR_DTYPE array.
+        """
+        _, bars = self._open(self.path(symbol, interval))
+        times = bars["t"]
+        lo = 0 if start is None else np.searchsorted(times, start, "left")
+        hi = len(bars) if end is None else np.searchsorted(times, end, "left")
+        return np.array(bars[lo:hi])
+
+    @contextmanager
+    def _locked(self, interval):
+        directory = os.path.join(self.root, interval)
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, open(os.path.join(directory, ".lock"), "ab") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)   # released when the file closes
+            yield
+
+    def write_many(self, interval, updates):
+        """
+        Store complete bars: updates maps symbol -> (BAR_DTYPE array sorted
+        by time, coverage start of the fetch they came from). The fetch must
+        reach up to the newest bar, so the stored range stays gapless.
+        """
+        with self._locked(interval):
+            for symbol, (bars, coverage) in updates.items():
+                try:
+                    self._write(self.path(symbol, interval), bars, coverage)
+                except OSError:
+                    # Bars are still served from the fetch; the next one retries
+                    self.counts["write_errors"] += 1
+
+    def _write(self, path, bars, coverage):
+        old_coverage, stored = self._open(path)
+        if old_coverage is not None:
+            coverage = min(coverage, old_coverage)
+        if len(stored) and (not len(bars) or bars["t"][0] >= stored["t"][0]):
+            newer = bars[bars["t"] > stored["t"][-1]]
+            if not len(newer) and coverage == old_coverage:
+                return
+            with open(path, "r+b") as f:
+                f.seek(0, os.SEEK_END)
+                f.write(newer.tobytes())
+                # The coverage is only lowered once the bars it promises are in
+                f.flush()
+                os.pwrite(f.fileno(), int(coverage).to_bytes(8, "little", signed=True), 8)
+            self.counts["appended"] += len(newer)
+            return
+
+        # First write or backfill: merge (fetched bars win) and replace
+        merged = _merge(np.array(stored), bars)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".bars-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC)
+                f.write(int(coverage).to_bytes(8, "little", signed=True))
+                f.write(merged.tobytes())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.counts["rewritten"] += 1
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _merge(*arrays):
+    """
+    Bars of all arrays sorted by time, one per time; later arrays win.
+    """
+    bars = np.concatenate(arrays)
+    # np.unique keeps the first occurrence, so look from the end
+    _, last = np.unique(bars["t"][::-1], return_index=True)
+    return bars[len(bars) - 1 - last]
+
+
+def build_history_store():
+    if not getattr(settings, "HISTORY_STORE_ENABLED", True):
+        return None
+    return HistoryStore(getattr(settings, "HISTORY_STORE_DIR", settings.BASE_DIR / "history"))
+
+
+store = build_history_store()
+# Symbols by what plan() found missing: nothing, or the fetch it made
+_planned = {"stored": 0, "newest": 0, "gap": 0, "backfill": 0}
+
+
+# --------------------
+# Bar times
+# --------------------
+
+def _day_seconds(day):
+    return int(np.datetime64(day, "s").astype(np.int64))
+
+
+def _previous_weekday(day):
+    day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def complete_before(interval, now=None):
+    """
+    Epoch seconds: bars of interval starting before this are complete.
+    Daily bars are stamped with their session date at midnight.
+    """
+    now = (now or datetime.now(market_hours.MARKET_TZ)).astimezone(market_hours.MARKET_TZ)
+    if interval != "1d":
+        return int(now.timestamp()) - INTERVAL_SECONDS[interval] + 1
+    day = market_hours.session_date(now)
+    settled = datetime.combine(now.date(), market_hours.MARKET_CLOSE, now.tzinfo) + timedelta(seconds=SETTLE)
+    if day == now.date() and now < settled:
+        day = _previous_weekday(day)
+    return _day_seconds(day + timedelta(days=1))
+
+
+def window_start(period, now=None):
+    """
+    Epoch seconds of the first session of period, ending with today's.
+    """
+    first = np.busday_offset(market_hours.session_date(now), 1 - period_days(period), roll="backward")
+    return _day_seconds(first)
+
+
+def _frame_bars(data, symbol, interval):
+    """
+    BAR_DTYPE array of symbol's bars in a provider history frame (rows
+    without a close dropped).
+    """
+    try:
+        columns = [data[(field, symbol)] for field in FIELDS]
+    except KeyError:
+        return _EMPTY
+    index = pd.DatetimeIndex(data.index)
+    if interval == "1d":
+        # The session date, whatever zone the upstream stamped it in
+        index = (index.tz_localize(None) if index.tz is not None else index).normalize()
+    elif index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    bars = np.empty(len(index), dtype=BAR_DTYPE)
+    bars["t"] = index.as_unit("s").asi8
+    for name, column in zip(BAR_DTYPE.names[1:], columns):
+        bars[name] = column.to_numpy(dtype=float)
+    bars = bars[~np.isnan(bars["close"])]
+    return _merge(bars) if len(bars) > 1 else bars
+
+
+def _to_frame(per_symbol, symbols, interval):
+    """
+    Provider-shaped DataFrame: bar times (union over symbols) by
+    (field, symbol) columns, NaN where a symbol has no bar.
+    """
+    present = [bars["t"] for bars in per_symbol.values() if len(bars)]
+    if not present:
+        return pd.DataFrame()
+    times = np.unique(np.concatenate(present))
+    values = np.full((len(times), len(FIELDS), len(symbols)), np.nan)
+    for column, symbol in enumerate(symbols):
+        bars = per_symbol.get(symbol, _EMPTY)
+        if len(bars):
+            rows = np.searchsorted(times, bars["t"])
+            for field, name in enumerate(BAR_DTYPE.names[1:]):
+                values[rows, field, column] = bars[name]
+    index = pd.to_datetime(times, unit="s", utc=interval != "1d").as_unit("ns")
+    return pd.DataFrame(
+        values.reshape(len(times), -1), index=index, columns=pd.MultiIndex.from_product([FIELDS, symbols]),
+    )
+
+
+# --------------------
+# Reads through the store
+# --------------------
+
+def plan(symbols, period, interval="1d", now=None):
+    """
+    {period to fetch: [symbols]} for what the store is missing of the last
+    `period` of symbols' bars (see the module docstring).
+    """
+    start = window_start(period, now)
+    session = market_hours.session_date(now)
+    if interval == "1d":
+        # The last complete bar, and whether a newer one is forming (or
+        # not yet final) between the open and the settle time
+        complete = complete_before(interval, now) - INTERVAL_SECONDS["1d"]
+        forming = complete < _day_seconds(session)
+    else:
+        # Intraday bars are complete up to the close of the latest session
+        close = datetime.combine(session, market_hours.MARKET_CLOSE, market_hours.MARKET_TZ)
+        complete = int(close.timestamp()) - INTERVAL_SECONDS[interval]
+        forming = market_hours.market_is_open(now)
+
+    fetches = {}
+    for symbol in symbols:
+        coverage, last = store.info(symbol, interval)
+        if coverage is None or last is None or coverage > start:
+            kind, fetch = "backfill", period
+        elif last < complete:
+            kind, fetch = "gap", _covering(last, session, interval)
+            if fetch is None:
+                kind, fetch = "backfill", period
+        elif forming:
+            kind, fetch = "newest", "1d"
+        else:
+            _planned["stored"] += 1
+            continue
+        _planned[kind] += 1
+        fetches.setdefault(fetch, []).append(symbol)
+    return fetches
+
+
+def _covering(last, session, interval):
+    # Sessions up to and including the latest one that have bars missing:
+    # those after the last stored daily bar, or from an intraday bar's own
+    first = pd.Timestamp(last, unit="s").date() + timedelta(days=interval == "1d")
+    missing = int(np.busday_count(first, session + timedelta(days=1)))
+    for period in PERIODS:
+        if period_days(period) >= missing:
+            return period
+    return None
+
+
+def _settle(symbols, period, interval, fetched, now):
+    """
+    Store the complete bars of fetched ({period: provider frame}) and
+    return the provider-shaped frame of symbols over period.
+    """
+    start = window_start(period, now)
+    complete = complete_before(interval, now)
+    recent, updates = {}, {}
+    for fetch, data in fetched.items():
+        if data is None or data.empty:
+            continue
+        coverage = window_start(fetch, now)
+        for symbol in {s for _, s in data.columns}:
+            bars = _frame_bars(data, symbol, interval)
+            recent[symbol] = bars
+            if len(bars) and bars["t"][0] < complete:
+                updates[symbol] = (bars[bars["t"] < complete], coverage)
+    if updates:
+        store.write_many(interval, updates)
+
+    per_symbol = {}
+    for symbol in symbols:
+        bars = store.read(symbol, interval, start=start)
+        if symbol in recent:
+            bars = _merge(bars, recent[symbol])
+            bars = bars[bars["t"] >= start]
+        per_symbol[symbol] = bars
+    return _to_frame(per_symbol, list(symbols), interval)
+
+
+def history(symbols, period="2d", interval="1d", now=None):
+    """
+    provider.history(symbols, period, interval), reading stored bars and
+    fetching only the missing ones.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if store is None or interval not in INTERVAL_SECONDS:
+        return get_provider().history(symbols, period=period, interval=interval)
+    fetched = {
+        fetch: get_provider().history(group, period=fetch, interval=interval)
+        for fetch, group in plan(symbols, period, interval, now).items()
+    }
+    return _settle(symbols, period, interval, fetched, now)
+
+
+async def ahistory(symbols, period="2d", interval="1d", now=None):
+    symbols = list(dict.fromkeys(symbols))
+    if store is None or interval not in INTERVAL_SECONDS:
+        return await get_provider().ahistory(symbols, period=period, interval=interval)
+    fetches = plan(symbols, period, interval, now)
+    frames = await asyncio.gather(*(
+        get_provider().ahistory(group, period=fetch, interval=interval) for fetch, group in fetches.items()
+    ))
+    return _settle(symbols, period, interval, dict(zip(fetches, frames)), now)
+
+
+def stored_history(symbols, period="2d", interval="1d", now=None):
+    """
+    history() from the stored bars alone, for when the upstream fails.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if store is None or interval not in INTERVAL_SECONDS:
+        return pd.DataFrame()
+    return _settle(symbols, period, interval, {}, now)
+
+
+def stats():
+    return {**_planned, **(store.counts if store is not None else {})}
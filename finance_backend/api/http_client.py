@@ -0,0 +1,110 @@
+# api/http_client.py
+"""
+Shared HTTP session for the upstream calls made with requests.
+
+One requests.Session per process keeps connections alive between calls, so
+a search keystroke doesn't pay DNS + TCP + TLS setup every time. It has a
+connection pool sized for the worker's concurrency, retries with jittered
+exponential backoff on connection errors, 429 and 5xx (GET/HEAD only), and a
+default (connect, read) timeout on every call.
+
+yfinance keeps its own curl_cffi session; yfinance_session() returns one
+shared instance so yf.Ticker doesn't build a new session per symbol.
+
+Works without Django settings configured (e.g. from scripts/), in which case
+the defaults below apply.
+"""
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULTS = {
+    "UPSTREAM_HTTP_POOL_SIZE": 32,
+    "UPSTREAM_HTTP_RETRIES": 2,
+    "UPSTREAM_HTTP_BACKOFF": 0.3,
+    "UPSTREAM_HTTP_BACKOFF_JITTER": 0.2,
+    "UPSTREAM_HTTP_TIMEOUT": (3.05, 10),
+}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+USER_AGENT = "Mozilla/5.0"
+
+_session = None
+_yf_session = None
+_lock = Lock()
+
+
+def _setting(name):
+    try:
+        from django.conf import settings
+        if settings.configured:
+            return getattr(settings, name, DEFAULTS[name])
+    except ImportError:
+        pass
+    return DEFAULTS[name]
+
+
+def build_session(pool_size=None, retries=None, backoff=None, jitter=None):
+    """
+    requests.Session with a keep-alive pool and retry policy. Arguments
+    default to the UPSTREAM_HTTP_* settings.
+    """
+    pool_size = _setting("UPSTREAM_HTTP_POOL_SIZE") if pool_size is None else pool_size
+    retries = _setting("UPSTREAM_HTTP_RETRIES") if retries is None else retries
+    backoff = _setting("UPSTREAM_HTTP_BACKOFF") if backoff is None else backoff
+    jitter = _setting("UPSTREAM_HTTP_BACKOFF_JITTER") if jitter is None else jitter
+
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        backoff_jitter=jitter,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,   # hand back the last response; callers raise_for_status()
+    )
+    # pool_connections is the number of hosts kept; pool_maxsize the
+    # connections per host, which should cover the worker's thread count
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, max_retries=retry, pool_block=False)
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def get(url, timeout=None, **kwargs):
+    """
+    GET through the shared session with the default timeout.
+    """
+    return get_session().get(url, timeout=timeout or _setting("UPSTREAM_HTTP_TIMEOUT"), **kwargs)
+
+
+def yfinance_session():
+    """
+    One curl_cffi session shared by every yf.Ticker / yf.download call, or
+    None (let yfinance create its own) when curl_cffi isn't installed.
+    """
+    global _yf_session
+    if _yf_session is None:
+        with _lock:
+            if _yf_session is None:
+                try:
+                    from curl_cffi import requests as curl_requests
+                except ImportError:
+                    return None
+                _yf_session = curl_requests.Session(impersonate="chrome")
+    return _yf_session
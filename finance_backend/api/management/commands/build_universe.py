@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.universe import read_companies_csv, write_universe_columnar
+from api.views import COLUMNAR_PATH, CSV_PATH
+
+
+class Command(BaseCommand):
+    help = "Build the memory-mapped columnar company universe from all_companies.csv"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--csv", default=CSV_PATH, help="Source CSV (default: all_companies.csv)")
+        parser.add_argument("--output", default=COLUMNAR_PATH, help="Output file (default: all_companies.bin)")
+
+    def handle(self, *args, **options):
+        df = read_companies_csv(options["csv"])
+        write_universe_columnar(df, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(df)} companies to {options['output']}"))
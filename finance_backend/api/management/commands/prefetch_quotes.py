@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import market_hours, prefetch
+
+
+class Command(BaseCommand):
+    help = "Keep the shared quote store warm for every symbol in any watchlist"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run a single cycle and exit")
+        parser.add_argument("--interval", type=float, default=None,
+                            help="Fixed seconds between cycles (default: market-hours aware)")
+
+    def handle(self, *args, **options):
+        interval_fn = (lambda: options["interval"]) if options["interval"] else prefetch.current_interval
+        runner = prefetch.QuotePrefetcher(interval_fn)
+        while True:
+            counts = runner.run_cycle()
+            stats = runner.stats()
+            if counts is None:
+                self.stderr.write("Prefetch cycle failed")
+            else:
+                self.stdout.write(
+                    f"Refreshed {stats['symbols']} symbols in {stats['last_duration']:.2f}s {counts}"
+                )
+            if options["once"]:
+                return
+            wait = interval_fn()
+            self.stdout.write(f"Next cycle in {wait:.0f}s (market {'open' if market_hours.market_is_open() else 'closed'})")
+            time.sleep(wait)
@@ -0,0 +1,36 @@
+# api/market_hours.py
+"""
+Market session times shared by the prefetcher, the history store and the
+analytics cache.
+
+The market is a weekday session from QUOTE_PREFETCH_MARKET_OPEN to
+QUOTE_PREFETCH_MARKET_CLOSE in QUOTE_PREFETCH_MARKET_TZ; exchange holidays
+aren't modelled.
+"""
+from datetime import datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+
+MARKET_TZ = ZoneInfo(getattr(settings, "QUOTE_PREFETCH_MARKET_TZ", "America/New_York"))
+MARKET_OPEN = dtime.fromisoformat(getattr(settings, "QUOTE_PREFETCH_MARKET_OPEN", "09:30"))
+MARKET_CLOSE = dtime.fromisoformat(getattr(settings, "QUOTE_PREFETCH_MARKET_CLOSE", "16:00"))
+
+
+def market_is_open(now=None):
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def session_date(now=None):
+    """
+    Date of the latest daily bar: today once the session has opened on a
+    weekday, else the previous weekday.
+    """
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    day = now.date()
+    if now.time() < MARKET_OPEN:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
@@ -0,0 +1,368 @@
+# api/metrics.py
+"""
+In-process performance metrics rendered in the Prometheus text format.
+
+PerfMiddleware opens a RequestStats for every request and keeps it in a
+context variable; the SQL execute wrapper and MeteredProvider add to it from
+whatever thread ends up doing the work (pass the context along with
+contextvars.copy_context() when handing work to a pool). When the request
+finishes its totals are folded into the process-wide histograms below.
+The other subsystems (caches, stores, breaker, prefetcher...) keep their
+own counters; collect() reads their stats() at scrape time.
+
+Metrics are per process: with several workers, scrape each one or sum them
+in Prometheus.
+"""
+from bisect import bisect_left
+import contextvars
+import threading
+import time
+
+# Seconds; roughly the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram keyed by a tuple of label values.
+    """
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}   # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            base = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), label_values + (_num(bound),))} {cumulative}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+            lines.append(f"{self.name}_sum{base} {_num(series[-1])}")
+        return lines
+
+
+class Counter:
+    """
+    Monotonic counter keyed by a tuple of label values.
+    """
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_num(value)}")
+        return lines
+
+
+def collected(name, help, samples, kind="gauge"):
+    """
+    Render a gauge (or counter) from [(labels dict, value)] collected at
+    scrape time, e.g. from a component's stats().
+    """
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_num(value)}")
+    return lines
+
+
+def _num(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float):
+        return repr(value)
+    return str(int(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+# --------------------
+# Process-wide series
+# --------------------
+REQUEST_SECONDS = Histogram(
+    "api_request_duration_seconds", "Wall time per request until the response is returned.",
+    ("route", "method", "status"))
+REQUEST_DB_QUERIES = Histogram(
+    "api_request_db_queries", "SQL queries executed per request.", ("route",), COUNT_BUCKETS)
+REQUEST_DB_SECONDS = Histogram(
+    "api_request_db_seconds", "Time spent in SQL per request.", ("route",))
+REQUEST_UPSTREAM_CALLS = Histogram(
+    "api_request_upstream_calls", "Market-data provider calls made on behalf of a request.", ("route",), COUNT_BUCKETS)
+REQUEST_UPSTREAM_SECONDS = Histogram(
+    "api_request_upstream_seconds", "Time spent waiting on the market-data provider per request.", ("route",))
+UPSTREAM_SECONDS = Histogram(
+    "api_upstream_call_duration_seconds", "Duration of each market-data provider call.", ("method", "outcome"))
+PROFILES_WRITTEN = Counter(
+    "api_profiles_written_total", "Slow-request cProfile dumps written to disk.", ("route",))
+COMPRESSED_RESPONSES = Counter(
+    "api_compressed_responses_total", "Responses compressed by CompressionMiddleware.", ("encoding",))
+COMPRESSION_SAVED_BYTES = Counter(
+    "api_compression_saved_bytes_total", "Response bytes saved by compression.", ("encoding",))
+
+SERIES = [
+    REQUEST_SECONDS, REQUEST_DB_QUERIES, REQUEST_DB_SECONDS,
+    REQUEST_UPSTREAM_CALLS, REQUEST_UPSTREAM_SECONDS, UPSTREAM_SECONDS, PROFILES_WRITTEN,
+    COMPRESSED_RESPONSES, COMPRESSION_SAVED_BYTES,
+]
+
+
+# --------------------
+# Per-request accounting
+# --------------------
+class RequestStats:
+    """
+    Totals for one request. Shared by reference with every thread that
+    works on the request, hence the lock.
+    """
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.upstream_calls = 0
+        self.upstream_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_query(self, seconds):
+        with self._lock:
+            self.db_queries += 1
+            self.db_seconds += seconds
+
+    def add_upstream(self, seconds):
+        with self._lock:
+            self.upstream_calls += 1
+            self.upstream_seconds += seconds
+
+
+current_request = contextvars.ContextVar("api_request_stats", default=None)
+
+
+def sql_execute_wrapper(execute, sql, params, many, context):
+    """
+    Connection execute wrapper (see connection.execute_wrappers) that times
+    queries run while a request is being measured.
+    """
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(time.perf_counter() - started)
+
+
+def record_upstream(method, seconds, outcome="ok"):
+    UPSTREAM_SECONDS.observe(seconds, method, outcome)
+    stats = current_request.get()
+    if stats is not None:
+        stats.add_upstream(seconds)
+
+
+def record_request(route, method, status, seconds, stats):
+    REQUEST_SECONDS.observe(seconds, route, method, str(status))
+    REQUEST_DB_QUERIES.observe(stats.db_queries, route)
+    REQUEST_DB_SECONDS.observe(stats.db_seconds, route)
+    REQUEST_UPSTREAM_CALLS.observe(stats.upstream_calls, route)
+    REQUEST_UPSTREAM_SECONDS.observe(stats.upstream_seconds, route)
+
+
+# --------------------
+# Scrape-time collectors, one per subsystem, each taking its stats()
+# --------------------
+def quote_cache_metrics(cache):
+    return [
+        *collected("api_quote_cache_requests_total", "Quote cache lookups by result.", [
+            ({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"]),
+        ], kind="counter"),
+        *collected("api_quote_cache_store_hits_total", "Quote cache hits served from the shared store.",
+                   [({}, cache["store_hits"])], kind="counter"),
+        *collected("api_quote_cache_evictions_total", "Quote cache LRU evictions.",
+                   [({}, cache["evictions"])], kind="counter"),
+        *collected("api_quote_cache_size", "Symbols currently in the quote cache.", [({}, cache["size"])]),
+        *collected("api_quote_cache_hit_ratio", "Quote cache hits / lookups since start.", [({}, cache["hit_rate"])]),
+    ]
+
+
+def quote_store_metrics(store):
+    backend = store["backend"]
+    return [
+        *collected("api_quote_store_requests_total", "Shared quote store lookups by result.", [
+            ({"backend": backend, "result": "hit"}, store["hits"]),
+            ({"backend": backend, "result": "miss"}, store["misses"]),
+        ], kind="counter"),
+        *collected("api_quote_store_writes_total", "Quotes written to the shared store.",
+                   [({"backend": backend}, store["writes"])], kind="counter"),
+        *collected("api_quote_store_errors_total", "Shared quote store operations that failed.", [
+            ({"backend": backend, "op": op}, count) for op, count in store["errors_by_op"].items()
+        ], kind="counter"),
+    ]
+
+
+def upstream_flight_metrics(flight, async_flight):
+    return [
+        *collected("api_upstream_flight_total", "Upstream calls by whether they ran or joined an in-flight call.", [
+            ({"mode": "sync", "result": "executed"}, flight["executions"]),
+            ({"mode": "sync", "result": "coalesced"}, flight["coalesced"]),
+            ({"mode": "async", "result": "executed"}, async_flight["executions"]),
+            ({"mode": "async", "result": "coalesced"}, async_flight["coalesced"]),
+        ], kind="counter"),
+        *collected("api_upstream_in_flight", "Upstream calls currently running.", [
+            ({"mode": "sync"}, flight["in_flight"]), ({"mode": "async"}, async_flight["in_flight"]),
+        ]),
+    ]
+
+
+def universe_metrics(universe):
+    return [
+        *collected("api_universe_rows", "Companies in the loaded universe.", [({}, universe["rows"])]),
+        *collected("api_universe_version", "Universe snapshot version.", [({}, universe["version"])]),
+        *collected("api_universe_load_seconds", "Duration of the last universe load.",
+                   [({"source": universe["source"] or ""}, universe["load_duration"])]),
+        *collected("api_universe_reloads_total", "Universe reloads by result.", [
+            ({"result": "ok"}, universe["reloads"]), ({"result": "failed"}, universe["failures"]),
+        ], kind="counter"),
+    ]
+
+
+def company_cache_metrics(details):
+    return [
+        *collected("api_company_cache_requests_total", "Company detail lookups by profile cache result.", [
+            ({"result": "fresh"}, details["fresh"]), ({"result": "stale"}, details["stale"]),
+            ({"result": "miss"}, details["miss"]),
+        ], kind="counter"),
+        *collected("api_company_cache_refreshes_total", "Background company cache refreshes by result.", [
+            ({"result": "ok"}, details["refreshes"]), ({"result": "failed"}, details["refresh_failures"]),
+        ], kind="counter"),
+    ]
+
+
+def analytics_metrics(computed):
+    return collected("api_analytics_cache_requests_total", "Watchlist analytics lookups by cache result.", [
+        ({"result": "hit"}, computed["hits"]), ({"result": "miss"}, computed["misses"]),
+    ], kind="counter")
+
+
+def history_store_metrics(bars):
+    return [
+        *collected("api_history_store_symbols_total", "Symbols read through the history store by what was fetched.", [
+            ({"fetch": kind}, bars[kind]) for kind in ("stored", "newest", "gap", "backfill")
+        ], kind="counter"),
+        *collected("api_history_store_writes_total", "History store writes by kind.", [
+            ({"kind": "appended_bars"}, bars.get("appended", 0)),
+            ({"kind": "rewritten_files"}, bars.get("rewritten", 0)),
+        ], kind="counter"),
+        *collected("api_history_store_errors_total", "History store writes that failed.",
+                   [({}, bars.get("write_errors", 0))], kind="counter"),
+    ]
+
+
+def circuit_breaker_metrics(breaker):
+    return [
+        *collected("api_upstream_circuit_open", "1 while the market-data circuit is open or half-open.",
+                   [({"state": breaker["state"]}, int(breaker["state"] != "closed"))]),
+        *collected("api_upstream_circuit_opened_total", "Times the market-data circuit has opened.",
+                   [({}, breaker["opened"])], kind="counter"),
+        *collected("api_upstream_circuit_rejected_total", "Calls failed fast while the circuit was open.",
+                   [({}, breaker["rejected"])], kind="counter"),
+    ]
+
+
+def prefetch_metrics(runner):
+    return [
+        *collected("api_prefetch_cycles_total", "Quote prefetch cycles by result.", [
+            ({"result": "ok"}, runner["cycles"]), ({"result": "failed"}, runner["failures"]),
+        ], kind="counter"),
+        *collected("api_prefetch_symbols", "Symbols refreshed by the last prefetch cycle.", [({}, runner["symbols"])]),
+        *collected("api_prefetch_last_duration_seconds", "Duration of the last prefetch cycle.",
+                   [({}, runner["last_duration"])]),
+    ]
+
+
+def price_stream_metrics(hub):
+    return [
+        *collected("api_stream_polled_symbols", "Symbols polled for stream subscribers.",
+                   [({}, len(hub.polled_symbols()))]),
+        *collected("api_stream_upstream_calls_total", "Quote lookups made by the stream pollers.",
+                   [({}, hub.upstream_calls)], kind="counter"),
+    ]
+
+
+def collect(universe, price_hub=None):
+    """
+    Pre-rendered lines of every subsystem's metrics, read at scrape time.
+    universe is the views' UniverseLoader and price_hub their PriceHub, if
+    a stream has started one.
+    """
+    # Imported here: most of these modules import this one
+    from . import analytics, company_cache, history_store, prefetch
+    from .circuit_breaker import upstream_breaker
+    from .quote_cache import quote_cache
+    from .quote_store import shared_store
+    from .singleflight import async_upstream_flight, upstream_flight
+
+    lines = [
+        *quote_cache_metrics(quote_cache.stats()),
+        *quote_store_metrics(shared_store.stats()),
+        *upstream_flight_metrics(upstream_flight.stats(), async_upstream_flight.stats()),
+        *universe_metrics(universe.stats()),
+        *company_cache_metrics(company_cache.stats()),
+        *analytics_metrics(analytics.stats()),
+        *history_store_metrics(history_store.stats()),
+        *circuit_breaker_metrics(upstream_breaker.stats()),
+    ]
+    if prefetch.prefetcher is not None:
+        lines += prefetch_metrics(prefetch.prefetcher.stats())
+    if price_hub is not None:
+        lines += price_stream_metrics(price_hub)
+    return lines
+
+
+def render(extra=()):
+    """
+    Prometheus text exposition of every series plus `extra` pre-rendered
+    lines (see collected()).
+    """
+    lines = []
+    for series in SERIES:
+        lines.extend(series.render())
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
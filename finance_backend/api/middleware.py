@@ -0,0 +1,242 @@
+# api/middleware.py
+import cProfile
+import gzip
+import os
+import random
+import re
+import time
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # optional: without it responses are only gzipped
+    brotli = None
+
+PROFILE_SAMPLE_RATE = getattr(settings, "PERF_PROFILE_SAMPLE_RATE", 0.0)
+PROFILE_MIN_SECONDS = getattr(settings, "PERF_PROFILE_MIN_SECONDS", 1.0)
+PROFILE_DIR = str(getattr(settings, "PERF_PROFILE_DIR", "profiles"))
+COMPRESS_MIN_SIZE = getattr(settings, "RESPONSE_COMPRESS_MIN_SIZE", 1024)
+GZIP_LEVEL = getattr(settings, "RESPONSE_GZIP_LEVEL", 6)
+BROTLI_QUALITY = getattr(settings, "RESPONSE_BROTLI_QUALITY", 5)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Streams compressed chunk by chunk; not text/event-stream, whose events
+# are few and small
+STREAM_COMPRESSIBLE_TYPES = ("application/x-ndjson",)
+
+
+def _install_sql_wrapper(sender, connection, **kwargs):
+    # Every new connection, in whichever thread, reports to the current request
+    if metrics.sql_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.sql_execute_wrapper)
+
+
+connection_created.connect(_install_sql_wrapper, dispatch_uid="api.metrics.sql")
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    # The URL pattern, not the path, so ids don't explode the label set
+    return match.route if match is not None else "unmatched"
+
+
+class PerfMiddleware:
+    """
+    Records wall time, SQL query count/time and upstream call count/time for
+    every request into api.metrics, labelled by URL route.
+
+    With PERF_PROFILE_SAMPLE_RATE > 0, that fraction of (sync) requests runs
+    under cProfile and the profile is written to PERF_PROFILE_DIR when the
+    request took at least PERF_PROFILE_MIN_SECONDS. Inspect dumps with
+    `python -m pstats <file>` or snakeviz.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        profiler = cProfile.Profile() if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE else None
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                response = profiler.runcall(self.get_response, request)
+            else:
+                response = self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        elapsed = time.perf_counter() - started
+
+        route = _route(request)
+        metrics.record_request(route, request.method, response.status_code, elapsed, stats)
+        if profiler is not None and elapsed >= PROFILE_MIN_SECONDS:
+            self._dump_profile(profiler, route, elapsed)
+        return response
+
+    async def __acall__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        # For streaming responses this is the time until headers are sent
+        metrics.record_request(_route(request), request.method, response.status_code,
+                               time.perf_counter() - started, stats)
+        return response
+
+    def _dump_profile(self, profiler, route, elapsed):
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{int(elapsed * 1000)}ms-{os.getpid()}.prof"
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            return
+        metrics.PROFILES_WRITTEN.inc(1, route)
+
+
+def _accepted_encodings(header):
+    """
+    {coding: q} from an Accept-Encoding header.
+    """
+    accepted = {}
+    for part in header.lower().split(","):
+        coding, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding.strip():
+            accepted[coding.strip()] = q
+    return accepted
+
+
+def _choose_encoding(header):
+    accepted = _accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class _StreamCompressor:
+    """
+    Compresses a stream chunk by chunk, flushing after each one so nothing
+    sits in the compressor's buffer waiting for more.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)   # 31: gzip framing
+
+    def compress(self, chunk):
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def _compress_stream(content, encoding):
+    compressor = _StreamCompressor(encoding)
+    for chunk in content:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _acompress_stream(content, encoding):
+    compressor = _StreamCompressor(encoding)
+    async for chunk in content:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses JSON and text responses of at least RESPONSE_COMPRESS_MIN_SIZE
+    bytes with brotli (when installed) or gzip, whichever the client prefers
+    to accept. Of the streaming responses only NDJSON is compressed, flushed
+    per chunk; the SSE price stream is left alone.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if response.streaming:
+            if content_type.startswith(STREAM_COMPRESSIBLE_TYPES):
+                return self._compress_streaming(request, response)
+            return response
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or len(response.content) < COMPRESS_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = _choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        if encoding == "br":
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(response.content, compresslevel=GZIP_LEVEL, mtime=0)
+        if len(compressed) >= len(response.content):
+            return response
+
+        metrics.COMPRESSED_RESPONSES.inc(1, encoding)
+        metrics.COMPRESSION_SAVED_BYTES.inc(len(response.content) - len(compressed), encoding)
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # The body differs byte for byte now (as GZipMiddleware does)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+    def _compress_streaming(self, request, response):
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = _choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        if response.is_async:
+            response.streaming_content = _acompress_stream(response.streaming_content, encoding)
+        else:
+            response.streaming_content = _compress_stream(response.streaming_content, encoding)
+        metrics.COMPRESSED_RESPONSES.inc(1, encoding)
+        del response["Content-Length"]
+        response["Content-Encoding"] = encoding
+        return response
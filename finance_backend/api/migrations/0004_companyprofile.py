@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_remove_watchlistitem_added_at_watchlist_user_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyProfile',
+            fields=[
+                ('symbol', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('long_name', models.CharField(blank=True, default='', max_length=255)),
+                ('exchange_name', models.CharField(blank=True, default='', max_length=255)),
+                ('sector', models.CharField(blank=True, default='', max_length=255)),
+                ('industry', models.CharField(blank=True, default='', max_length=255)),
+                ('long_business_summary', models.TextField(blank=True, default='')),
+                ('website', models.CharField(blank=True, default='', max_length=500)),
+                ('country', models.CharField(blank=True, default='', max_length=255)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-17 10:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_items(apps, schema_editor):
+    """
+    Keep the oldest row of every (watchlist, symbol) pair so the unique
+    constraint can be added.
+    """
+    WatchlistItem = apps.get_model('api', 'WatchlistItem')
+    duplicates = (
+        WatchlistItem.objects.values('watchlist_id', 'symbol')
+        .annotate(rows=Count('id'), keep=Min('id'))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates.iterator():
+        WatchlistItem.objects.filter(
+            watchlist_id=dup['watchlist_id'], symbol=dup['symbol'],
+        ).exclude(id=dup['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_companyprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='watchlistitem',
+            constraint=models.UniqueConstraint(fields=('watchlist', 'symbol'), name='unique_watchlist_symbol'),
+        ),
+        migrations.AlterField(
+            model_name='watchlistitem',
+            name='watchlist',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='api.watchlist'),
+        ),
+        migrations.AddIndex(
+            model_name='watchlistitem',
+            index=models.Index(fields=['symbol'], name='watchlistitem_symbol_idx'),
+        ),
+    ]
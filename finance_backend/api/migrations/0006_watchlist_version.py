@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_watchlistitem_unique_symbol'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watchlist',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
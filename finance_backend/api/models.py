@@ -5,17 +5,46 @@ from django.contrib.auth.models import User
 class Watchlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='watchlists', null=True)
     name = models.CharField(max_length=255)
+    # Bumped whenever items are added or removed (see api/watchlist_feed.py)
+    version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
 class WatchlistItem(models.Model):
-    watchlist = models.ForeignKey(Watchlist, on_delete=models.CASCADE, related_name='items')
+    # The (watchlist, symbol) unique index also serves lookups by watchlist,
+    # so the foreign key doesn't get an index of its own
+    watchlist = models.ForeignKey(Watchlist, on_delete=models.CASCADE, related_name='items', db_index=False)
     symbol = models.CharField(max_length=50)
     name = models.CharField(max_length=255)
     exchange = models.CharField(max_length=255)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['watchlist', 'symbol'], name='unique_watchlist_symbol'),
+        ]
+        indexes = [
+            # Distinct symbols across all watchlists (price polling, prefetching)
+            models.Index(fields=['symbol'], name='watchlistitem_symbol_idx'),
+        ]
+
     def __str__(self):
         return f"{self.symbol} - {self.name}"
     
 
+
+class CompanyProfile(models.Model):
+    # Slow-changing company details cached from the market-data provider
+    # (see api/company_cache.py); shared by all workers and kept across restarts
+    symbol = models.CharField(max_length=50, primary_key=True)
+    long_name = models.CharField(max_length=255, blank=True, default='')
+    exchange_name = models.CharField(max_length=255, blank=True, default='')
+    sector = models.CharField(max_length=255, blank=True, default='')
+    industry = models.CharField(max_length=255, blank=True, default='')
+    long_business_summary = models.TextField(blank=True, default='')
+    website = models.CharField(max_length=500, blank=True, default='')
+    country = models.CharField(max_length=255, blank=True, default='')
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.symbol} profile"
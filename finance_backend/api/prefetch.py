@@ -0,0 +1,150 @@
+# api/prefetch.py
+"""
+Background quote prefetcher.
+
+Every cycle it takes the distinct symbols across all WatchlistItem rows
+and refreshes their prices through the price engine, in the engine's
+batched multi-ticker downloads. The results go to the price tier shared
+with all workers (api/quote_store.py), so /api/watchlists/ and
+/api/prices/ find fresh quotes in memory instead of the first poller of
+each cycle paying the upstream latency.
+
+Cycles run every QUOTE_PREFETCH_INTERVAL seconds while the market is open,
+and every QUOTE_PREFETCH_CLOSED_INTERVAL seconds otherwise, when prices
+don't move (market hours: api/market_hours.py). Exchange holidays aren't
+modelled and just get the open-market cadence.
+
+Run it as one process per host with `manage.py prefetch_quotes`, or in
+process with QUOTE_PREFETCH_IN_PROCESS (each worker then runs its own,
+started from the WSGI/ASGI entry points so management commands don't).
+"""
+import logging
+from threading import Event, Lock, Thread
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from . import price_engine
+from .market_hours import market_is_open
+from .models import WatchlistItem
+
+logger = logging.getLogger(__name__)
+
+OPEN_INTERVAL = getattr(settings, "QUOTE_PREFETCH_INTERVAL", 15.0)
+CLOSED_INTERVAL = getattr(settings, "QUOTE_PREFETCH_CLOSED_INTERVAL", 600.0)
+# Symbols per fetch_prices() call. Batches run one after another so request
+# traffic gets the price engine's thread pool in between.
+BATCH_SIZE = getattr(settings, "QUOTE_PREFETCH_BATCH_SIZE", 200)
+
+
+def current_interval(now=None):
+    """
+    Seconds between prefetch cycles right now.
+    """
+    return OPEN_INTERVAL if market_is_open(now) else CLOSED_INTERVAL
+
+
+def quote_max_age(now=None):
+    """
+    Oldest cached price readers should accept as current: the cache TTL, or
+    two prefetch cycles when the market is closed and cycles are slow.
+    """
+    return max(price_engine.PRICE_TTL, 2 * current_interval(now))
+
+
+def watched_symbols():
+    return list(WatchlistItem.objects.values_list("symbol", flat=True).distinct())
+
+
+def prefetch_once(batch_size=None):
+    """
+    Refresh every watched symbol's price. Returns {status: count}.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    symbols = watched_symbols()
+    counts = {}
+    for i in range(0, len(symbols), batch_size):
+        for result in price_engine.fetch_prices(symbols[i:i + batch_size], refresh=True).values():
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return counts
+
+
+class QuotePrefetcher:
+    """
+    Runs prefetch_once() on a daemon thread at the market-hours cadence.
+    """
+
+    def __init__(self, interval_fn=current_interval):
+        self.interval_fn = interval_fn
+        self._stop = Event()
+        self._thread = None
+        self._lock = Lock()
+        self.cycles = 0
+        self.failures = 0
+        self.symbols = 0
+        self.last_duration = 0.0
+        self.last_run = None   # epoch seconds
+
+    def run_cycle(self):
+        started = time.perf_counter()
+        try:
+            counts = prefetch_once()
+        except Exception:
+            logger.exception("Quote prefetch failed")
+            with self._lock:
+                self.failures += 1
+            return None
+        finally:
+            # Connections are per thread; don't hold one open between cycles
+            connections.close_all()
+        with self._lock:
+            self.cycles += 1
+            self.symbols = sum(counts.values())
+            self.last_duration = time.perf_counter() - started
+            self.last_run = time.time()
+        return counts
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self.run_cycle()
+            self._stop.wait(self.interval_fn())
+
+    def start(self):
+        if self._thread is None:
+            self._thread = Thread(target=self.run_forever, name="quote-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cycles": self.cycles,
+                "failures": self.failures,
+                "symbols": self.symbols,
+                "last_duration": self.last_duration,
+                "last_run": self.last_run,
+            }
+
+
+# The in-process prefetcher, if QUOTE_PREFETCH_IN_PROCESS started one
+prefetcher = None
+
+
+def start_in_process():
+    global prefetcher
+    if prefetcher is None:
+        prefetcher = QuotePrefetcher().start()
+    return prefetcher
+
+
+def start_for_server():
+    """
+    Called by finance_backend/wsgi.py and asgi.py, which only servers load,
+    rather than AppConfig.ready(), which migrate, shell and tests run too.
+    """
+    if getattr(settings, "QUOTE_PREFETCH_IN_PROCESS", False):
+        start_in_process()
@@ -0,0 +1,250 @@
+# api/price_engine.py
+"""
+Batched, concurrent price fetching for /api/prices/.
+
+Symbols are split into chunks, each chunk is fetched with a single
+multi-ticker download, and the chunks run on a bounded thread pool shared by
+the whole process. Results are collected until the request deadline; chunks
+that haven't finished by then are reported per symbol instead of failing the
+whole request. Change / change-percent are computed once over the combined
+close-price frame. fetch_prices_async is the event-loop equivalent used by
+the async views.
+
+Results are cached for QUOTE_CACHE_TTL in a tier shared with the other
+worker processes (api/quote_store.py), and only symbols missing from it are
+fetched. Symbols whose fetch failed or timed out fall back to their last
+good price (status "stale", with its age in seconds) when one is known.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait
+import contextvars
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from . import history_store
+from .quote_cache import QuoteCache
+from .quote_store import shared_store
+from .singleflight import async_upstream_flight, upstream_flight
+
+CHUNK_SIZE = getattr(settings, "PRICE_ENGINE_CHUNK_SIZE", 50)
+MAX_WORKERS = getattr(settings, "PRICE_ENGINE_MAX_WORKERS", 4)
+DEADLINE = getattr(settings, "PRICE_ENGINE_DEADLINE", 8.0)
+
+# Shared across requests so concurrent requests can't multiply upstream load
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="price-engine")
+
+STATUS_OK = "ok"
+STATUS_NO_DATA = "no_data"
+STATUS_ERROR = "error"
+STATUS_TIMEOUT = "timeout"
+STATUS_STALE = "stale"   # last known price, served because the fetch failed
+
+# Last good result per symbol: served as-is within the TTL, and as a stale
+# fallback up to STALE_MAX_AGE while the upstream is failing
+STALE_MAX_AGE = getattr(settings, "UPSTREAM_STALE_MAX_AGE", 6 * 3600)
+PRICE_TTL = getattr(settings, "QUOTE_CACHE_TTL", 30)
+_PRICES = QuoteCache(
+    ttl=PRICE_TTL,
+    max_size=getattr(settings, "QUOTE_CACHE_MAX_SIZE", 2048) * 4,
+    store=shared_store,
+    namespace="price",
+)
+
+
+def _chunks(symbols, size):
+    for i in range(0, len(symbols), size):
+        yield symbols[i:i + size]
+
+
+def _download_closes(chunk):
+    """
+    The last two daily bars for every symbol in chunk, from the local history
+    store plus one request for what it lacks (usually just the newest bar).
+    Returns a DataFrame of close prices with one column per symbol.
+    """
+    data = history_store.history(chunk, period="2d", interval="1d")
+    if data is None or data.empty:
+        return pd.DataFrame(columns=chunk)
+    return data["Close"]
+
+
+async def _adownload_closes(chunk):
+    data = await history_store.ahistory(chunk, period="2d", interval="1d")
+    if data is None or data.empty:
+        return pd.DataFrame(columns=chunk)
+    return data["Close"]
+
+
+def compute_changes(closes):
+    """
+    Vectorized change math over a close-price frame (rows = bars, columns =
+    symbols). For each column the current price is its last valid close and
+    the previous close is the valid close before it (or the current price if
+    there is only one bar). Returns a DataFrame indexed by symbol.
+    """
+    closes = closes.astype(float)
+    valid = closes.notna()
+    # Number of valid bars at or after each row, counted from the bottom
+    from_end = valid.iloc[::-1].cumsum().iloc[::-1]
+
+    current = closes.where(valid & from_end.eq(1)).max()
+    previous = closes.where(valid & from_end.eq(2)).max().fillna(current)
+
+    change = current - previous
+    change_percent = (change / previous.replace(0, np.nan) * 100).where(previous.ne(0), 0.0)
+    change_percent = change_percent.where(current.notna())
+
+    return pd.DataFrame({
+        "current_price": current,
+        "change": change,
+        "change_percent": change_percent,
+    })
+
+
+def _floats(series):
+    """
+    series as a list of Python floats, with None for NaN.
+    """
+    values = series.to_numpy(dtype=float)
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+
+def _empty_result(status, error=None):
+    result = {
+        "current_price": None,
+        "change": None,
+        "change_percent": None,
+        "status": status,
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def cached_prices(symbols, max_age=None):
+    """
+    {symbol: result} for the symbols any worker has a price for no older
+    than max_age (default the TTL), without fetching the rest.
+    """
+    return _PRICES.get_many(list(dict.fromkeys(symbols)), max_age)
+
+
+def fetch_prices(symbols, deadline=None, refresh=False):
+    """
+    Fetch prices for symbols, returning {symbol: {current_price, change,
+    change_percent, status[, error]}}. Never raises for upstream failures;
+    symbols whose chunk failed or ran past the deadline get a non-"ok" status.
+    refresh=True fetches every symbol even if a fresh price is cached.
+    """
+    deadline = DEADLINE if deadline is None else deadline
+    started = time.monotonic()
+
+    # Preserve request order but fetch each symbol once, and only if no
+    # worker has a fresh price for it
+    unique = list(dict.fromkeys(symbols))
+    cached = {} if refresh else _PRICES.get_many(unique)
+    missing = [sym for sym in unique if sym not in cached]
+    # Identical chunks requested concurrently (e.g. many tabs browsing the same
+    # sector) are coalesced into a single download. Each task runs in a copy
+    # of the caller's context so its upstream time is attributed to the request.
+    futures = {
+        _EXECUTOR.submit(contextvars.copy_context().run, upstream_flight.do,
+                         ("history", tuple(chunk)), _download_closes, chunk): chunk
+        for chunk in _chunks(missing, CHUNK_SIZE)
+    }
+
+    done, not_done = wait(futures, timeout=max(0.0, deadline - (time.monotonic() - started)))
+
+    results = {}
+    frames = []
+    for future in done:
+        chunk = futures[future]
+        try:
+            frames.append(future.result())
+        except Exception as e:
+            for sym in chunk:
+                results[sym] = _empty_result(STATUS_ERROR, str(e))
+
+    for future in not_done:
+        future.cancel()
+        for sym in futures[future]:
+            results[sym] = _empty_result(STATUS_TIMEOUT, "deadline exceeded")
+
+    return _collect(unique, cached, frames, results)
+
+
+async def fetch_prices_async(symbols, deadline=None):
+    """
+    fetch_prices for the async views: chunks are downloaded concurrently on
+    the event loop through the provider's async client instead of the thread
+    pool, and coalesced with the other requests on the same loop.
+    """
+    deadline = DEADLINE if deadline is None else deadline
+    unique = list(dict.fromkeys(symbols))
+    cached = _PRICES.get_many(unique)
+    missing = [sym for sym in unique if sym not in cached]
+    tasks = {
+        asyncio.ensure_future(async_upstream_flight.do(("history", tuple(chunk)), _adownload_closes, chunk)): chunk
+        for chunk in _chunks(missing, CHUNK_SIZE)
+    }
+    if not tasks:
+        return {sym: cached[sym] for sym in unique}
+
+    done, not_done = await asyncio.wait(tasks, timeout=deadline)
+
+    results = {}
+    frames = []
+    for task in done:
+        try:
+            frames.append(task.result())
+        except Exception as e:
+            for sym in tasks[task]:
+                results[sym] = _empty_result(STATUS_ERROR, str(e))
+
+    for task in not_done:
+        task.cancel()
+        for sym in tasks[task]:
+            results[sym] = _empty_result(STATUS_TIMEOUT, "deadline exceeded")
+
+    return _collect(unique, cached, frames, results)
+
+
+def _collect(unique, cached, frames, results):
+    """
+    Merge downloaded close frames into per-symbol results; symbols already
+    in results (errors, timeouts) keep their entry and cached symbols
+    their cached result.
+    """
+    if frames:
+        closes = pd.concat(frames, axis=1)
+        closes = closes.loc[:, ~closes.columns.duplicated()]
+        changes = compute_changes(closes)
+        # Converted per column rather than per value
+        columns = [_floats(changes[c]) for c in ("current_price", "change", "change_percent")]
+        for sym, price, change, change_percent in zip(changes.index, *columns):
+            if sym in results:
+                continue
+            if price is None:
+                results[sym] = _empty_result(STATUS_NO_DATA)
+            else:
+                results[sym] = {
+                    "current_price": price,
+                    "change": change,
+                    "change_percent": change_percent,
+                    "status": STATUS_OK,
+                }
+
+    _PRICES.set_many({sym: result for sym, result in results.items() if result["status"] == STATUS_OK})
+    for sym, result in results.items():
+        if result["status"] in (STATUS_ERROR, STATUS_TIMEOUT):
+            last, age = _PRICES.get_stale(sym, STALE_MAX_AGE)
+            if last is not None:
+                results[sym] = dict(last, status=STATUS_STALE, age=round(age, 1), error=result.get("error"))
+
+    results.update(cached)
+    return {sym: results.get(sym) or _empty_result(STATUS_NO_DATA) for sym in unique}
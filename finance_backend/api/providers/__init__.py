@@ -0,0 +1,69 @@
+# api/providers/__init__.py
+"""
+Pluggable market-data layer. Every upstream call in the API goes through
+get_provider(), which is selected by settings.MARKET_DATA_PROVIDER:
+
+- "yahoo":     live Yahoo Finance (default)
+- "synthetic": deterministic offline data
+- "replay":    responses recorded in MARKET_DATA_REPLAY_DIR, no network
+- "record":    live Yahoo, saving every response to MARKET_DATA_REPLAY_DIR
+
+The provider built from settings is wrapped in MeteredProvider so upstream
+calls show up in /api/metrics/, and in BreakerProvider so an upstream outage
+trips api.circuit_breaker.upstream_breaker and fails fast.
+"""
+from threading import Lock
+
+from django.conf import settings
+
+from ..circuit_breaker import upstream_breaker
+from .base import MarketDataProvider, UpstreamError
+from .breaker import BreakerProvider
+from .metered import MeteredProvider
+from .replay import ReplayMissError, ReplayProvider
+from .synthetic import SyntheticProvider
+from .yahoo import YahooProvider
+
+__all__ = [
+    "MarketDataProvider", "YahooProvider", "SyntheticProvider", "ReplayProvider",
+    "ReplayMissError", "UpstreamError", "MeteredProvider", "BreakerProvider", "get_provider", "set_provider", "build_provider",
+]
+
+_provider = None
+_lock = Lock()
+
+
+def build_provider(kind=None):
+    kind = kind or getattr(settings, "MARKET_DATA_PROVIDER", "yahoo")
+    replay_dir = str(getattr(settings, "MARKET_DATA_REPLAY_DIR", "market_data_recordings"))
+    if kind == "yahoo":
+        return YahooProvider(
+            max_connections=getattr(settings, "UPSTREAM_ASYNC_MAX_CONNECTIONS", 100),
+            retries=getattr(settings, "UPSTREAM_HTTP_RETRIES", 2),
+        )
+    if kind == "synthetic":
+        return SyntheticProvider(latency=getattr(settings, "MARKET_DATA_SYNTHETIC_LATENCY", 0.0))
+    if kind == "replay":
+        return ReplayProvider(replay_dir)
+    if kind == "record":
+        return ReplayProvider(replay_dir, record_from=YahooProvider())
+    raise ValueError(f"Unknown MARKET_DATA_PROVIDER {kind!r}")
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        with _lock:
+            if _provider is None:
+                _provider = BreakerProvider(MeteredProvider(build_provider()), upstream_breaker)
+    return _provider
+
+
+def set_provider(provider):
+    """
+    Swap the process-wide provider (benchmarks, tests). Returns the old one.
+    """
+    global _provider
+    with _lock:
+        previous, _provider = _provider, provider
+    return previous
@@ -0,0 +1,54 @@
+# api/providers/base.py
+"""
+Interface every market-data backend implements.
+"""
+import asyncio
+
+
+class UpstreamError(Exception):
+    """
+    The upstream failed in a way the client library swallowed (e.g.
+    yf.download returning nothing but errors).
+    """
+
+
+class MarketDataProvider:
+    """
+    Market data used by the API. Every method may raise on upstream failure;
+    callers decide how to degrade.
+
+    - search(query, limit) -> [{"symbol", "name", "exchange"}, ...]
+    - info(symbol)         -> yfinance-style info dict (regularMarketPrice,
+                              regularMarketChange, regularMarketChangePercent,
+                              longName, exchangeName, sector, industry, ...);
+                              {} when the symbol is unknown
+    - history(symbols, period, interval)
+                           -> DataFrame indexed by bar timestamp with
+                              (field, symbol) MultiIndex columns, fields being
+                              Open/High/Low/Close/Volume (like yf.download
+                              with group_by="column")
+
+    asearch/ainfo/ahistory are the async variants used by the async views.
+    By default they run the sync method in a worker thread; providers with a
+    native async client override them.
+    """
+
+    name = "base"
+
+    def search(self, query, limit=10):
+        raise NotImplementedError
+
+    def info(self, symbol):
+        raise NotImplementedError
+
+    def history(self, symbols, period="2d", interval="1d"):
+        raise NotImplementedError
+
+    async def asearch(self, query, limit=10):
+        return await asyncio.to_thread(self.search, query, limit)
+
+    async def ainfo(self, symbol):
+        return await asyncio.to_thread(self.info, symbol)
+
+    async def ahistory(self, symbols, period="2d", interval="1d"):
+        return await asyncio.to_thread(self.history, symbols, period, interval)
@@ -0,0 +1,32 @@
+# api/providers/breaker.py
+from .base import MarketDataProvider
+
+
+class BreakerProvider(MarketDataProvider):
+    """
+    Routes every call to another provider through a CircuitBreaker, so an
+    upstream outage fails fast with CircuitOpenError.
+    """
+
+    def __init__(self, inner, breaker):
+        self.inner = inner
+        self.breaker = breaker
+        self.name = inner.name
+
+    def search(self, query, limit=10):
+        return self.breaker.call(self.inner.search, query, limit)
+
+    def info(self, symbol):
+        return self.breaker.call(self.inner.info, symbol)
+
+    def history(self, symbols, period="2d", interval="1d"):
+        return self.breaker.call(self.inner.history, symbols, period, interval)
+
+    async def asearch(self, query, limit=10):
+        return await self.breaker.acall(self.inner.asearch, query, limit)
+
+    async def ainfo(self, symbol):
+        return await self.breaker.acall(self.inner.ainfo, symbol)
+
+    async def ahistory(self, symbols, period="2d", interval="1d"):
+        return await self.breaker.acall(self.inner.ahistory, symbols, period, interval)
@@ -0,0 +1,54 @@
+# api/providers/metered.py
+import time
+
+from .. import metrics
+from .base import MarketDataProvider
+
+
+class MeteredProvider(MarketDataProvider):
+    """
+    Wraps another provider and records the count and duration of every call
+    in api.metrics (globally and against the current request).
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+
+    def _call(self, method, *args):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = getattr(self.inner, method)(*args)
+            outcome = "ok"
+            return result
+        finally:
+            metrics.record_upstream(method, time.perf_counter() - started, outcome)
+
+    async def _acall(self, method, *args):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await getattr(self.inner, method)(*args)
+            outcome = "ok"
+            return result
+        finally:
+            metrics.record_upstream(method[1:], time.perf_counter() - started, outcome)
+
+    def search(self, query, limit=10):
+        return self._call("search", query, limit)
+
+    def info(self, symbol):
+        return self._call("info", symbol)
+
+    def history(self, symbols, period="2d", interval="1d"):
+        return self._call("history", symbols, period, interval)
+
+    async def asearch(self, query, limit=10):
+        return await self._acall("asearch", query, limit)
+
+    async def ainfo(self, symbol):
+        return await self._acall("ainfo", symbol)
+
+    async def ahistory(self, symbols, period="2d", interval="1d"):
+        return await self._acall("ahistory", symbols, period, interval)
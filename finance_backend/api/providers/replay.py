@@ -0,0 +1,93 @@
+# api/providers/replay.py
+"""
+Record/replay backend: captures responses from another provider to disk and
+serves them back later without network access.
+
+Each call is stored as one JSON file named after the method and a hash of
+its arguments, so a recorded directory can be committed alongside a
+benchmark and replayed byte-for-byte.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+from .base import MarketDataProvider
+
+
+class ReplayMissError(LookupError):
+    """
+    Raised when a replayed call was never recorded.
+    """
+
+
+def _key(method, args):
+    digest = hashlib.sha1(json.dumps([method, args], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return f"{method}-{digest}.json"
+
+
+def _encode_frame(df):
+    return {
+        "__frame__": True,
+        "index": [ts.isoformat() for ts in pd.DatetimeIndex(df.index)],
+        "columns": [list(c) if isinstance(c, tuple) else [c] for c in df.columns],
+        # NaN isn't valid JSON; store it as null
+        "data": df.astype(object).where(df.notna(), None).values.tolist(),
+    }
+
+
+def _decode_frame(payload):
+    columns = [tuple(c) if len(c) > 1 else c[0] for c in payload["columns"]]
+    if columns and isinstance(columns[0], tuple):
+        columns = pd.MultiIndex.from_tuples(columns)
+    df = pd.DataFrame(payload["data"], index=pd.DatetimeIndex(payload["index"]), columns=columns)
+    return df.astype(float)
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Replays responses recorded in `directory`.
+
+    With `record_from` set (another provider), calls that have no recording
+    are forwarded to it and the response is saved, which is how recordings
+    are captured in the first place. Without it, a missing recording raises
+    ReplayMissError, so replayed runs never touch the network by accident.
+    Upstream exceptions are not recorded.
+    """
+
+    name = "replay"
+
+    def __init__(self, directory, record_from=None):
+        self.directory = directory
+        self.record_from = record_from
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, method, args):
+        return os.path.join(self.directory, _key(method, args))
+
+    def _call(self, method, args, encode=lambda v: v, decode=lambda v: v):
+        path = self._path(method, args)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return decode(json.load(f)["response"])
+
+        if self.record_from is None:
+            raise ReplayMissError(f"no recording for {method}{tuple(args)} in {self.directory}")
+
+        value = getattr(self.record_from, method)(*args)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".rec-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"method": method, "args": args, "response": encode(value)}, f, default=str)
+        os.replace(tmp_path, path)
+        return value
+
+    def search(self, query, limit=10):
+        return self._call("search", [query, limit])
+
+    def info(self, symbol):
+        return self._call("info", [symbol])
+
+    def history(self, symbols, period="2d", interval="1d"):
+        return self._call("history", [list(symbols), period, interval], _encode_frame, _decode_frame)
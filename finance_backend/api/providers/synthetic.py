@@ -0,0 +1,152 @@
+# api/providers/synthetic.py
+import asyncio
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .base import MarketDataProvider
+
+# Business days per yfinance-style period string
+_PERIOD_DAYS = {
+    "1d": 1, "2d": 2, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126,
+    "1y": 252, "2y": 504, "5y": 1260, "10y": 2520, "ytd": 252, "max": 2520,
+}
+
+
+def _seed(*parts):
+    # crc32 rather than hash() so values are identical across processes
+    return zlib.crc32("|".join(str(p) for p in parts).encode("utf-8"))
+
+
+def period_days(period):
+    try:
+        return _PERIOD_DAYS[period]
+    except KeyError:
+        raise ValueError(f"unsupported period {period!r}")
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic, network-free market data for load tests and benchmarks.
+
+    Each symbol gets seeded daily bars; the bar for a given (symbol, date) is
+    always the same, so runs are reproducible. An optional
+    latency (seconds) is slept on every call to mimic upstream round trips;
+    the async methods sleep with asyncio, like a real non-blocking client.
+    Search runs over `companies` (records with symbol/name/exchange) if given.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, companies=None, latency=0.0, end_date=None):
+        self.companies = list(companies or [])
+        self.latency = latency
+        self.end_date = end_date
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    async def _asleep(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _end(self):
+        end = pd.Timestamp(self.end_date) if self.end_date else pd.Timestamp.today()
+        return end.normalize()
+
+    def bars(self, symbol, days):
+        """
+        OHLCV DataFrame for the last `days` business days of symbol.
+
+        The log price is a closed-form function of the day number (two
+        seeded cycles, a drift and hash-style noise), so any window of dates
+        yields the same bar for the same day and no random walk has to be
+        replayed from an epoch.
+        """
+        dates = pd.bdate_range(end=self._end(), periods=days)
+        rng = np.random.default_rng(_seed(symbol))
+        base, vol = rng.uniform(5, 500), rng.uniform(0.01, 0.04)
+        periods, phases = rng.uniform([20, 90], [60, 400]), rng.uniform(0, 2 * np.pi, 2)
+        drift, salt = rng.normal(0.03, 0.05), rng.uniform(0, 1000)
+
+        def log_price(t):
+            cycles = (vol * 4) * np.sin(2 * np.pi * t / periods[0] + phases[0]) \
+                + (vol * 10) * np.sin(2 * np.pi * t / periods[1] + phases[1])
+            noise = np.modf(np.abs(np.sin(t * 12.9898 + salt)) * 43758.5453)[0] - 0.5
+            return np.log(base) + cycles + drift * t / 365.25 + vol * 2 * noise
+
+        t = (dates - pd.Timestamp("2015-01-01")).days.to_numpy(dtype=float)
+        close = np.exp(log_price(t))
+        open_ = np.exp(log_price(t - 0.5))
+        spread = vol / 2
+        return pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + spread),
+            "Low": np.minimum(open_, close) * (1 - spread),
+            "Close": close,
+            "Volume": np.round(1e6 * (1 + np.abs(np.log(close / open_)) * 50)),
+        }, index=dates)
+
+    def search(self, query, limit=10):
+        self._sleep()
+        return self._search(query, limit)
+
+    async def asearch(self, query, limit=10):
+        await self._asleep()
+        return self._search(query, limit)
+
+    def _search(self, query, limit):
+        q = query.strip().lower()
+        if not self.companies:
+            return [{"symbol": query.strip().upper(), "name": f"{query.strip().upper()} Synthetic Corp", "exchange": "SYN"}]
+        return [
+            {"symbol": c["symbol"], "name": c["name"], "exchange": c.get("exchange", "")}
+            for c in self.companies
+            if c["symbol"].lower().startswith(q) or q in c["name"].lower()
+        ][:limit]
+
+    def info(self, symbol):
+        self._sleep()
+        return self._info(symbol)
+
+    async def ainfo(self, symbol):
+        await self._asleep()
+        return self._info(symbol)
+
+    def _info(self, symbol):
+        bars = self.bars(symbol, 2)
+        price, previous = float(bars["Close"].iloc[-1]), float(bars["Close"].iloc[-2])
+        rng = np.random.default_rng(_seed("profile", symbol))
+        sector = ["Technology", "Healthcare", "Financial Services", "Energy", "Industrials"][int(rng.integers(5))]
+        return {
+            "symbol": symbol,
+            "shortName": f"{symbol} Synthetic",
+            "longName": f"{symbol} Synthetic Corporation",
+            "regularMarketPrice": price,
+            "regularMarketChange": price - previous,
+            "regularMarketChangePercent": (price - previous) / previous * 100,
+            "exchangeName": "SYN",
+            "sector": sector,
+            "industry": f"{sector} Services",
+            "longBusinessSummary": f"{symbol} is a synthetic company used for offline testing.",
+            "website": f"https://{symbol.lower()}.example.com",
+            "country": "United States",
+        }
+
+    def history(self, symbols, period="2d", interval="1d"):
+        self._sleep()
+        return self._history(symbols, period)
+
+    async def ahistory(self, symbols, period="2d", interval="1d"):
+        await self._asleep()
+        return self._history(symbols, period)
+
+    def _history(self, symbols, period):
+        days = period_days(period)
+        frames = {symbol: self.bars(symbol, days) for symbol in symbols}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1, level=0, sort_remaining=False)
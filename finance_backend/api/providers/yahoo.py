@@ -0,0 +1,232 @@
+# api/providers/yahoo.py
+import asyncio
+import logging
+import threading
+from urllib.parse import quote
+import weakref
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from .. import http_client
+from .base import MarketDataProvider, UpstreamError
+
+try:
+    import httpx
+except ImportError:  # optional: without it the async methods run in threads
+    httpx = None
+
+SEARCH_URL = "https://query2.finance.yahoo.com/v1/finance/search"
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+HEADERS = {"User-Agent": http_client.USER_AGENT}
+
+# Intervals whose bars are whole days; their timestamps are normalized to dates
+_DAILY_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def _search_params(query, limit):
+    return {"q": query, "lang": "en-US", "region": "US", "quotesCount": limit, "newsCount": 0}
+
+
+def _parse_search(data):
+    return [
+        {
+            'symbol': item.get('symbol'),
+            'name': item.get('shortname') or item.get('longname'),
+            'exchange': item.get('exchange')
+        }
+        for item in data.get('quotes', [])
+        if item.get('symbol') and (item.get('shortname') or item.get('longname'))
+    ]
+
+
+def _parse_chart(data, interval):
+    """
+    One symbol's v8 chart response -> OHLCV DataFrame, adjusted for splits
+    and dividends like yf.download(auto_adjust=True). None if there are no bars.
+    """
+    result = ((data or {}).get("chart") or {}).get("result") or []
+    if not result or not result[0].get("timestamp"):
+        return None
+    result = result[0]
+    index = pd.to_datetime(result["timestamp"], unit="s")
+    if interval in _DAILY_INTERVALS:
+        index = index.normalize()
+    bars = result["indicators"]["quote"][0]
+    frame = pd.DataFrame({f: bars.get(f.lower()) for f in _FIELDS}, index=index, dtype=float)
+    adjclose = result["indicators"].get("adjclose")
+    if adjclose:
+        ratio = np.asarray(adjclose[0].get("adjclose"), dtype=float) / frame["Close"].to_numpy()
+        frame[_FIELDS[:4]] = frame[_FIELDS[:4]].mul(ratio, axis=0)
+    return frame[~frame.index.duplicated(keep="last")]
+
+
+class _DownloadErrors(logging.Handler):
+    """
+    Collects the errors yf.download logs (it never raises) for the calling
+    thread, so a rate-limited or failed download can be told apart from
+    symbols that simply have no data.
+    """
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self._local = threading.local()
+
+    def emit(self, record):
+        messages = getattr(self._local, "messages", None)
+        if messages is not None:
+            messages.append(record.getMessage())
+
+    def start(self):
+        self._local.messages = []
+
+    def stop(self):
+        messages, self._local.messages = self._local.messages, None
+        return messages
+
+
+_download_errors = _DownloadErrors()
+logging.getLogger("yfinance").addHandler(_download_errors)
+
+
+class YahooProvider(MarketDataProvider):
+    """
+    Live data from Yahoo Finance (search API + yfinance).
+
+    Sync calls share keep-alive connections: search goes through the pooled
+    requests session in api.http_client, and every yfinance call reuses one
+    curl_cffi session with yfinance's own retries enabled.
+
+    The async methods use one pooled httpx.AsyncClient per event loop, so a
+    single ASGI worker can keep many upstream requests in flight: search hits
+    the search API and history the v8 chart API (one request per symbol, all
+    concurrent). ainfo still goes through yfinance in a thread, since the
+    profile endpoints need yfinance's cookie/crumb handling.
+    """
+
+    name = "yahoo"
+
+    def __init__(self, timeout=10, max_connections=100, retries=2):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.retries = retries
+        self._clients = weakref.WeakKeyDictionary()   # event loop -> AsyncClient
+        yf.set_config(retries=retries)
+
+    def search(self, query, limit=10):
+        r = http_client.get(SEARCH_URL, params=_search_params(query, limit), timeout=self.timeout)
+        r.raise_for_status()
+        return _parse_search(r.json())
+
+    def info(self, symbol):
+        # A fresh Ticker per call (a reused one would cache .info forever),
+        # but on the shared session rather than a new one each time
+        ticker = yf.Ticker(symbol, session=http_client.yfinance_session())
+
+        # Try new method (get_info), fallback to fast_info
+        error = None
+        try:
+            info = ticker.get_info() or {}
+        except Exception as e:
+            info, error = {}, e
+
+        if not info:
+            try:
+                fi = ticker.fast_info
+                info = {
+                    "symbol": symbol,
+                    "longName": getattr(fi, "shortName", symbol),
+                    "regularMarketPrice": getattr(fi, "last_price", None),
+                    "exchangeName": getattr(fi, "exchange", None),
+                }
+            except Exception:
+                # Both failed: an upstream error rather than an unknown symbol
+                if error is not None:
+                    raise error
+                info = {}
+
+        return info
+
+    def history(self, symbols, period="2d", interval="1d"):
+        symbols = list(symbols)
+        _download_errors.start()
+        try:
+            data = yf.download(
+                tickers=symbols,
+                period=period,
+                interval=interval,
+                group_by="column",
+                auto_adjust=True,
+                threads=False,
+                progress=False,
+                timeout=self.timeout,
+                session=http_client.yfinance_session(),
+            )
+        finally:
+            errors = _download_errors.stop()
+        if data is None or data.empty:
+            # "possibly delisted" / "no price data" just mean unknown symbols;
+            # anything else (rate limits, timeouts) is an upstream failure
+            failures = [m for m in errors if "Failed download" not in m
+                        and "delisted" not in m and "no price data" not in m.lower()]
+            if failures:
+                raise UpstreamError("; ".join(failures)[:500])
+            return pd.DataFrame(columns=pd.MultiIndex.from_product([["Close"], symbols]))
+
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([data.columns, symbols[:1]])
+
+        # yfinance reports tickers upper-cased; key the columns by what was asked for
+        requested = {sym.upper(): sym for sym in symbols}
+        return data.rename(columns=lambda c: requested.get(str(c).upper(), c), level=1)
+
+    # --------------------
+    # Async (pooled httpx client)
+    # --------------------
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                headers=HEADERS,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                transport=httpx.AsyncHTTPTransport(retries=self.retries),   # connection errors only
+            )
+            self._clients[loop] = client
+        return client
+
+    async def asearch(self, query, limit=10):
+        if httpx is None:
+            return await super().asearch(query, limit)
+        r = await self._async_client().get(SEARCH_URL, params=_search_params(query, limit))
+        r.raise_for_status()
+        return _parse_search(r.json())
+
+    async def _achart(self, symbol, period, interval):
+        r = await self._async_client().get(CHART_URL.format(symbol=quote(symbol)),
+                                           params={"range": period, "interval": interval})
+        if r.status_code == 404:   # unknown symbol
+            return None
+        r.raise_for_status()
+        return _parse_chart(r.json(), interval)
+
+    async def ahistory(self, symbols, period="2d", interval="1d"):
+        if httpx is None:
+            return await super().ahistory(symbols, period, interval)
+        symbols = list(symbols)
+        frames = await asyncio.gather(*(self._achart(s, period, interval) for s in symbols),
+                                      return_exceptions=True)
+        errors = [f for f in frames if isinstance(f, Exception)]
+        # Like yf.download: failed symbols come back empty unless they all failed
+        if errors and len(errors) == len(symbols):
+            raise errors[0]
+        found = {s: f for s, f in zip(symbols, frames) if isinstance(f, pd.DataFrame)}
+        columns = pd.MultiIndex.from_product([_FIELDS, symbols])
+        if not found:
+            return pd.DataFrame(columns=pd.MultiIndex.from_product([["Close"], symbols]))
+        data = pd.concat(found, axis=1).swaplevel(0, 1, axis=1)
+        return data.reindex(columns=columns)
@@ -0,0 +1,207 @@
+# api/quote_cache.py
+"""
+Process-wide quote cache shared by the serializers and views.
+
+Entries expire after a TTL and the cache is bounded: once it is full the
+least recently used symbol is evicted. Hit/miss counters are kept so we can
+confirm how many upstream calls the cache saves.
+
+Expired entries stay in the cache until evicted, so get_stale() can still
+return the last known value while the upstream is failing.
+
+get_or_fetch() keeps empty results ({} for an unknown symbol, or what a
+failing upstream returned) only for a short negative TTL, locally, so a
+transient failure doesn't blank a quote for the whole TTL.
+
+A cache given a shared store (api/quote_store.py) and namespace reads
+through to it on a local miss and writes every set() through to it, so
+other worker processes reuse what this one fetched.
+"""
+import asyncio
+from collections import OrderedDict
+from threading import Lock
+import time
+
+from django.conf import settings
+
+from .quote_store import shared_store
+
+
+class QuoteCache:
+    """
+    Thread-safe TTL + LRU cache keyed by symbol, optionally backed by a
+    shared QuoteStore.
+    """
+
+    def __init__(self, ttl=30, max_size=2048, store=None, namespace=None, negative_ttl=5):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.store = store
+        self.namespace = namespace
+        self._data = OrderedDict()   # symbol -> (stored_at, value)
+        self._empty = {}   # symbol -> when fetch() last returned nothing
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0   # hits served from the shared store
+        self.evictions = 0
+
+    def _put(self, symbol, stored_at, value):
+        # Caller holds the lock
+        self._data[symbol] = (stored_at, value)
+        self._data.move_to_end(symbol)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, symbols, max_age):
+        """
+        Look symbols up in the shared store and copy entries newer than the
+        local ones into this cache. Returns {symbol: (value, age)}.
+        """
+        if self.store is None or not symbols:
+            return {}
+        found = self.store.get_many(self.namespace, symbols, max_age)
+        now = time.monotonic()
+        with self._lock:
+            for symbol, (value, age) in found.items():
+                entry = self._data.get(symbol)
+                if entry is None or now - entry[0] > age:
+                    self._put(symbol, now - age, value)
+        return found
+
+    def get_many(self, symbols, max_age=None):
+        """
+        Return {symbol: value} for the symbols cached and unexpired (or no
+        older than max_age if given), locally or in the shared store (one
+        lookup for all local misses).
+        """
+        max_age = self.ttl if max_age is None else max_age
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for symbol in symbols:
+                entry = self._data.get(symbol)
+                if entry is not None and now - entry[0] < max_age:
+                    self._data.move_to_end(symbol)
+                    found[symbol] = entry[1]
+                else:
+                    missing.append(symbol)
+        shared = self._load(missing, max_age)
+        for symbol, (value, _) in shared.items():
+            found[symbol] = value
+        with self._lock:
+            self.hits += len(found)
+            self.store_hits += len(shared)
+            self.misses += len(missing) - len(shared)
+        return found
+
+    def get(self, symbol):
+        """
+        Return the cached value for symbol, or None if missing or expired.
+        """
+        return self.get_many([symbol]).get(symbol)
+
+    def get_stale(self, symbol, max_age=None):
+        """
+        Return (value, age in seconds) for symbol whether or not it has
+        expired, or (None, None) if it isn't cached or is older than max_age.
+        """
+        with self._lock:
+            entry = self._data.get(symbol)
+        now = time.monotonic()
+        if entry is None or now - entry[0] >= self.ttl:
+            # Another worker may have a newer copy
+            shared = self._load([symbol], max_age).get(symbol)
+            if shared is not None and (entry is None or now - entry[0] > shared[1]):
+                return shared
+        if entry is None:
+            return None, None
+        age = now - entry[0]
+        if max_age is not None and age > max_age:
+            return None, None
+        return entry[1], age
+
+    def set(self, symbol, value):
+        self.set_many({symbol: value})
+
+    def set_many(self, items):
+        now = time.monotonic()
+        with self._lock:
+            for symbol, value in items.items():
+                self._put(symbol, now, value)
+        if self.store is not None:
+            self.store.set_many(self.namespace, items)
+
+    def get_or_fetch(self, symbol, fetch):
+        """
+        Return the cached value for symbol, calling fetch(symbol) on a miss.
+        The fetch runs outside the lock so slow upstream calls don't block
+        readers of other symbols. Empty results aren't cached; they are
+        returned as-is for negative_ttl seconds before fetching again.
+        """
+        value = self.get(symbol)
+        if value is not None:
+            return value
+        if self._recently_empty(symbol):
+            return {}
+        return self._fetched(symbol, fetch(symbol))
+
+    async def aget_or_fetch(self, symbol, fetch):
+        """
+        get_or_fetch for a coroutine fetch(symbol). The cache and shared
+        store lookups run in a worker thread, off the event loop.
+        """
+        value = await asyncio.to_thread(self.get, symbol)
+        if value is not None:
+            return value
+        if self._recently_empty(symbol):
+            return {}
+        return await asyncio.to_thread(self._fetched, symbol, await fetch(symbol))
+
+    def _recently_empty(self, symbol):
+        with self._lock:
+            empty_at = self._empty.get(symbol)
+        return empty_at is not None and time.monotonic() - empty_at < self.negative_ttl
+
+    def _fetched(self, symbol, value):
+        with self._lock:
+            if value:
+                self._empty.pop(symbol, None)
+            else:
+                self._empty[symbol] = time.monotonic()
+                if len(self._empty) > self.max_size:
+                    self._empty.pop(next(iter(self._empty)))
+        if value:
+            self.set(symbol, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._empty.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+quote_cache = QuoteCache(
+    ttl=getattr(settings, "QUOTE_CACHE_TTL", 30),
+    max_size=getattr(settings, "QUOTE_CACHE_MAX_SIZE", 2048),
+    store=shared_store,
+    namespace="info",
+    negative_ttl=getattr(settings, "QUOTE_CACHE_NEGATIVE_TTL", 5),
+)
@@ -0,0 +1,210 @@
+# api/quote_store.py
+"""
+Quote store shared by every worker process of a deployment.
+
+Each worker's QuoteCache keeps a local in-memory tier, and on a local miss
+it consults this store before calling upstream. Whatever one worker
+fetches is written through, so with N gunicorn workers a symbol is fetched
+about once per TTL instead of N times.
+
+Backends (QUOTE_STORE setting):
+
+sqlite  default. A local SQLite file in WAL mode (QUOTE_STORE_PATH), so
+        readers never block on the writer and no outside service is
+        needed. Shared by the workers on one host.
+none    no sharing; every worker keeps only its own cache.
+
+Values are stored as JSON under (namespace, key) with their write time.
+The store is an optimization only: any error is counted (per operation)
+and treated as a miss or a skipped write, never raised to the request. The
+first failure of an operation after it last succeeded is logged, so an
+outage shows up once in the log rather than once per request.
+"""
+import json
+import logging
+import os
+import sqlite3
+from threading import Lock, local
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+_OPERATIONS = ("read", "write", "prune", "clear")
+
+
+class QuoteStore:
+    """
+    Backend interface; this base class shares nothing.
+    """
+    name = "none"
+
+    def get_many(self, namespace, keys, max_age=None):
+        """
+        Return {key: (value, age in seconds)} for the keys stored under
+        namespace no older than max_age.
+        """
+        return {}
+
+    def set_many(self, namespace, items):
+        """
+        Store {key: value} under namespace.
+        """
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"backend": self.name, "hits": 0, "misses": 0, "writes": 0, "errors": 0,
+                "errors_by_op": dict.fromkeys(_OPERATIONS, 0)}
+
+
+class SQLiteQuoteStore(QuoteStore):
+    name = "sqlite"
+    # Writes that can't get the lock within this many seconds are dropped
+    # rather than holding up the request
+    BUSY_TIMEOUT = 0.5
+    PRUNE_EVERY = 1000   # writes between deletions of expired rows
+
+    def __init__(self, path, retention=6 * 3600):
+        self.path = str(path)
+        self.retention = retention
+        self._local = local()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self.errors_by_op = dict.fromkeys(_OPERATIONS, 0)
+        self._failing = set()   # operations whose last attempt failed
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork (gunicorn --preload)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")   # durable enough for a cache
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quotes ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, stored_at REAL NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+        except sqlite3.Error:
+            conn.close()
+            raise
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, op=None, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+            self._failing.discard(op)
+
+    def _failed(self, op, error, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+            self.errors += 1
+            self.errors_by_op[op] += 1
+            first = op not in self._failing
+            self._failing.add(op)
+        if first:
+            logger.warning("Quote store %s failed (%s): %r; carrying on without it", op, self.path, error)
+
+    def get_many(self, namespace, keys, max_age=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        oldest = now - max_age if max_age is not None else 0.0
+        found = {}
+        corrupt = None
+        try:
+            conn = self._connect()
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, stored_at, value FROM quotes WHERE namespace = ? AND stored_at >= ? "
+                    f"AND key IN ({','.join('?' * len(batch))})",
+                    [namespace, oldest, *batch],
+                ).fetchall()
+                for key, stored_at, value in rows:
+                    try:
+                        found[key] = (json.loads(value), max(0.0, now - stored_at))
+                    except ValueError as e:
+                        corrupt = e   # a miss for this key only
+        except sqlite3.Error as e:
+            self._failed("read", e, misses=len(keys))
+            return {}
+        if corrupt is not None:
+            self._failed("read", corrupt, hits=len(found), misses=len(keys) - len(found))
+        else:
+            self._count("read", hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def set_many(self, namespace, items):
+        if not items:
+            return
+        now = time.time()
+        try:
+            rows = [(namespace, key, now, json.dumps(value, default=str)) for key, value in items.items()]
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("INSERT OR REPLACE INTO quotes VALUES (?, ?, ?, ?)", rows)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self._failed("write", e)
+            return
+        with self._lock:
+            before = self.writes // self.PRUNE_EVERY
+            self.writes += len(rows)
+            prune = self.writes // self.PRUNE_EVERY != before
+            self._failing.discard("write")
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """
+        Delete rows older than the retention period.
+        """
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM quotes WHERE stored_at < ?", (time.time() - self.retention,))
+        except sqlite3.Error as e:
+            self._failed("prune", e)
+
+    def clear(self):
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM quotes")
+        except sqlite3.Error as e:
+            self._failed("clear", e)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": self.name, "hits": self.hits, "misses": self.misses,
+                    "writes": self.writes, "errors": self.errors, "errors_by_op": dict(self.errors_by_op)}
+
+
+def build_quote_store(name=None):
+    """
+    Construct the store named by QUOTE_STORE.
+    """
+    name = (name or getattr(settings, "QUOTE_STORE", "sqlite")).lower()
+    if name == "none":
+        return QuoteStore()
+    if name == "sqlite":
+        return SQLiteQuoteStore(
+            getattr(settings, "QUOTE_STORE_PATH", settings.BASE_DIR / "quote_store.sqlite3"),
+            retention=getattr(settings, "UPSTREAM_STALE_MAX_AGE", 6 * 3600),
+        )
+    raise ValueError(f"Unknown QUOTE_STORE {name!r}")
+
+
+shared_store = build_quote_store()
@@ -0,0 +1,38 @@
+# api/renderers.py
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .fast_json import RawJSON, dumps, finite
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    DRF's JSONRenderer encoding through api.fast_json: numpy values and
+    NaN (as null) are handled natively, and RawJSON bodies pass through.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, RawJSON):
+            return bytes(data)
+        # The browsable API asks for an indent, which orjson can't do
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(finite(data), accepted_media_type, renderer_context)
+        return dumps(data, default=self.encoder_class().default)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON: one line per item of a list, otherwise one line
+    (error bodies). Large listings are streamed by the view instead.
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, list):
+            return b"".join(dumps(item) + b"\n" for item in data)
+        return dumps(data) + b"\n"
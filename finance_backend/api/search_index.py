@@ -0,0 +1,236 @@
+# api/search_index.py
+"""
+In-process symbol / company-name search over the company universe.
+
+- Symbol prefix lookups use a sorted symbol array and binary search.
+- Name lookups use sorted lists of normalized names (lower-case words
+  joined by single spaces) and of name words, so the query is matched as a
+  prefix of the name or every query word as a prefix of some word in the
+  name.
+- Typos are handled with a deletion index (edit distance 1) over symbols and
+  name words: a sorted array of every word with one letter deleted, all of
+  a query's variants looked up in one np.searchsorted call.
+
+The index is built straight from the symbol/name columns. Every sorted
+list is a numpy array of fixed-width byte strings with int32 arrays
+alongside, so it costs about 2 MB per worker rather than the tens of MB
+of dicts and sets of str.
+
+Ranking is deterministic, by tier:
+
+1. exact symbol, then symbol prefixes, in symbol order
+2. names starting with the query as whole words ("apple" in "Apple Inc.")
+3. other names starting with the query ("appl" in "AppLovin")
+4. names with every query word as a word prefix
+5. fuzzy matches
+
+Within tiers 2-5 a shorter name ranks first (the query covers more of it),
+then symbol. That order is fixed per row, so rows are indexed by their
+rank and each tier's candidates come out of a sorted range, or an
+intersection of ranges, from which only the best `limit` are taken. Tiers
+are searched only while the page isn't full.
+"""
+import re
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Fuzzy matching on very short queries mostly returns noise
+MIN_FUZZY_LENGTH = 3
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _keys(values):
+    return np.array([v.encode("utf-8") for v in values], dtype=bytes)
+
+
+def _prefix_range(sorted_keys, prefix):
+    """
+    Return (lo, hi) so that sorted_keys[lo:hi] are the keys starting with prefix.
+    """
+    prefix = prefix.encode("utf-8")
+    lo, hi = np.searchsorted(sorted_keys, [prefix, prefix + b"\xff"])
+    return int(lo), int(hi)
+
+
+def _equal_ranges(sorted_keys, values):
+    """
+    Return (lo, hi) arrays so that sorted_keys[lo[i]:hi[i]] equal values[i]
+    (a bytes array, or any iterable of str).
+    """
+    if not isinstance(values, np.ndarray):
+        values = _keys(values)
+    return np.searchsorted(sorted_keys, values, "left"), np.searchsorted(sorted_keys, values, "right")
+
+
+def _sorted_pairs(keys, values):
+    """
+    Sort a bytes array of keys and their int values by key, into the sorted
+    keys and an int32 array of values.
+    """
+    order = np.argsort(keys, kind="stable")
+    return keys[order], np.asarray(values, dtype=np.int32)[order]
+
+
+def _deletion_variants(words):
+    """
+    Each of words (a bytes array) and each with one byte deleted, with the
+    position of its word. Built on the bytes as a matrix, so no string per
+    variant is ever allocated: the allocator would keep that peak for the
+    life of the worker.
+    """
+    width = words.dtype.itemsize
+    chars = words.view(np.uint8).reshape(len(words), width)
+    lengths = np.char.str_len(words)
+    keys, positions = [words], [np.arange(len(words))]
+    for i in range(width):
+        rows = np.flatnonzero(lengths > i)
+        deleted = np.zeros((len(rows), width), dtype=np.uint8)
+        deleted[:, :-1] = np.delete(chars[rows], i, axis=1)
+        keys.append(deleted.view(words.dtype).ravel())
+        positions.append(rows)
+    return np.concatenate(keys), np.concatenate(positions)
+
+
+def _best(ranks, taken, limit):
+    """
+    The `limit` smallest of ranks not in taken, in order.
+    """
+    # At most len(taken) of the smallest limit + len(taken) are taken
+    size = limit + len(taken)
+    if len(ranks) > size:
+        ranks = np.partition(ranks, size - 1)[:size]
+    return [r for r in np.sort(ranks).tolist() if r not in taken][:limit]
+
+
+class SearchIndex:
+    """
+    Search over the symbol, name and exchange columns of a CompanyUniverse
+    (any sequences of str of the same length).
+    """
+
+    def __init__(self, symbols, names, exchanges):
+        self.symbols = symbols
+        self.names = names
+        self.exchanges = exchanges
+
+        symbol_list = list(symbols)
+        name_list = list(names)
+        present = [i for i, s in enumerate(symbol_list) if s]
+        self._symbol_keys, self._symbol_rows = _sorted_pairs(_keys(symbol_list[i].upper() for i in present), present)
+
+        # Row order of tiers 2-5, and each row's position in it
+        order = sorted(range(len(name_list)), key=lambda i: (len(name_list[i]), symbol_list[i], i))
+        self._rank_rows = np.array(order, dtype=np.int32)
+        self._row_ranks = rank = np.empty(len(order), dtype=np.int32)
+        rank[self._rank_rows] = np.arange(len(order), dtype=np.int32)
+
+        words = [tokenize(name) for name in name_list]
+        named = [i for i, w in enumerate(words) if w]
+        self._name_keys, self._name_ranks = _sorted_pairs(_keys(" ".join(words[i]) for i in named), rank[named])
+        token_rows = [i for i, w in enumerate(words) for _ in dict.fromkeys(w)]
+        self._token_keys, self._token_ranks = _sorted_pairs(
+            _keys(tok for w in words for tok in dict.fromkeys(w)), rank[token_rows]
+        )
+
+        # Deletion variant -> word (lower-cased symbol or name token), for
+        # edit-distance-1 lookups, and each word's ranges in the token and
+        # symbol arrays above
+        fuzzy = {word for w in words for word in w}
+        fuzzy.update(s.lower() for s in symbol_list)
+        fuzzy = _keys(sorted(word for word in fuzzy if len(word) >= MIN_FUZZY_LENGTH))
+        self._variant_keys, self._variant_words = _sorted_pairs(*_deletion_variants(fuzzy))
+        self._word_tokens = np.stack(_equal_ranges(self._token_keys, fuzzy), axis=1).astype(np.int32)
+        self._word_symbols = np.stack(
+            _equal_ranges(self._symbol_keys, np.char.upper(fuzzy)), axis=1
+        ).astype(np.int32)
+
+    def _rank_of(self, rows):
+        return self._row_ranks[rows].tolist()
+
+    def _symbol_prefix_rows(self, prefix, limit):
+        lo, hi = _prefix_range(self._symbol_keys, prefix)
+        return self._symbol_rows[lo:min(hi, lo + limit)].tolist()
+
+    def _name_prefix_ranks(self, phrase, whole_words):
+        """
+        Ranks of the names starting with phrase: as whole words, or not.
+        """
+        lo, hi = _prefix_range(self._name_keys, phrase)
+        # A space sorts before any word character, so the names continuing
+        # with a new word (or ending) come first in the range
+        mid = lo + int(np.searchsorted(self._name_keys[lo:hi], (phrase + "!").encode("utf-8")))
+        return self._name_ranks[lo:mid] if whole_words else self._name_ranks[mid:hi]
+
+    def _token_prefix_ranks(self, words):
+        """
+        Ranks of the names with a word starting with each of words, starting
+        from the most selective word.
+        """
+        ranges = sorted((_prefix_range(self._token_keys, word) for word in words), key=lambda r: r[1] - r[0])
+        ranks = None
+        for lo, hi in ranges:
+            matched = self._token_ranks[lo:hi]
+            ranks = np.unique(matched) if ranks is None else np.intersect1d(ranks, matched)
+            if not len(ranks):
+                break
+        return ranks
+
+    def _fuzzy_ranks(self, word):
+        """
+        Ranks of the rows with a symbol or name word within one edit of word.
+        """
+        matched = set()
+        for lo, hi in zip(*_equal_ranges(self._variant_keys, _deletes(word) | {word})):
+            matched.update(self._variant_words[lo:hi].tolist())
+        if not matched:
+            return ()
+        ranks = [self._token_ranks[lo:hi] for lo, hi in self._word_tokens[list(matched)].tolist()]
+        ranks += [self._row_ranks[self._symbol_rows[lo:hi]] for lo, hi in self._word_symbols[list(matched)].tolist()]
+        return np.unique(np.concatenate(ranks))
+
+    def search(self, query, limit=10):
+        """
+        Return up to limit records as {"symbol", "name", "exchange"} dicts,
+        best matches first.
+        """
+        query = (query or "").strip()
+        if not query or limit <= 0:
+            return []
+
+        # The exact symbol sorts first in its own prefix range
+        rows = self._symbol_prefix_rows(query.upper(), limit)
+        taken = set()   # ranks of rows already on the page
+        if len(rows) < limit:
+            taken.update(self._rank_of(rows))
+
+        words = tokenize(query)
+        phrase = " ".join(words)
+        tiers = []
+        if words:
+            tiers += [
+                lambda: self._name_prefix_ranks(phrase, whole_words=True),
+                lambda: self._name_prefix_ranks(phrase, whole_words=False),
+                lambda: self._token_prefix_ranks(words),
+            ]
+        if len(words) == 1 and len(phrase) >= MIN_FUZZY_LENGTH:
+            tiers.append(lambda: self._fuzzy_ranks(phrase))
+        for tier in tiers:
+            if len(rows) >= limit:
+                break
+            ranks = _best(np.asarray(tier(), dtype=np.int32), taken, limit - len(rows))
+            taken.update(ranks)
+            rows += self._rank_rows[ranks].tolist()
+
+        return [
+            {"symbol": self.symbols[i], "name": self.names[i], "exchange": self.exchanges[i]}
+            for i in rows
+        ]
@@ -1,24 +1,118 @@
 # api/serializers.py
+from django.conf import settings
+from django.db import models
 from rest_framework import serializers
+from . import prefetch, price_engine
 from .models import Watchlist, WatchlistItem
-import yfinance as yf
+from .quote_cache import quote_cache
+from .singleflight import upstream_flight
+from .providers import get_provider
+
+# Oldest last-known quote served while the upstream is failing (seconds)
+STALE_MAX_AGE = getattr(settings, "UPSTREAM_STALE_MAX_AGE", 6 * 3600)
+
+
+def fetch_ticker_info(symbol):
+    """
+    Fetch info for symbol from the market-data provider; concurrent callers
+    for the same symbol share one upstream call. Raises on upstream failure
+    (including CircuitOpenError while the circuit is open).
+    """
+    return upstream_flight.do(("info", symbol), get_provider().info, symbol)
+
+
+def get_quote(symbol):
+    """
+    Return (info, stale_age) for symbol through the process-wide quote cache.
+    stale_age is None for fresh data; when the upstream call fails the last
+    known info is returned with its age in seconds instead. info is {} if
+    nothing usable is cached.
+    """
+    try:
+        return quote_cache.get_or_fetch(symbol, fetch_ticker_info), None
+    except Exception:
+        info, age = quote_cache.get_stale(symbol, STALE_MAX_AGE)
+        if info is None:
+            return {}, None
+        return info, round(age, 1)
+
+
+def get_quote_info(symbol):
+    return get_quote(symbol)[0]
+
+
+def _info_from_price(result):
+    return {
+        "regularMarketPrice": result["current_price"],
+        "regularMarketChange": result["change"],
+        "regularMarketChangePercent": result["change_percent"],
+    }
+
+
+def cached_quotes(symbols):
+    """
+    {symbol: (info, None)} for the symbols the prefetcher (or any worker's
+    price fetch) has a current price for, in one lookup.
+    """
+    return {
+        symbol: (_info_from_price(result), None)
+        for symbol, result in price_engine.cached_prices(symbols, prefetch.quote_max_age()).items()
+    }
+
+
+def resolve_quotes(symbols):
+    """
+    {symbol: (info, stale_age)} for every symbol: cached prices first,
+    get_quote() for the rest.
+    """
+    quotes = cached_quotes(symbols)
+    for symbol in symbols:
+        if symbol not in quotes:
+            quotes[symbol] = get_quote(symbol)
+    return quotes
+
+
+class WatchlistItemListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        items = data.all() if isinstance(data, models.manager.BaseManager) else data
+        self.child.prime([item.symbol for item in items])
+        return super().to_representation(items)
 
 
 class WatchlistItemSerializer(serializers.ModelSerializer):
     current_price = serializers.SerializerMethodField()
     change = serializers.SerializerMethodField()
     change_percent = serializers.SerializerMethodField()
+    stale = serializers.SerializerMethodField()
+    age = serializers.SerializerMethodField()
 
     class Meta:
         model = WatchlistItem
-        fields = ['id', 'symbol', 'name', 'current_price', 'change', 'change_percent']
+        fields = ['id', 'symbol', 'name', 'current_price', 'change', 'change_percent', 'stale', 'age']
+        list_serializer_class = WatchlistItemListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # symbol -> info, so each symbol is resolved at most once per request
+        self._infos = {}
+
+    def prime(self, symbols):
+        """
+        Resolve every symbol the prefetcher (or any worker's price fetch)
+        has a current price for in one lookup; the rest fall back to
+        get_quote() per symbol.
+        """
+        self._infos.update(cached_quotes([symbol for symbol in symbols if symbol not in self._infos]))
+
+    def _get_quote(self, symbol):
+        # The price fields share one lookup, and the process-wide cache
+        # keeps repeat polls within the TTL in memory.
+        if symbol not in self._infos:
+            self._infos[symbol] = get_quote(symbol)
+        return self._infos[symbol]
 
     def _get_ticker_info(self, symbol):
-        try:
-            ticker = yf.Ticker(symbol)
-            return ticker.info
-        except Exception:
-            return {}
+        return self._get_quote(symbol)[0]
 
     def get_current_price(self, obj):
         info = self._get_ticker_info(obj.symbol)
@@ -32,6 +126,14 @@ class WatchlistItemSerializer(serializers.ModelSerializer):
         info = self._get_ticker_info(obj.symbol)
         return info.get("regularMarketChangePercent")
 
+    def get_stale(self, obj):
+        # True when the prices are the last known values, served because
+        # the upstream is failing; age is then how old they are (seconds)
+        return self._get_quote(obj.symbol)[1] is not None
+
+    def get_age(self, obj):
+        return self._get_quote(obj.symbol)[1]
+
 
 class WatchlistSerializer(serializers.ModelSerializer):
     items = WatchlistItemSerializer(many=True, read_only=True)
@@ -0,0 +1,127 @@
+# api/singleflight.py
+"""
+Single-flight request coalescing for upstream calls.
+
+While a call for a key is in flight, other threads asking for the same key
+wait for that call and share its result (or exception) instead of issuing a
+duplicate upstream request. AsyncSingleFlight does the same for coroutines
+running on one event loop (the async views).
+"""
+import asyncio
+from threading import Event, Lock
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls by key across the threads of one process.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = Lock()
+        self.calls = 0        # total do() invocations
+        self.executions = 0   # calls that actually ran fn
+        self.coalesced = 0    # calls that waited on another thread's result
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) for key unless a call for key is already in
+        flight, in which case wait for it and return its result.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent coroutine calls by key. Calls are only shared
+    within one event loop, since a task can't be awaited from another.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Await fn(*args, **kwargs) for key unless a call for key is already in
+        flight on this loop, in which case await that call's result.
+        """
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        with self._lock:
+            self.calls += 1
+            task = self._calls.get(slot)
+            if task is not None:
+                self.coalesced += 1
+            else:
+                task = loop.create_task(fn(*args, **kwargs))
+                self._calls[slot] = task
+                self.executions += 1
+                task.add_done_callback(lambda t: self._forget(slot, t))
+        # Shielded so one caller disconnecting doesn't cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, slot, task):
+        with self._lock:
+            if self._calls.get(slot) is task:
+                del self._calls[slot]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+# Shared by every view/serializer that talks to Yahoo
+upstream_flight = SingleFlight()
+async_upstream_flight = AsyncSingleFlight()
@@ -0,0 +1,151 @@
+# api/streaming.py
+"""
+Live price fan-out for the watchlist stream (Server-Sent Events over ASGI).
+
+One poller task runs per distinct symbol and pushes a quote to every
+subscriber of that symbol, but only when the quote actually changed. Upstream
+cost therefore scales with the number of distinct symbols being watched, not
+with the number of connected clients.
+
+The price source is any callable taking a symbol and returning a dict with
+current_price / change / change_percent, so the hub can be driven by a fake
+source without network access.
+"""
+import asyncio
+import json
+
+QUOTE_FIELDS = ("current_price", "change", "change_percent")
+
+
+class Subscription:
+    """
+    A client's view of the hub: an async iterator of changed quotes for the
+    symbols it subscribed to.
+    """
+
+    def __init__(self, hub, symbols):
+        self.hub = hub
+        self.symbols = set(symbols)
+        self.queue = asyncio.Queue()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    async def get(self, timeout=None):
+        """
+        Wait for the next quote, returning None if timeout elapses first.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class PriceHub:
+    """
+    Shares one upstream poller per symbol among all subscribers.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, source, interval=5.0):
+        self.source = source
+        self.interval = interval
+        self._subscribers = {}   # symbol -> set[Subscription]
+        self._pollers = {}       # symbol -> asyncio.Task
+        self._last = {}          # symbol -> last published quote
+        self.upstream_calls = 0
+
+    def subscribe(self, symbols):
+        sub = Subscription(self, symbols)
+        for symbol in sub.symbols:
+            self._subscribers.setdefault(symbol, set()).add(sub)
+            if symbol in self._last:
+                # Late joiners get the current value straight away
+                sub.queue.put_nowait(self._last[symbol])
+            if symbol not in self._pollers:
+                self._pollers[symbol] = asyncio.ensure_future(self._poll(symbol))
+        return sub
+
+    def unsubscribe(self, sub):
+        for symbol in sub.symbols:
+            subs = self._subscribers.get(symbol)
+            if subs is None:
+                continue
+            subs.discard(sub)
+            if not subs:
+                # Last subscriber gone: stop polling this symbol
+                del self._subscribers[symbol]
+                self._last.pop(symbol, None)
+                poller = self._pollers.pop(symbol, None)
+                if poller is not None:
+                    poller.cancel()
+
+    def subscriber_count(self, symbol):
+        return len(self._subscribers.get(symbol, ()))
+
+    def polled_symbols(self):
+        return set(self._pollers)
+
+    async def _fetch(self, symbol):
+        self.upstream_calls += 1
+        if asyncio.iscoroutinefunction(self.source):
+            info = await self.source(symbol)
+        else:
+            # Upstream clients are blocking; keep them off the event loop
+            info = await asyncio.to_thread(self.source, symbol)
+        info = info or {}
+        quote = {"symbol": symbol}
+        quote.update({field: info.get(field) for field in QUOTE_FIELDS})
+        return quote
+
+    async def _poll(self, symbol):
+        while True:
+            try:
+                quote = await self._fetch(symbol)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                quote = None
+
+            if quote is not None and quote != self._last.get(symbol):
+                self._last[symbol] = quote
+                for sub in list(self._subscribers.get(symbol, ())):
+                    sub.queue.put_nowait(quote)
+
+            await asyncio.sleep(self.interval)
+
+
+def format_sse(data, event=None):
+    """
+    Encode one Server-Sent Event.
+    """
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def sse_price_events(hub, symbols, heartbeat=15.0):
+    """
+    Async generator of SSE frames for a subscription. Sends a comment line
+    every heartbeat seconds so proxies keep the connection open, and
+    unsubscribes when the client disconnects.
+    """
+    sub = hub.subscribe(symbols)
+    try:
+        yield format_sse({"symbols": sorted(sub.symbols)}, event="subscribed")
+        while True:
+            quote = await sub.get(timeout=heartbeat)
+            if quote is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield format_sse(quote, event="price")
+    finally:
+        sub.close()
@@ -1,3 +1,1160 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+from datetime import date, datetime, timedelta, timezone
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import (
+    analytics, apps, company_cache, history_store, market_hours, metrics, middleware, prefetch, price_engine,
+    providers, views, watchlist_feed,
+)
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .models import CompanyProfile, Watchlist, WatchlistItem
+from .quote_cache import QuoteCache, quote_cache
+from .quote_store import SQLiteQuoteStore, shared_store
+from .search_index import SearchIndex
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .streaming import PriceHub, format_sse, sse_price_events
+from .universe import UniverseLoader
+from .universe_builder import Checkpoint, UniverseBuilder, plan_refresh, read_records
+from .views import _company_details_fallback, _decode_cursor, _encode_cursor, _load_universe
+
+
+class QuoteCacheTests(SimpleTestCase):
+    def test_empty_fetch_is_not_cached_for_the_ttl(self):
+        cache = QuoteCache(ttl=60, negative_ttl=0)
+        results = iter([{}, {"regularMarketPrice": 1.0}])
+        self.assertEqual(cache.get_or_fetch("AAPL", lambda symbol: next(results)), {})
+        self.assertEqual(cache.get_or_fetch("AAPL", lambda symbol: next(results)), {"regularMarketPrice": 1.0})
+        self.assertEqual(cache.get("AAPL"), {"regularMarketPrice": 1.0})
+
+    def test_empty_fetch_is_reused_for_the_negative_ttl(self):
+        cache = QuoteCache(ttl=60, negative_ttl=60)
+        calls = []
+        fetch = lambda symbol: calls.append(symbol) or {}  # noqa: E731
+        cache.get_or_fetch("NOPE", fetch)
+        cache.get_or_fetch("NOPE", fetch)
+        self.assertEqual(calls, ["NOPE"])
+        self.assertEqual(cache.get_stale("NOPE"), (None, None))
+
+
+class PriceHubTests(SimpleTestCase):
+    def test_one_poller_per_symbol_fans_out_changes(self):
+        prices = {"AAPL": 1.0, "MSFT": 2.0}
+        calls = []
+
+        def source(symbol):
+            calls.append(symbol)
+            return {"current_price": prices[symbol], "change": 0.0, "change_percent": 0.0}
+
+        async def run():
+            hub = PriceHub(source, interval=0.01)
+            first, second = hub.subscribe(["AAPL"]), hub.subscribe(["AAPL", "MSFT"])
+            self.assertEqual(hub.polled_symbols(), {"AAPL", "MSFT"})
+            self.assertEqual((await first.get(1))["current_price"], 1.0)
+            received = {(await second.get(1))["symbol"] for _ in range(2)}
+            self.assertEqual(received, {"AAPL", "MSFT"})
+
+            # Unchanged quotes are not pushed again, changed ones reach everyone
+            self.assertIsNone(await first.get(0.05))
+            prices["AAPL"] = 1.5
+            self.assertEqual((await first.get(1))["current_price"], 1.5)
+            self.assertEqual((await second.get(1))["current_price"], 1.5)
+
+            first.close()
+            self.assertEqual(hub.subscriber_count("AAPL"), 1)
+            second.close()
+            self.assertEqual(hub.polled_symbols(), set())
+            return hub.upstream_calls
+
+        self.assertEqual(asyncio.run(run()), len(calls))
+
+    def test_sse_events_start_with_the_subscription(self):
+        async def run():
+            hub = PriceHub(lambda symbol: {"current_price": 3.0}, interval=60)
+            events = sse_price_events(hub, {"XOM"}, heartbeat=1)
+            frames = [await events.__anext__(), await events.__anext__()]
+            await events.aclose()
+            return hub, frames
+
+        hub, frames = asyncio.run(run())
+        self.assertEqual(frames[0], format_sse({"symbols": ["XOM"]}, event="subscribed"))
+        self.assertIn('"current_price": 3.0', frames[1])
+        self.assertEqual(hub.polled_symbols(), set())
+
+    def test_stream_needs_the_asgi_server(self):
+        response = self.client.get("/api/watchlists/stream/")
+        self.assertEqual(response.status_code, 503)
+
+
+def _index(*companies):
+    return SearchIndex([s for s, _ in companies], [n for _, n in companies], ["NASDAQ"] * len(companies))
+
+
+class SearchIndexTests(SimpleTestCase):
+    def symbols(self, index, query, limit=10):
+        return [rec["symbol"] for rec in index.search(query, limit=limit)]
+
+    def test_exact_symbol_comes_first(self):
+        index = _index(("AAPL", "Apple Inc."), ("AAP", "Advance Auto Parts"), ("AAPB", "Some Fund"))
+        self.assertEqual(self.symbols(index, "aap")[:3], ["AAP", "AAPB", "AAPL"])
+
+    def test_whole_word_name_match_before_longer_word(self):
+        index = _index(("APP", "AppLovin Corporation"), ("AAPL", "Apple Inc."), ("APLE", "Apple Hospitality REIT"))
+        self.assertEqual(self.symbols(index, "apple"), ["AAPL", "APLE"])
+        self.assertEqual(self.symbols(index, "appl")[:2], ["AAPL", "APP"])
+
+    def test_name_prefix_ranks_by_fit_before_token_matches(self):
+        index = _index(
+            ("MSFT", "Microsoft Corporation"),
+            ("MU", "Micron Technology, Inc."),
+            ("AMD", "Advanced Micro Devices, Inc."),
+        )
+        self.assertEqual(self.symbols(index, "micro"), ["MSFT", "MU", "AMD"])
+
+    def test_short_query_stops_at_the_limit(self):
+        index = _index(*[(f"A{i:03d}", f"Alpha {i}") for i in range(50)])
+        self.assertEqual(self.symbols(index, "a", limit=5), ["A000", "A001", "A002", "A003", "A004"])
+
+    def test_fuzzy_match_after_exact_tiers(self):
+        index = _index(("AAPL", "Apple Inc."), ("MSFT", "Microsoft Corporation"))
+        self.assertEqual(self.symbols(index, "aple"), ["AAPL"])
+        self.assertEqual(self.symbols(index, "microsfot"), ["MSFT"])
+
+
+class UniverseLoaderTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "companies.csv")
+        self.write("AAPL,Apple Inc.,Technology\n")
+
+    def write(self, rows):
+        with open(self.path, "w") as f:
+            f.write("Ticker,Company Name,Sector\n" + rows)
+
+    def test_missing_csv_keeps_the_current_snapshot(self):
+        loader = UniverseLoader(self.path)
+        self.assertEqual(len(loader.universe()), 1)
+        os.remove(self.path)
+        loader._reload_lock.acquire()
+        loader._reload(loader._signature())
+        stats = loader.stats()
+        self.assertEqual((stats["version"], stats["rows"], stats["failures"]), (1, 1, 1))
+
+    def test_one_reload_at_a_time(self):
+        loader = UniverseLoader(self.path, check_interval=0)
+        loader.snapshot()
+        self.write("AAPL,Apple Inc.,Technology\nMSFT,Microsoft Corporation,Technology\n")
+        os.utime(self.path, ns=(0, 0))
+        with loader._reload_lock:
+            # A reload already pending: readers neither start another nor wait
+            self.assertEqual(loader.snapshot().version, 1)
+        deadline = time.monotonic() + 5
+        while loader.snapshot().version == 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(loader.universe()), 2)
+
+
+class FakeFetcher:
+    host = "fake"
+
+    def __init__(self, interrupt_at=None):
+        self.interrupt_at = interrupt_at
+        self.calls = []
+
+    def __call__(self, symbol):
+        self.calls.append(symbol)
+        if symbol == self.interrupt_at:
+            raise KeyboardInterrupt
+        if symbol == "FAIL":
+            raise ValueError("upstream error")
+        return {"symbol": symbol, "name": f"{symbol} Inc.", "exchange": "NMS", "sector": "Technology"}
+
+
+class UniverseBuilderTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.checkpoint = os.path.join(self.dir.name, "checkpoint.jsonl")
+        self.output = os.path.join(self.dir.name, "companies.csv")
+
+    def builder(self, fetcher, **kwargs):
+        return UniverseBuilder(fetcher, rate=1000, burst=100, checkpoint_path=self.checkpoint, progress=False, **kwargs)
+
+    def test_build_keeps_failures_for_the_next_run(self):
+        builder = self.builder(FakeFetcher())
+        builder.build(["AAPL", "FAIL", "MSFT"], self.output)
+        self.assertEqual(list(read_records(self.output)), ["AAPL", "MSFT"])
+        self.assertEqual((builder.stats["fetched"], builder.stats["failed"]), (2, 1))
+        self.assertEqual(set(Checkpoint(self.checkpoint).load()), {"AAPL", "MSFT"})
+
+    def test_interrupt_cancels_queued_fetches_and_resumes(self):
+        symbols = [f"S{i:02d}" for i in range(40)]
+        fetcher = FakeFetcher(interrupt_at="S02")
+        with self.assertRaises(KeyboardInterrupt):
+            self.builder(fetcher, max_workers=1).fetch(symbols)
+        # Only the bounded window was ever queued
+        self.assertLessEqual(len(fetcher.calls), 4)
+        self.assertEqual(set(Checkpoint(self.checkpoint).load()), {"S00", "S01"})
+
+        fetcher = FakeFetcher()
+        builder = self.builder(fetcher)
+        self.assertEqual(len(builder.fetch(symbols)), 40)
+        self.assertEqual(builder.stats["resumed"], 2)
+        self.assertNotIn("S00", fetcher.calls)
+
+    def test_refresh_dates_kept_legacy_rows_by_the_old_file(self):
+        with open(self.output, "w") as f:
+            f.write("Ticker,Company Name,Sector\nAAPL,Apple Inc.,Technology\nGONE,Delisted Corp.,Energy\n")
+        mtime = datetime.now(timezone.utc) - timedelta(days=10)
+        os.utime(self.output, (mtime.timestamp(), mtime.timestamp()))
+
+        fetcher = FakeFetcher()
+        changelog = self.builder(fetcher).refresh(["AAPL", "MSFT"], self.output, self.output, max_age=timedelta(days=30))
+        self.assertEqual(fetcher.calls, ["MSFT"])
+        self.assertEqual((changelog["added"], changelog["removed"]), (["MSFT"], ["GONE"]))
+
+        rows = read_records(self.output)
+        self.assertEqual(rows["AAPL"]["fetched_at"], mtime.isoformat(timespec="seconds"))
+        # Still 10 days old on the next run, so it goes stale on schedule
+        later = datetime.now(timezone.utc) + timedelta(days=25)
+        self.assertEqual(plan_refresh(rows, ["AAPL", "MSFT"], timedelta(days=30), now=later)["stale"], ["AAPL"])
+
+
+class ProviderTests(SimpleTestCase):
+    def setUp(self):
+        self.synthetic = providers.SyntheticProvider(end_date="2026-10-16")
+
+    def test_synthetic_bars_depend_only_on_the_date(self):
+        week = self.synthetic.history(["AAPL", "MSFT"], period="5d")
+        month = self.synthetic.history(["AAPL", "MSFT"], period="1mo")
+        self.assertEqual(len(week), 5)
+        self.assertEqual(set(week.columns.get_level_values(0)), {"Open", "High", "Low", "Close", "Volume"})
+        pd.testing.assert_frame_equal(week, month.tail(5))
+
+        info = self.synthetic.info("AAPL")
+        self.assertAlmostEqual(info["regularMarketPrice"], week["Close"]["AAPL"].iloc[-1])
+        with self.assertRaises(ValueError):
+            self.synthetic.history(["AAPL"], period="7w")
+
+    def test_replay_serves_recordings_without_upstream(self):
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = providers.ReplayProvider(directory, record_from=self.synthetic)
+            recorded = recorder.history(["AAPL"], period="5d")
+            info = recorder.info("AAPL")
+
+            replay = providers.ReplayProvider(directory)
+            pd.testing.assert_frame_equal(replay.history(["AAPL"], period="5d"), recorded, check_freq=False)
+            self.assertEqual(replay.info("AAPL"), info)
+            with self.assertRaises(providers.ReplayMissError):
+                replay.info("MSFT")
+
+    def test_set_provider_swaps_the_process_provider(self):
+        previous = providers.set_provider(self.synthetic)
+        self.addCleanup(providers.set_provider, previous)
+        self.assertIs(providers.get_provider(), self.synthetic)
+        self.assertIs(providers.set_provider(None), self.synthetic)
+
+        # Rebuilt from settings on next use, wrapped for metrics and the breaker
+        provider = providers.get_provider()
+        self.assertIsInstance(provider, providers.BreakerProvider)
+        self.assertEqual(provider.info("AAPL")["symbol"], "AAPL")
+        with self.assertRaises(ValueError):
+            providers.build_provider("nope")
+
+
+class MetricsAccessTests(SimpleTestCase):
+    def test_closed_by_default(self):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token(self):
+        self.assertEqual(self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        response = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"api_universe_rows", response.content)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"])
+    def test_ip_allowlist(self):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+        self.assertEqual(self.client.get("/api/metrics/", REMOTE_ADDR="10.0.0.5").status_code, 200)
+
+    def test_collectors(self):
+        breaker = {"state": "half_open", "consecutive_failures": 0, "opened": 3, "rejected": 7}
+        self.assertIn('api_upstream_circuit_open{state="half_open"} 1', metrics.circuit_breaker_metrics(breaker))
+        self.assertIn("api_upstream_circuit_rejected_total 7", metrics.circuit_breaker_metrics(breaker))
+        store = {"backend": "sqlite", "hits": 1, "misses": 2, "writes": 3, "errors": 4,
+                 "errors_by_op": {"read": 1, "write": 3, "prune": 0, "clear": 0}}
+        self.assertIn('api_quote_store_errors_total{backend="sqlite",op="write"} 3', metrics.quote_store_metrics(store))
+
+        lines = metrics.collect(views._UNIVERSE)
+        self.assertIn("# TYPE api_upstream_flight_total counter", lines)
+        self.assertFalse([line for line in lines if line.startswith(("api_prefetch", "api_stream"))])
+
+
+class AsyncViewTests(TestCase):
+    # async tests run the sync_to_async DB calls on this thread, inside the test transaction
+    def setUp(self):
+        self.addCleanup(providers.set_provider, providers.set_provider(providers.SyntheticProvider(end_date="2026-10-16")))
+        shared_store.clear()
+        quote_cache.clear()
+        company_cache._prices.clear()
+        self.user = User.objects.create_user("carol", password="pw")
+        self.factory = AsyncRequestFactory()
+        self.auth = {"headers": {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}}
+
+    async def test_authenticate_rejects_missing_and_bad_tokens(self):
+        self.assertIsNone(await views._authenticate_async(self.factory.get("/")))
+        self.assertIsNone(await views._authenticate_async(self.factory.get("/", headers={"Authorization": "Bearer junk"})))
+        # ?token= only where the view allows it (EventSource can't send headers)
+        token = str(AccessToken.for_user(self.user))
+        self.assertIsNone(await views._authenticate_async(self.factory.get("/", {"token": token})))
+        user = await views._authenticate_async(self.factory.get("/", {"token": token}), allow_query_token=True)
+        self.assertEqual(user.pk, self.user.pk)
+
+    async def test_views_reject_unauthenticated(self):
+        response = await views.company_details_async(self.factory.get("/api/company/AAA/"), "AAA")
+        self.assertEqual(response.status_code, 401)
+        response = await views.get_prices_for_symbols_async(
+            self.factory.post("/api/prices/", {"symbols": ["AAA"]}, content_type="application/json"))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_company_details(self):
+        with mock.patch.object(company_cache, "_schedule"):
+            response = await views.company_details_async(self.factory.get("/api/company/avd/", **self.auth), "avd")
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertEqual(body["price"]["longName"], "AVD Synthetic Corporation")
+        self.assertFalse(body["stale"])
+
+    async def test_prices(self):
+        response = await views.get_prices_for_symbols_async(self.factory.post(
+            "/api/prices/", {"symbols": ["AVP", "AVQ"]}, content_type="application/json", **self.auth))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(json.loads(response.content)), {"AVP", "AVQ"})
+
+        response = await views.get_prices_for_symbols_async(self.factory.post(
+            "/api/prices/", {"symbols": []}, content_type="application/json", **self.auth))
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncClientCheckTests(SimpleTestCase):
+    @override_settings(API_ASYNC_VIEWS=True, MARKET_DATA_PROVIDER="yahoo")
+    def test_warns_without_httpx(self):
+        with mock.patch("api.providers.yahoo.httpx", None), self.assertLogs("api.apps", "WARNING"):
+            apps._check_async_client()
+
+    @override_settings(API_ASYNC_VIEWS=True, MARKET_DATA_PROVIDER="synthetic")
+    def test_quiet_when_yahoo_is_not_used(self):
+        with mock.patch("api.providers.yahoo.httpx", None), self.assertNoLogs("api.apps", "WARNING"):
+            apps._check_async_client()
+
+
+class AddRandomCompaniesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("alice", password="pw"))
+        self.watchlist = Watchlist.objects.create(user=User.objects.get(username="alice"), name="Utilities")
+        self.url = f"/api/watchlists/{self.watchlist.id}/add-random/"
+        self.utilities = [rec["symbol"] for rec in _load_universe().companies_in_sector("Utilities")]
+
+    def add(self, symbols):
+        WatchlistItem.objects.bulk_create(WatchlistItem(watchlist=self.watchlist, symbol=s) for s in symbols)
+
+    def test_samples_only_companies_not_in_the_watchlist(self):
+        self.add(self.utilities[:-3])
+        response = self.client.post(self.url, {"sector": "Utilities", "num_companies": 10}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(WatchlistItem.objects.filter(watchlist=self.watchlist).count(), len(self.utilities))
+
+    def test_full_sector_is_a_bad_request(self):
+        self.add(self.utilities)
+        response = self.client.post(self.url, {"sector": "Utilities", "num_companies": 10}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already in this watchlist", response.data["error"])
+
+
+class CountingInfoProvider(providers.SyntheticProvider):
+    """
+    Synthetic provider counting info() calls; symbols starting with "NO"
+    are unknown, like Yahoo's empty info for them.
+    """
+
+    def __init__(self):
+        super().__init__(end_date="2026-10-16")
+        self.info_calls = []
+
+    def info(self, symbol):
+        self.info_calls.append(symbol)
+        return {} if symbol.startswith("NO") else super().info(symbol)
+
+    async def ainfo(self, symbol):
+        return self.info(symbol)
+
+
+class CompanyCacheTests(TestCase):
+    def setUp(self):
+        self.provider = CountingInfoProvider()
+        self.addCleanup(providers.set_provider, providers.set_provider(self.provider))
+        shared_store.clear()
+        quote_cache.clear()
+        company_cache._prices.clear()
+
+    def age_price(self, symbol, seconds):
+        # Only the local copy, backdated
+        shared_store.clear()
+        price = company_cache._prices.get(symbol)
+        with company_cache._prices._lock:
+            company_cache._prices._put(symbol, time.monotonic() - seconds, price)
+
+    def test_unknown_symbol_is_stored_in_neither_tier(self):
+        for _ in range(2):
+            self.assertEqual(company_cache.get_company_info("nope"), ({}, None))
+        self.assertEqual(self.provider.info_calls, ["NOPE"])   # negative TTL
+        self.assertFalse(CompanyProfile.objects.filter(symbol="NOPE").exists())
+        self.assertIsNone(quote_cache.get("NOPE"))
+
+    def test_unknown_symbol_async(self):
+        # The profile lookup runs on another thread, outside this test's transaction
+        with mock.patch.object(company_cache, "_load_profile", return_value=(None, None)), \
+                mock.patch.object(company_cache, "_store_profile") as store_profile:
+            for _ in range(2):
+                self.assertEqual(asyncio.run(company_cache.aget_company_info("NOAS")), ({}, None))
+        self.assertEqual(self.provider.info_calls, ["NOAS"])
+        store_profile.assert_not_called()
+
+    def test_miss_then_fresh(self):
+        info, age = company_cache.get_company_info("CCA")
+        self.assertEqual((info["longName"], age), ("CCA Synthetic Corporation", None))
+        self.assertTrue(CompanyProfile.objects.filter(symbol="CCA").exists())
+
+        with mock.patch.object(company_cache, "_schedule") as schedule:
+            again, age = company_cache.get_company_info("CCA")
+        self.assertEqual((again["regularMarketPrice"], age), (info["regularMarketPrice"], None))
+        self.assertEqual(self.provider.info_calls, ["CCA"])
+        schedule.assert_not_called()
+
+    def test_expired_price_is_served_with_its_age_and_refreshed(self):
+        company_cache.get_company_info("CCB")
+        self.age_price("CCB", 60)
+        with mock.patch.object(company_cache, "_schedule") as schedule:
+            _, age = company_cache.get_company_info("CCB")
+        self.assertGreaterEqual(age, 60)
+        schedule.assert_called_once_with("price", company_cache._refresh_price, "CCB")
+
+        # Past the stale limit it is refetched instead
+        self.age_price("CCB", 7 * 3600)
+        with mock.patch.object(company_cache, "_schedule"):
+            _, age = company_cache.get_company_info("CCB")
+        self.assertIsNone(age)
+
+    def test_stale_flag_in_the_response(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("bob", password="pw"))
+        company_cache.get_company_info("CCC")
+        self.age_price("CCC", 60)
+        with mock.patch.object(company_cache, "_schedule"):
+            body = client.get("/api/company/CCC/").json()
+        self.assertTrue(body["stale"])
+        self.assertGreaterEqual(body["age"], 60)
+
+    def test_price_refresh_bypasses_the_engine_cache(self):
+        result = {"status": "ok", "current_price": 1.0, "change": 0.0, "change_percent": 0.0}
+        with mock.patch.object(company_cache.price_engine, "fetch_prices", return_value={"CCD": result}) as fetch:
+            company_cache._refresh_price("CCD")
+        fetch.assert_called_once_with(["CCD"], refresh=True)
+        self.assertEqual(company_cache._prices.get("CCD")["regularMarketPrice"], 1.0)
+
+    def test_refreshes_are_deduplicated(self):
+        release, calls = threading.Event(), []
+
+        def refresh(symbol):
+            calls.append(symbol)
+            release.wait(5)
+
+        company_cache._schedule("price", refresh, "CCE")
+        company_cache._schedule("price", refresh, "CCE")
+        release.set()
+        company_cache._refresher.submit(lambda: None).result(5)
+        deadline = time.monotonic() + 5
+        while company_cache.stats()["refreshing"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(calls, ["CCE"])
+
+
+class WatchlistFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("carol", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.watchlist = Watchlist.objects.create(user=self.user, name="Tech")
+        self.apple = WatchlistItem.objects.create(watchlist=self.watchlist, symbol="AAPL", name="Apple Inc.")
+
+    def get(self, **kwargs):
+        return self.client.get("/api/watchlists/", **kwargs)
+
+    def test_etag_and_304(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([item["symbol"] for item in first.data[0]["items"]], ["AAPL"])
+        etag = first["ETag"]
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=f"W/{etag}").status_code, 304)
+        self.assertEqual(self.client.get(f"/api/watchlists/?since={etag.strip(chr(34))}").status_code, 304)
+
+    def test_since_returns_the_changes(self):
+        version = self.get()["ETag"].strip('"')
+        self.client.post(f"/api/watchlists/{self.watchlist.id}/add/", {"symbol": "MSFT", "name": "Microsoft"}, format="json")
+        self.client.delete(f"/api/watchlists/{self.watchlist.id}/remove/{self.apple.id}/")
+
+        delta = self.client.get(f"/api/watchlists/?since={version}").data
+        self.assertFalse(delta["full"])
+        self.assertEqual([item["symbol"] for item in delta["added"]], ["MSFT"])
+        self.assertEqual(delta["removed"], [self.apple.id])
+
+        unknown = self.client.get("/api/watchlists/?since=0123456789abcdef").data
+        self.assertTrue(unknown["full"])
+        self.assertEqual([item["symbol"] for item in unknown["watchlists"][0]["items"]], ["MSFT"])
+
+    def test_created_with_random_companies_is_not_served_empty(self):
+        bulk_create = WatchlistItem.objects.bulk_create
+
+        def read_feed_first(*args, **kwargs):
+            # A dashboard poll landing between the watchlist and its items
+            watchlist_feed.build(self.user)
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(WatchlistItem.objects, "bulk_create", side_effect=read_feed_first):
+            response = self.client.post("/api/watchlists/create-with-random/",
+                                        {"name": "Utilities", "sector": "Utilities", "num_companies": 3}, format="json")
+        self.assertEqual(response.status_code, 201)
+        created = next(wl for wl in self.get().data if wl["id"] == response.data["id"])
+        self.assertEqual(len(created["items"]), 3)
+
+
+def _bars(*days, close=1.0):
+    bars = np.zeros(len(days), dtype=history_store.BAR_DTYPE)
+    bars["t"] = [history_store._day_seconds(day) for day in days]
+    bars["close"] = close
+    return bars
+
+
+class HistoryStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.store = history_store.HistoryStore(self.dir.name)
+        patcher = mock.patch.object(history_store, "store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_round_trip(self):
+        bars = _bars(date(2026, 10, 14), date(2026, 10, 15), date(2026, 10, 16))
+        self.store.write_many("1d", {"BRK/B": (bars, int(bars["t"][0]))})
+        np.testing.assert_array_equal(self.store.read("BRK/B"), bars)
+        self.assertEqual(self.store.info("BRK/B"), (bars["t"][0], bars["t"][-1]))
+        np.testing.assert_array_equal(self.store.read("BRK/B", start=bars["t"][1], end=bars["t"][2]), bars[1:2])
+        self.assertTrue(self.store.path("BRK/B").endswith("BRK%2FB.bars"))
+
+    def test_new_session_is_appended_in_place(self):
+        old = _bars(date(2026, 10, 15), date(2026, 10, 16))
+        self.store.write_many("1d", {"AAPL": (old, int(old["t"][0]))})
+        size = os.path.getsize(self.store.path("AAPL"))
+        # The fetch overlaps the stored bars; only the new one is written
+        new = _bars(date(2026, 10, 16), date(2026, 10, 19), close=2.0)
+        self.store.write_many("1d", {"AAPL": (new, int(new["t"][0]))})
+        self.assertEqual(os.path.getsize(self.store.path("AAPL")), size + history_store.BAR_DTYPE.itemsize)
+        self.assertEqual(self.store.counts["appended"], 1)
+        self.assertEqual(list(self.store.read("AAPL")["close"]), [1.0, 1.0, 2.0])
+        self.assertEqual(self.store.info("AAPL")[0], old["t"][0])
+
+    def test_backfill_extends_coverage_backwards(self):
+        recent = _bars(date(2026, 10, 15), date(2026, 10, 16))
+        self.store.write_many("1d", {"AAPL": (recent, int(recent["t"][0]))})
+        older = _bars(date(2026, 10, 13), date(2026, 10, 14), date(2026, 10, 15), date(2026, 10, 16), close=3.0)
+        self.store.write_many("1d", {"AAPL": (older, int(older["t"][0]))})
+        self.assertEqual(self.store.counts["rewritten"], 2)
+        self.assertEqual(self.store.info("AAPL"), (older["t"][0], older["t"][-1]))
+        # Fetched bars win over stored ones
+        self.assertEqual(list(self.store.read("AAPL")["close"]), [3.0] * 4)
+
+    def test_corrupt_and_short_files_read_as_empty(self):
+        path = self.store.path("BAD")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(b"not a bar file")
+        self.assertEqual(self.store.info("BAD"), (None, None))
+        self.assertEqual(len(self.store.read("BAD")), 0)
+
+        # A torn append: the partial record is ignored
+        bars = _bars(date(2026, 10, 16))
+        self.store.write_many("1d", {"BAD": (bars, int(bars["t"][0]))})
+        with open(path, "ab") as f:
+            f.write(b"\0" * 20)
+        np.testing.assert_array_equal(self.store.read("BAD"), bars)
+
+    def test_history_fetches_only_what_is_missing(self):
+        provider = CountingInfoProvider()
+        self.addCleanup(providers.set_provider, providers.set_provider(provider))
+        calls = []
+        history = provider.history
+        provider.history = lambda symbols, period, interval: calls.append((tuple(symbols), period)) or history(
+            symbols, period, interval)
+
+        after_close = datetime(2026, 10, 16, 18, 0, tzinfo=market_hours.MARKET_TZ)
+        first = history_store.history(["AAPL", "MSFT"], period="1mo", now=after_close)
+        again = history_store.history(["AAPL", "MSFT"], period="1mo", now=after_close)
+        self.assertEqual(calls, [(("AAPL", "MSFT"), "1mo")])
+        pd.testing.assert_frame_equal(first, again)
+        self.assertEqual(len(again), 21)
+
+        # Next day mid-session: just the forming bar, which isn't stored
+        provider.end_date = "2026-10-19"
+        next_day = datetime(2026, 10, 19, 12, 0, tzinfo=market_hours.MARKET_TZ)
+        history_store.history(["AAPL"], period="1mo", now=next_day)
+        self.assertEqual(calls[-1], (("AAPL",), "1d"))
+        self.assertEqual(self.store.info("AAPL")[1], history_store._day_seconds(date(2026, 10, 16)))
+
+
+def _fail():
+    raise ValueError("upstream down")
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+
+    def trip(self):
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.breaker.call(_fail)
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        self.breaker.call(lambda: 1)
+        with self.assertRaises(ValueError):
+            self.breaker.call(_fail)
+        self.assertEqual(self.breaker.state, "closed")
+        with self.assertRaises(ValueError):
+            self.breaker.call(_fail)
+        self.assertEqual(self.breaker.state, "open")
+        calls = []
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.call(calls.append, 1)
+        self.assertEqual(calls, [])
+        self.assertLessEqual(raised.exception.retry_after, 0.05)
+        self.assertEqual((self.breaker.stats()["opened"], self.breaker.stats()["rejected"]), (1, 1))
+
+    def test_half_open_lets_one_probe_through(self):
+        self.trip()
+        time.sleep(0.06)
+        self.breaker.before_call()   # the probe
+        self.assertEqual(self.breaker.state, "half_open")
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual((self.breaker.state, self.breaker.opened), ("open", 2))
+
+        time.sleep(0.06)
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(self.breaker.stats()["state"], "closed")
+        self.assertEqual(self.breaker.stats()["consecutive_failures"], 0)
+
+    def test_interruptions_are_not_failures(self):
+        def interrupted():
+            raise KeyboardInterrupt
+
+        async def cancelled():
+            raise asyncio.CancelledError
+
+        for _ in range(3):
+            with self.assertRaises(KeyboardInterrupt):
+                self.breaker.call(interrupted)
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(self.breaker.acall(cancelled))
+        self.assertEqual(self.breaker.stats()["state"], "closed")
+        self.assertEqual(self.breaker.stats()["consecutive_failures"], 0)
+
+        # A cancelled probe frees the slot for the next call
+        self.trip()
+        time.sleep(0.06)
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(self.breaker.acall(cancelled))
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+
+
+class CompanyDetailsFallbackTests(SimpleTestCase):
+    def setUp(self):
+        shared_store.clear()
+        quote_cache.clear()
+
+    def test_last_known_info_is_served_stale(self):
+        quote_cache.set("FBA", {"longName": "Fallback Inc.", "regularMarketPrice": 10.0})
+        body, code, headers = _company_details_fallback("fba", CircuitOpenError("market-data", 12))
+        self.assertEqual((code, headers), (200, None))
+        self.assertTrue(body["stale"])
+        self.assertEqual(body["price"]["regularMarketPrice"], 10.0)
+
+    def test_open_circuit_without_a_copy_is_503(self):
+        body, code, headers = _company_details_fallback("FBB", CircuitOpenError("market-data", 12.4))
+        self.assertEqual((code, headers), (503, {"Retry-After": "13"}))
+
+    def test_other_errors_without_a_copy_are_500(self):
+        body, code, _ = _company_details_fallback("FBC", ValueError("boom"))
+        self.assertEqual(code, 500)
+        self.assertEqual(body["details"], "boom")
+
+
+def _ny(*args):
+    return datetime(*args, tzinfo=market_hours.MARKET_TZ)
+
+
+class MarketHoursTests(SimpleTestCase):
+    def test_market_is_open(self):
+        self.assertFalse(market_hours.market_is_open(_ny(2026, 10, 16, 9, 29)))
+        self.assertTrue(market_hours.market_is_open(_ny(2026, 10, 16, 9, 30)))
+        self.assertTrue(market_hours.market_is_open(_ny(2026, 10, 16, 15, 59)))
+        self.assertFalse(market_hours.market_is_open(_ny(2026, 10, 16, 16, 0)))
+        self.assertFalse(market_hours.market_is_open(_ny(2026, 10, 17, 12, 0)))   # Saturday
+        # Other zones are converted: 14:00 UTC is 10:00 in New York (EDT)
+        self.assertTrue(market_hours.market_is_open(datetime(2026, 10, 16, 14, 0, tzinfo=timezone.utc)))
+        self.assertFalse(market_hours.market_is_open(datetime(2026, 12, 16, 14, 0, tzinfo=timezone.utc)))   # EST
+
+    def test_session_date(self):
+        friday = date(2026, 10, 16)
+        self.assertEqual(market_hours.session_date(_ny(2026, 10, 16, 9, 30)), friday)
+        self.assertEqual(market_hours.session_date(_ny(2026, 10, 16, 20, 0)), friday)
+        self.assertEqual(market_hours.session_date(_ny(2026, 10, 16, 9, 0)), date(2026, 10, 15))
+        # The weekend and Monday before the open belong to Friday's session
+        self.assertEqual(market_hours.session_date(_ny(2026, 10, 17, 12, 0)), friday)
+        self.assertEqual(market_hours.session_date(_ny(2026, 10, 18, 12, 0)), friday)
+        self.assertEqual(market_hours.session_date(_ny(2026, 10, 19, 8, 0)), friday)
+
+
+class PrefetchStartTests(SimpleTestCase):
+    def test_only_servers_start_the_prefetcher(self):
+        with mock.patch.object(prefetch, "start_in_process") as start:
+            with override_settings(QUOTE_PREFETCH_IN_PROCESS=True):
+                apps.ApiConfig.ready(mock.Mock())
+                start.assert_not_called()
+                prefetch.start_for_server()
+                start.assert_called_once()
+            prefetch.start_for_server()
+            start.assert_called_once()
+
+
+class ComputeChangesTests(SimpleTestCase):
+    def test_change_math(self):
+        closes = pd.DataFrame({
+            "UP": [10.0, 11.0],
+            "NEW": [np.nan, 5.0],      # no previous close: unchanged
+            "GAP": [4.0, np.nan],      # last valid close is the current price
+            "ZERO": [0.0, 2.0],
+            "NONE": [np.nan, np.nan],
+        })
+        changes = price_engine.compute_changes(closes)
+        self.assertEqual(changes.loc["UP"].tolist(), [11.0, 1.0, 10.0])
+        self.assertEqual(changes.loc["NEW"].tolist(), [5.0, 0.0, 0.0])
+        self.assertEqual(changes.loc["GAP"].tolist(), [4.0, 0.0, 0.0])
+        self.assertEqual(changes.loc["ZERO"].tolist(), [2.0, 2.0, 0.0])
+        self.assertTrue(changes.loc["NONE"].isna().all())
+
+    def test_single_row(self):
+        changes = price_engine.compute_changes(pd.DataFrame({"A": [3.0], "B": [np.nan]}))
+        self.assertEqual(changes.loc["A"].tolist(), [3.0, 0.0, 0.0])
+        self.assertTrue(changes.loc["B"].isna().all())
+
+    def test_nan_prices_become_no_data(self):
+        frame = pd.DataFrame({"NDA": [1.0, 2.0], "NDB": [np.nan, np.nan]})
+        results = price_engine._collect(["NDA", "NDB", "NDC"], {}, [frame], {})
+        self.assertEqual(results["NDA"]["status"], price_engine.STATUS_OK)
+        self.assertEqual(results["NDB"]["status"], price_engine.STATUS_NO_DATA)
+        self.assertIsNone(results["NDB"]["current_price"])
+        self.assertEqual(results["NDC"]["status"], price_engine.STATUS_NO_DATA)
+
+
+class FetchPricesDeadlineTests(SimpleTestCase):
+    def setUp(self):
+        shared_store.clear()
+        price_engine._PRICES.clear()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def download(self, chunk):
+        if chunk[0].startswith("SLOW"):
+            self.release.wait(5)
+        return pd.DataFrame({sym: [1.0, 2.0] for sym in chunk})
+
+    def test_partial_results_after_the_deadline(self):
+        # SLOWB had a good price before; it's served stale rather than timed out
+        # (only the local copy, backdated past the TTL)
+        last = {"current_price": 1.5, "change": 0.0, "change_percent": 0.0, "status": "ok"}
+        with price_engine._PRICES._lock:
+            price_engine._PRICES._put("SLOWB", time.monotonic() - price_engine.PRICE_TTL - 1, last)
+
+        with mock.patch.object(price_engine, "CHUNK_SIZE", 1), \
+                mock.patch.object(price_engine, "_download_closes", self.download):
+            started = time.monotonic()
+            results = price_engine.fetch_prices(["FASTA", "SLOWA", "SLOWB"], deadline=0.2)
+        self.assertLess(time.monotonic() - started, 2)
+
+        self.assertEqual((results["FASTA"]["status"], results["FASTA"]["current_price"]), ("ok", 2.0))
+        self.assertEqual((results["SLOWA"]["status"], results["SLOWA"]["error"]), ("timeout", "deadline exceeded"))
+        self.assertEqual((results["SLOWB"]["status"], results["SLOWB"]["current_price"]), ("stale", 1.5))
+        self.assertEqual(list(results), ["FASTA", "SLOWA", "SLOWB"])
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.runs = 0
+
+    def run_concurrently(self, flight, fn, n=5):
+        """
+        n threads calling flight.do("key", fn) once the first is in flight;
+        returns each thread's result or exception.
+        """
+        outcomes = [None] * n
+
+        def caller(i):
+            try:
+                outcomes[i] = flight.do("key", fn)
+            except Exception as e:
+                outcomes[i] = e
+
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(n)]
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + 5
+        while flight.stats()["calls"] < n and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.release.set()
+        for t in threads:
+            t.join(5)
+        return outcomes
+
+    def slow(self, result=None, error=None):
+        def fn():
+            self.runs += 1
+            self.release.wait(5)
+            if error is not None:
+                raise error
+            return result
+        return fn
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        result = object()
+        outcomes = self.run_concurrently(flight, self.slow(result))
+        self.assertTrue(all(o is result for o in outcomes))
+        self.assertEqual(self.runs, 1)
+        self.assertEqual(flight.stats(), {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0})
+
+    def test_exception_reaches_every_waiter(self):
+        flight = SingleFlight()
+        error = ValueError("upstream down")
+        outcomes = self.run_concurrently(flight, self.slow(error=error))
+        self.assertTrue(all(o is error for o in outcomes))
+        self.assertEqual(self.runs, 1)
+        # Nothing is left in flight: the next call runs again
+        self.assertEqual(flight.do("key", lambda: 2), 2)
+
+    def test_async_call_survives_a_cancelled_waiter(self):
+        flight = AsyncSingleFlight()
+        runs = []
+
+        async def fetch():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "quote"
+
+        async def scenario():
+            first = asyncio.ensure_future(flight.do("key", fetch))
+            second = asyncio.ensure_future(flight.do("key", fetch))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await first
+            return await second
+
+        self.assertEqual(asyncio.run(scenario()), "quote")
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(flight.stats(), {"calls": 2, "executions": 1, "coalesced": 1, "in_flight": 0})
+
+
+class SQLiteQuoteStoreTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "quotes.sqlite3")
+        self.store = SQLiteQuoteStore(self.path)
+
+    def test_shared_between_processes(self):
+        script = ("import django; django.setup(); from api.quote_store import SQLiteQuoteStore; "
+                  f"SQLiteQuoteStore({self.path!r}).set_many('price', {{'CHILD': {{'p': 1}}}})")
+        # Inherits DJANGO_SETTINGS_MODULE
+        subprocess.run([sys.executable, "-c", script], cwd=settings.BASE_DIR, check=True, timeout=60)
+        found = self.store.get_many("price", ["CHILD", "OTHER"])
+        self.assertEqual(found["CHILD"][0], {"p": 1})
+        self.assertEqual(list(found), ["CHILD"])
+
+    def test_namespaces_are_separate(self):
+        self.store.set_many("price", {"AAA": 1})
+        self.store.set_many("company", {"AAA": 2})
+        self.assertEqual(self.store.get_many("price", ["AAA"])["AAA"][0], 1)
+        self.assertEqual(self.store.get_many("company", ["AAA"])["AAA"][0], 2)
+        self.assertEqual(self.store.get_many("feed", ["AAA"]), {})
+
+    def test_max_age(self):
+        self.store.set_many("price", {"AAA": 1})
+        later = time.time() + 60
+        with mock.patch("api.quote_store.time.time", return_value=later):
+            self.assertEqual(self.store.get_many("price", ["AAA"], max_age=30), {})
+            value, age = self.store.get_many("price", ["AAA"], max_age=120)["AAA"]
+        self.assertEqual(value, 1)
+        self.assertAlmostEqual(age, 60, delta=1)
+        self.assertEqual(self.store.stats()["errors"], 0)
+
+    def test_locked_writes_are_dropped_after_the_busy_timeout(self):
+        self.store.BUSY_TIMEOUT = 0.1
+        self.store.set_many("price", {"AAA": 1})
+        holder = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(holder.close)
+        holder.execute("BEGIN IMMEDIATE")
+
+        started = time.monotonic()
+        with self.assertLogs("api.quote_store", "WARNING") as logs:
+            self.store.set_many("price", {"AAA": 2})
+            self.store.set_many("price", {"AAA": 3})
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(len(logs.output), 1)   # once per outage, not per call
+        self.assertEqual(self.store.stats()["errors_by_op"]["write"], 2)
+        # WAL readers aren't blocked by the writer
+        self.assertEqual(self.store.get_many("price", ["AAA"])["AAA"][0], 1)
+
+        holder.execute("ROLLBACK")
+        self.store.set_many("price", {"AAA": 4})
+        self.assertEqual(self.store.get_many("price", ["AAA"])["AAA"][0], 4)
+        self.assertEqual(self.store.stats()["errors"], 2)
+
+    def test_bad_values_are_counted_not_raised(self):
+        self.store.set_many("price", {"AAA": 1, "BBB": 2})
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("UPDATE quotes SET value = 'not json' WHERE key = 'BBB'")
+        with self.assertLogs("api.quote_store", "WARNING"):
+            found = self.store.get_many("price", ["AAA", "BBB"])
+            circular = []
+            circular.append(circular)
+            self.store.set_many("price", {"CCC": circular})
+        self.assertEqual(list(found), ["AAA"])
+        self.assertEqual(self.store.stats()["errors_by_op"], {"read": 1, "write": 1, "prune": 0, "clear": 0})
+
+
+class FakeBrotli:
+    @staticmethod
+    def compress(data, quality):
+        return b"br:" + gzip.compress(data)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = b'{"prices": [' + b",".join(b'{"p": %d}' % i for i in range(200)) + b"]}"
+
+    def respond(self, accept, response=None):
+        response = response or HttpResponse(self.body, content_type="application/json")
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        return middleware.CompressionMiddleware(lambda r: response)(request)
+
+    def test_gzip(self):
+        response = HttpResponse(self.body, content_type="application/json; charset=utf-8")
+        response["ETag"] = '"abc"'
+        response = self.respond("gzip, deflate", response)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+    def test_q_zero_refuses_a_coding(self):
+        for accept in ("gzip;q=0", "*;q=0", "identity", ""):
+            response = self.respond(accept)
+            self.assertFalse(response.has_header("Content-Encoding"), accept)
+            self.assertEqual(response.content, self.body)
+            # Cacheable per Accept-Encoding even when sent uncompressed
+            self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(self.respond("*;q=0.5")["Content-Encoding"], "gzip")
+
+    def test_brotli_only_when_installed(self):
+        with mock.patch.object(middleware, "brotli", None):
+            self.assertFalse(self.respond("br").has_header("Content-Encoding"))
+            self.assertEqual(self.respond("br, gzip")["Content-Encoding"], "gzip")
+        with mock.patch.object(middleware, "brotli", FakeBrotli):
+            response = self.respond("gzip, br")
+            self.assertEqual(response["Content-Encoding"], "br")
+            self.assertTrue(response.content.startswith(b"br:"))
+            self.assertEqual(self.respond("gzip, br;q=0")["Content-Encoding"], "gzip")
+
+    def test_small_and_non_text_bodies_are_left_alone(self):
+        small = HttpResponse(b'{"ok": true}', content_type="application/json")
+        self.assertFalse(self.respond("gzip", small).has_header("Content-Encoding"))
+        self.assertFalse(small.has_header("Vary"))
+        png = HttpResponse(self.body, content_type="image/png")
+        self.assertFalse(self.respond("gzip", png).has_header("Content-Encoding"))
+
+    def test_streaming(self):
+        events = StreamingHttpResponse(iter([b"data: 1\n\n"]), content_type="text/event-stream")
+        response = self.respond("gzip", events)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(response.streaming_content), b"data: 1\n\n")
+
+        lines = [b'{"symbol": "S%d"}\n' % i for i in range(50)]
+        ndjson = StreamingHttpResponse(iter(lines), content_type="application/x-ndjson")
+        response = self.respond("gzip", ndjson)
+        self.assertEqual((response["Content-Encoding"], response["Vary"]), ("gzip", "Accept-Encoding"))
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"".join(lines))
+
+
+def _raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+class SectorCompaniesTests(TestCase):
+    url = "/api/sectors/Utilities/companies-fast/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("dave", password="pw"))
+        self.symbols = sorted(rec["symbol"] for rec in _load_universe().companies_in_sector("Utilities"))
+
+    def test_cursor_round_trip(self):
+        cursor = _encode_cursor("name", ("Acme", "ACM", 7))
+        self.assertNotIn("=", cursor)
+        self.assertEqual(_decode_cursor(cursor, "name"), ("Acme", "ACM", 7))
+
+    def test_malformed_and_tampered_cursors(self):
+        bad = [
+            "!!!", "e30", _raw_cursor("text"), _raw_cursor(["symbol", "A", "A"]),
+            _raw_cursor(["symbol", "A", "A", "7"]), _raw_cursor(["symbol", 1, "A", 7]),
+            _raw_cursor(["symbol", "A", "A", True]), _raw_cursor({"a": 1, "b": 2, "c": 3, "d": 4}),
+            base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        ]
+        for cursor in bad:
+            with self.assertRaises(ValueError, msg=cursor):
+                _decode_cursor(cursor, "symbol")
+            response = self.client.get(self.url, {"cursor": cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+        # A cursor for another ordering
+        with self.assertRaises(ValueError):
+            _decode_cursor(_encode_cursor("symbol", ("A", "A", 0)), "name")
+
+        # Well-formed but made up: just a position in the order
+        response = self.client.get(self.url, {"cursor": _encode_cursor("symbol", ("~", "~", 0))})
+        self.assertEqual(response.json(), {"results": [], "next": None})
+
+    def test_pages_until_the_last(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 7, "fields": "symbol"} | ({"cursor": cursor} if cursor else {})
+            body = self.client.get(self.url, params).json()
+            seen += [rec["symbol"] for rec in body["results"]]
+            pages += 1
+            cursor = body["next"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.symbols)
+        self.assertEqual(pages, -(-len(self.symbols) // 7))
+
+    def test_ndjson(self):
+        params = {"limit": 5, "fields": "symbol"}
+        for response in (self.client.get(self.url, params, HTTP_ACCEPT="application/x-ndjson"),
+                         self.client.get(self.url, params | {"format": "ndjson"})):
+            self.assertEqual(response["Content-Type"], "application/x-ndjson")
+            lines = b"".join(response.streaming_content).decode().splitlines()
+            self.assertEqual([json.loads(line)["symbol"] for line in lines], self.symbols[:5])
+            self.assertEqual(_decode_cursor(response["X-Next-Cursor"], "symbol")[1], self.symbols[4])
+
+
+class AnalyticsComputeTests(SimpleTestCase):
+    def test_against_hand_computed_values(self):
+        closes = pd.DataFrame({
+            "A": [100.0, 110.0, 99.0, 99.0],       # returns .1, -.1, 0
+            "C": [50.0, np.nan, 55.0, 55.0],       # returns -, .1 (across the gap), 0
+            "D": [np.nan] * 4,
+            "B": [100.0, 102.0, 100.98, 101.9898],  # benchmark: .02, -.01, .01
+        })
+        stats, correlation = analytics.compute(closes, "B")
+
+        a, b, c = stats["A"], stats["B"], stats["C"]
+        self.assertAlmostEqual(a["return"], -0.01)
+        self.assertAlmostEqual(a["max_drawdown"], 99 / 110 - 1)
+        self.assertAlmostEqual(a["volatility"], (0.01 * 252) ** 0.5)   # sample variance .02 / 2
+        self.assertAlmostEqual(a["beta"], 45 / 7)                       # .003 / (.0042 / 9)
+        self.assertEqual(a["bars"], 3)
+
+        self.assertAlmostEqual(b["return"], 0.019898)
+        self.assertAlmostEqual(b["max_drawdown"], -0.01)
+        self.assertAlmostEqual(b["volatility"], (0.0042 / 9 / 2 * 252) ** 0.5)
+        self.assertAlmostEqual(b["beta"], 1.0)
+
+        self.assertAlmostEqual(c["return"], 0.1)
+        self.assertEqual((c["max_drawdown"], c["bars"]), (0.0, 2))
+        self.assertAlmostEqual(c["volatility"], (0.005 * 252) ** 0.5)
+        self.assertAlmostEqual(c["beta"], -5.0)                         # over the last two days only
+
+        self.assertEqual(stats["D"], {"return": None, "volatility": None, "max_drawdown": None,
+                                      "beta": None, "bars": 0})
+        self.assertAlmostEqual(correlation.loc["A", "B"], 0.009 / 0.000084 ** 0.5)
+        self.assertAlmostEqual(correlation.loc["A", "A"], 1.0)
+        self.assertTrue(np.isnan(correlation.loc["A", "D"]))
+
+
+class AnalyticsStaleTests(TestCase):
+    def setUp(self):
+        shared_store.clear()
+        analytics._results.clear()
+        self.client = APIClient()
+        user = User.objects.create_user("erin", password="pw")
+        self.client.force_authenticate(user)
+        self.watchlist = Watchlist.objects.create(user=user, name="Tech")
+        WatchlistItem.objects.create(watchlist=self.watchlist, symbol="AAA")
+        self.url = f"/api/watchlists/{self.watchlist.id}/analytics/"
+
+    def test_stale_result_looks_back_a_few_sessions(self):
+        self.assertEqual(analytics.stale_result(["AAA"], "1y", "SPY"), (None, None))
+        earlier = market_hours.session_date() - timedelta(days=3)
+        analytics._results.set(analytics.cache_key(["AAA"], "1y", "SPY", earlier), {"session": earlier.isoformat()})
+        result, age = analytics.stale_result(["AAA", "AAA"], "1y", "spy")
+        self.assertEqual(result, {"session": earlier.isoformat()})
+        self.assertLess(age, 5)
+        # Another window or benchmark is a different result
+        self.assertEqual(analytics.stale_result(["AAA"], "6mo", "SPY"), (None, None))
+
+    def test_view_falls_back_to_the_last_result(self):
+        with mock.patch.object(analytics, "analyze", side_effect=CircuitOpenError("market-data", 4)):
+            response = self.client.get(self.url, {"window": "1y"})
+            self.assertEqual((response.status_code, response["Retry-After"]), (503, "5"))
+
+            analytics._results.set(analytics.cache_key(["AAA"], "1y", analytics.BENCHMARK, market_hours.session_date()),
+                                   {"symbols": {"AAA": {"return": 0.5}}})
+            response = self.client.get(self.url, {"window": "1y"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["stale"])
+        self.assertEqual(response.json()["symbols"], {"AAA": {"return": 0.5}})
+
+        with mock.patch.object(analytics, "analyze", side_effect=ValueError("boom")):
+            self.assertEqual(self.client.get(self.url, {"window": "6mo"}).status_code, 500)
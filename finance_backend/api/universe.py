@@ -0,0 +1,388 @@
+# api/universe.py
+"""
+In-memory index over the company universe (all_companies.csv).
+
+Built once per CSV load so the sector endpoints become dictionary lookups
+instead of re-filtering the whole DataFrame on every request. UniverseLoader
+watches the file and rebuilds the index in the background when it changes.
+"""
+from bisect import bisect_right
+from functools import cached_property
+import hashlib
+import os
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .columnar import DictColumn, read_columnar, write_columnar
+from .fast_json import encode_objects, json_array, json_strings
+from .search_index import SearchIndex
+
+COLUMNS = ("symbol", "name", "exchange", "sector")
+# Low-cardinality columns stored dictionary-encoded
+DICT_COLUMNS = ("exchange", "sector")
+# Columns a sector listing can be sorted by; ties are broken by symbol
+ORDERINGS = ("symbol", "name")
+
+
+def normalize_sector(sector):
+    return (sector or "").strip().lower()
+
+
+class _Records:
+    """
+    Read-only sequence of record dicts decoded on demand from the columns.
+    """
+
+    def __init__(self, universe):
+        self._universe = universe
+
+    def __len__(self):
+        return len(self._universe)
+
+    def __getitem__(self, i):
+        return self._universe.record(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._universe.record(i)
+
+
+class CompanyUniverse:
+    """
+    Immutable snapshot of the company universe, stored by column.
+
+    - columns:      {"symbol", "name", "exchange", "sector"} -> sequence of str;
+                    lists when loaded from CSV, memory-mapped StringColumn /
+                    DictColumn when loaded from the columnar file
+    - records:      sequence of record dicts, decoded on access
+    - sector_rows:  normalized sector -> array of row positions
+    - sectors:      sorted display names of the known sectors
+    """
+
+    def __init__(self, columns):
+        self.columns = {c: columns[c] for c in COLUMNS}
+        self.records = _Records(self)
+        self._rows = len(self.columns["symbol"])
+
+        self._orders = {}   # (sector, ordering) -> (rows, sort keys)
+        self._symbol_rows = {}
+        for i, symbol in enumerate(self.columns["symbol"]):
+            self._symbol_rows.setdefault(symbol, i)
+
+        # Group rows by sector code, so the index costs one pass over a small
+        # integer array rather than over the strings
+        sector = self.columns["sector"]
+        if not isinstance(sector, DictColumn):
+            sector = DictColumn.from_values(sector)
+        codes_by_sector = {}
+        display = set()
+        for code, value in enumerate(sector.values):
+            codes_by_sector.setdefault(normalize_sector(value), []).append(code)
+            name = value.strip()
+            if name and name.lower() != "unknown":
+                display.add(name)
+
+        self.sector_rows = {
+            key: np.flatnonzero(np.isin(sector.codes, codes))
+            for key, codes in codes_by_sector.items()
+        }
+        self.sectors = sorted(display)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        columns = {c: df[c].astype(str).tolist() for c in COLUMNS}
+        for c in DICT_COLUMNS:
+            columns[c] = DictColumn.from_values(columns[c])
+        return cls(columns)
+
+    @classmethod
+    def from_columnar(cls, path):
+        return cls(read_columnar(path))
+
+    def __len__(self):
+        return self._rows
+
+    def record(self, i):
+        return {c: self.columns[c][i] for c in COLUMNS}
+
+    def get(self, symbol):
+        i = self._symbol_rows.get(symbol)
+        return None if i is None else self.record(i)
+
+    @cached_property
+    def search_index(self):
+        # Built on first search rather than on every CSV load, straight from
+        # the columns
+        return SearchIndex(self.columns["symbol"], self.columns["name"], self.columns["exchange"])
+
+    @cached_property
+    def json_columns(self):
+        # Every value JSON-encoded once per snapshot, so listings are
+        # rendered from arrays rather than record dicts
+        return {c: json_strings(self.columns[c]) for c in COLUMNS}
+
+    @cached_property
+    def json_records(self):
+        # Every record as a JSON object string
+        return encode_objects(self.json_columns, COLUMNS)
+
+    def search(self, query, limit=10):
+        return self.search_index.search(query, limit=limit)
+
+    def has_sector(self, sector):
+        return len(self.sector_rows.get(normalize_sector(sector), ())) > 0
+
+    def companies_in_sector(self, sector):
+        """
+        All records in sector (case/whitespace-insensitive), in CSV order.
+        """
+        return [self.record(i) for i in self.sector_rows.get(normalize_sector(sector), ())]
+
+    def rows_json(self, rows, fields=COLUMNS):
+        """
+        Object array of the records at row positions rows, each encoded as
+        a JSON object with just the given fields.
+        """
+        if len(rows) == 0:
+            return ()
+        if tuple(fields) == COLUMNS:
+            return self.json_records[rows]
+        return encode_objects(self.json_columns, fields, rows)
+
+    def sector_json(self, sector, fields=COLUMNS):
+        """
+        companies_in_sector as encoded JSON (fast_json.RawJSON).
+        """
+        return json_array(self.rows_json(self.sector_rows.get(normalize_sector(sector), ()), fields))
+
+    def sector_order(self, sector, ordering):
+        """
+        Row positions of sector sorted by (ordering column, symbol, row
+        position), with those sort keys. Built once per sector and ordering.
+        """
+        key = (normalize_sector(sector), ordering)
+        order = self._orders.get(key)
+        if order is None:
+            values, symbols = self.columns[ordering], self.columns["symbol"]
+            keys = sorted((values[i], symbols[i], int(i)) for i in self.sector_rows.get(key[0], ()))
+            order = (np.array([k[2] for k in keys], dtype=np.int64), keys)
+            self._orders[key] = order
+        return order
+
+    def sector_page(self, sector, ordering="symbol", after=None, limit=None):
+        """
+        Row positions of up to limit records of sector in ordering, starting
+        after the sort key after (see sector_order). Returns (rows, next key),
+        the next key being None on the last page. Keys hold values rather
+        than positions alone, so paging carries on sensibly across a reload.
+        """
+        rows, keys = self.sector_order(sector, ordering)
+        start = bisect_right(keys, tuple(after)) if after else 0
+        end = len(rows) if limit is None else min(len(rows), start + limit)
+        return rows[start:end], (keys[end - 1] if end < len(rows) else None)
+
+    def sample_sector(self, sector, n, exclude=()):
+        """
+        Up to n random records from sector, skipping symbols in exclude.
+        """
+        candidates = self.companies_in_sector(sector)
+        if exclude:
+            candidates = [rec for rec in candidates if rec["symbol"] not in exclude]
+        return random.sample(candidates, min(n, len(candidates)))
+
+
+def read_companies_csv(path):
+    """
+    Load the companies CSV into a DataFrame.
+    Ensure that symbol, name, exchange, and sector columns exist.
+    Fallback: if sector is missing, try industry column.
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=list(COLUMNS))
+
+    df = pd.read_csv(path, dtype=str).fillna("")
+    df.columns = [c.strip() for c in df.columns]
+
+    # Normalize expected column names
+    rename_map = {}
+    for c in df.columns:
+        lc = c.lower()
+        if lc in ["ticker", "symbol"]:
+            rename_map[c] = "symbol"
+        elif lc in ["company name", "name", "longname"]:
+            rename_map[c] = "name"
+        elif lc in ["exchange", "exchange name"]:
+            rename_map[c] = "exchange"
+        elif lc == "sector":
+            rename_map[c] = "sector"
+        elif lc == "gics sector":
+            rename_map[c] = "sector"
+        elif lc == "industry" and "sector" not in [x.lower() for x in df.columns]:
+            # If no sector column exists, use industry as proxy
+            rename_map[c] = "sector"
+    if rename_map:
+        df = df.rename(columns=rename_map)
+
+    # Ensure required columns exist
+    for col in COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+
+    # Fallback: fill empty sectors with industry if available
+    if "industry" in df.columns:
+        df.loc[df["sector"].eq(""), "sector"] = df["industry"]
+
+    # Normalize values
+    df["sector"] = df["sector"].astype(str).str.strip()
+    return df
+
+
+def write_universe_columnar(df, path):
+    """
+    Write a normalized companies DataFrame (see read_companies_csv) to the
+    compact columnar file that UniverseLoader can memory-map.
+    """
+    write_columnar(path, {c: df[c].astype(str).tolist() for c in COLUMNS}, dict_columns=DICT_COLUMNS)
+
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _content_hash(path):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UniverseSnapshot:
+    def __init__(self, universe, version, source, stat, content_hash, load_duration):
+        self.universe = universe
+        self.version = version
+        self.source = source
+        self.stat = stat
+        self.content_hash = content_hash
+        self.load_duration = load_duration
+        self.loaded_at = time.time()
+
+
+class UniverseLoader:
+    """
+    Serves the current CompanyUniverse snapshot and reloads it only when the
+    file's mtime/size and then its content hash change.
+
+    If columnar_path exists and is at least as new as the CSV, the universe
+    is memory-mapped from it instead of parsing the CSV.
+
+    The first load happens on the calling thread (there is nothing to serve
+    yet). After that, changes are picked up by a background thread and the
+    new snapshot is published by swapping a single reference, so readers
+    never wait. A failed reload keeps the last good snapshot.
+    """
+
+    def __init__(self, path, columnar_path=None, check_interval=5.0):
+        self.path = path
+        self.columnar_path = columnar_path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._load_lock = threading.Lock()   # serializes loads, never held by readers
+        self._reload_lock = threading.Lock()   # held while a background reload is pending
+        self._last_check = 0.0
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+
+    def snapshot(self):
+        snap = self._snapshot
+        if snap is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._load(self._signature())
+            return self._snapshot
+
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval and self._reload_lock.acquire(blocking=False):
+            # Only one thread checks and starts a reload; the lock is handed
+            # over to the reload thread, which releases it when done
+            started = False
+            try:
+                self._last_check = now
+                stat = self._signature()
+                if stat != snap.stat:
+                    threading.Thread(target=self._reload, args=(stat,), name="universe-reload", daemon=True).start()
+                    started = True
+            finally:
+                if not started:
+                    self._reload_lock.release()
+        return snap
+
+    def universe(self):
+        return self.snapshot().universe
+
+    def _signature(self):
+        return (_stat_signature(self.path), _stat_signature(self.columnar_path) if self.columnar_path else None)
+
+    def _use_columnar(self, stat):
+        csv_stat, columnar_stat = stat
+        return columnar_stat is not None and (csv_stat is None or columnar_stat[0] >= csv_stat[0])
+
+    def _reload(self, stat):
+        try:
+            with self._load_lock:
+                self._load(stat)
+        except Exception as e:
+            # Keep serving the last good snapshot
+            self.failures += 1
+            self.last_error = str(e)
+        finally:
+            self._reload_lock.release()
+
+    def _load(self, stat):
+        started = time.perf_counter()
+        columnar = self._use_columnar(stat)
+        source = self.columnar_path if columnar else self.path
+        current = self._snapshot
+        if current is not None and stat[0] is None and not columnar:
+            # A missing file mid-reload (deleted, or being replaced) is not
+            # an empty universe
+            raise FileNotFoundError(f"{source} is missing; keeping version {current.version}")
+        content_hash = (columnar, _content_hash(source))
+
+        if current is not None and content_hash == current.content_hash:
+            # Touched but unchanged: remember the new stat so we stop rehashing
+            current.stat = stat
+            return
+
+        if columnar:
+            universe = CompanyUniverse.from_columnar(source)
+        else:
+            universe = CompanyUniverse.from_dataframe(read_companies_csv(source))
+
+        version = current.version + 1 if current is not None else 1
+        self._snapshot = UniverseSnapshot(universe, version, source, stat, content_hash, time.perf_counter() - started)
+        self.reloads += 1
+
+    def stats(self):
+        snap = self._snapshot
+        return {
+            "version": snap.version if snap else 0,
+            "source": snap.source if snap else None,
+            "load_duration": snap.load_duration if snap else None,
+            "loaded_at": snap.loaded_at if snap else None,
+            "rows": len(snap.universe) if snap else 0,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
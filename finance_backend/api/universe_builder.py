@@ -0,0 +1,397 @@
+# api/universe_builder.py
+"""
+Parallel, resumable builder for all_companies.csv.
+
+Metadata for each symbol is fetched by a pluggable fetcher on a bounded pool
+of worker threads, throttled by a per-host rate limiter. Every finished
+symbol is appended to a JSONL checkpoint straight away, so an interrupted run
+picks up where it stopped; the final CSV is written atomically. Only a few
+fetches per worker are queued at a time, so Ctrl-C stops the run promptly.
+
+refresh() is the incremental mode: it diffs the current listings against an
+existing output file and only fetches added symbols and rows older than a
+maximum age, dropping delisted symbols and writing a JSON changelog.
+
+A fetcher is any callable taking a symbol and returning a record dict (or
+None when there is no data), with a ``host`` attribute naming the upstream
+it talks to. This module has no Django dependency so it can run from
+scripts/ and be driven by a fake fetcher in tests.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+import csv
+from itertools import islice
+import json
+import os
+import tempfile
+import threading
+import time
+
+OUTPUT_COLUMNS = [
+    "symbol", "name", "exchange", "sector", "industry",
+    "price", "daily_change", "daily_change_percent", "fetched_at",
+]
+
+# Fields compared when reporting changed metadata in the changelog
+METADATA_FIELDS = ["name", "exchange", "sector", "industry"]
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: at most `rate` acquisitions per second, with
+    bursts of up to `burst`.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """
+    One RateLimiter per upstream host.
+    """
+
+    def __init__(self, rate, burst=1, overrides=None):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides or {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = RateLimiter(self.overrides.get(host, self.rate), self.burst)
+                self._limiters[host] = limiter
+        limiter.acquire()
+
+
+class YahooInfoFetcher:
+    """
+    Fetch company metadata from yfinance's Ticker.info.
+    """
+
+    host = "query2.finance.yahoo.com"
+
+    def __init__(self, require_name=False):
+        self.require_name = require_name
+
+    def __call__(self, symbol):
+        import yfinance as yf
+
+        from .http_client import yfinance_session
+
+        info = yf.Ticker(symbol, session=yfinance_session()).info or {}
+        name = info.get("shortName") or info.get("longName")
+        if self.require_name and not name:
+            return None
+        return {
+            "symbol": symbol,
+            "name": name or "N/A",
+            "exchange": info.get("exchange", "UNKNOWN"),
+            "sector": info.get("sector", "Unknown"),
+            "industry": info.get("industry", "Unknown"),
+            "price": info.get("regularMarketPrice"),
+            "daily_change": info.get("regularMarketChange"),
+            "daily_change_percent": info.get("regularMarketChangePercent"),
+        }
+
+
+class Checkpoint:
+    """
+    Append-only JSONL log of finished symbols.
+    Each line is {"symbol": ..., "record": {...} | null} or {"symbol": ..., "error": ...}.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Return {symbol: record or None} for symbols that finished without
+        error. Failed symbols are left out so they are retried.
+        """
+        done = {}
+        if not self.path or not os.path.exists(self.path):
+            return done
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue   # torn last line from an interrupted write
+                if "error" in entry:
+                    done.pop(entry["symbol"], None)
+                else:
+                    done[entry["symbol"]] = entry.get("record")
+        return done
+
+    def append(self, entry):
+        if not self.path:
+            return
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def write_csv_atomic(path, records, columns=OUTPUT_COLUMNS):
+    """
+    Write records to path via a temporary file and os.replace, so readers
+    (e.g. the API's UniverseLoader) never see a half-written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".companies-", suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            for rec in records:
+                writer.writerow({c: "" if rec.get(c) is None else rec.get(c) for c in columns})
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class UniverseBuilder:
+    def __init__(self, fetcher, max_workers=8, rate=5.0, burst=5, checkpoint_path=None, progress=True):
+        self.fetcher = fetcher
+        self.max_workers = max_workers
+        self.window = max_workers * 2   # fetches queued at a time
+        self.limiter = HostRateLimiter(rate, burst)
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.progress = progress
+        self.stats = {"fetched": 0, "resumed": 0, "failed": 0, "empty": 0}
+
+    def _fetch_one(self, symbol):
+        self.limiter.acquire(getattr(self.fetcher, "host", "default"))
+        record = self.fetcher(symbol)
+        if record is not None:
+            record = dict(record, fetched_at=_utcnow().isoformat(timespec="seconds"))
+        return record
+
+    def _finish(self, symbol, future, results):
+        try:
+            record = future.result()
+        except Exception as e:
+            self.stats["failed"] += 1
+            self.checkpoint.append({"symbol": symbol, "error": str(e)})
+        else:
+            results[symbol] = record
+            self.stats["fetched"] += 1
+            if record is None:
+                self.stats["empty"] += 1
+            self.checkpoint.append({"symbol": symbol, "record": record})
+
+    def fetch(self, symbols):
+        """
+        Fetch records for symbols, resuming from the checkpoint.
+        Returns {symbol: record or None}; symbols that raised are left out.
+        """
+        results = self.checkpoint.load()
+        results = {s: results[s] for s in symbols if s in results}
+        self.stats["resumed"] = len(results)
+        pending = [s for s in symbols if s not in results]
+
+        bar = None
+        if self.progress:
+            try:
+                from tqdm import tqdm
+                bar = tqdm(total=len(pending), desc="Fetching data from Yahoo Finance")
+            except ImportError:
+                pass
+
+        # Submit in a bounded window rather than all at once, so an interrupt
+        # only has the fetches already running to wait for
+        queue = iter(pending)
+        in_flight = {}
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while True:
+                for symbol in islice(queue, self.window - len(in_flight)):
+                    in_flight[pool.submit(self._fetch_one, symbol)] = symbol
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._finish(in_flight.pop(future), future, results)
+                    if bar is not None:
+                        bar.update(1)
+        except BaseException:
+            # KeyboardInterrupt included: drop the queued fetches; everything
+            # finished so far is already in the checkpoint
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        else:
+            pool.shutdown()
+        finally:
+            if bar is not None:
+                bar.close()
+        return results
+
+    def build(self, symbols, output_path, columns=OUTPUT_COLUMNS):
+        """
+        Fetch every symbol and atomically write the output CSV in input
+        order. The checkpoint is removed only if every symbol succeeded, so a
+        rerun retries just the failures.
+        """
+        results = self.fetch(symbols)
+        records = [results[s] for s in symbols if results.get(s)]
+        write_csv_atomic(output_path, records, columns)
+        if self.stats["failed"] == 0:
+            self.checkpoint.remove()
+        return records
+
+    def refresh(self, symbols, existing_path, output_path, max_age=timedelta(days=30),
+                changelog_path=None, columns=OUTPUT_COLUMNS):
+        """
+        Incrementally update existing_path for the listed symbols:
+        fetch symbols that are new or whose row is older than max_age, keep
+        the rest as they are, and drop symbols that are no longer listed.
+        A stale row whose refetch fails or comes back empty is kept. Kept rows
+        without a fetched_at are written with the existing file's mtime.
+        Writes output_path and, if given, a JSON changelog; returns the changelog.
+        """
+        existing = read_records(existing_path)
+        default_fetched_at = _file_time(existing_path)
+        plan = plan_refresh(existing, symbols, max_age, default_fetched_at=default_fetched_at)
+
+        to_fetch = plan["added"] + plan["stale"]
+        results = self.fetch(to_fetch)
+        to_fetch = set(to_fetch)
+
+        records = []
+        changed = []
+        failed = []
+        for symbol in symbols:
+            old = existing.get(symbol)
+            new = results.get(symbol)
+            if new:
+                records.append(new)
+                if old is not None:
+                    diff = {f: [old.get(f, ""), _str(new.get(f))] for f in METADATA_FIELDS
+                            if (old.get(f) or "") != _str(new.get(f))}
+                    if diff:
+                        changed.append({"symbol": symbol, "fields": diff})
+            elif old is not None:
+                if not old.get("fetched_at") and default_fetched_at is not None:
+                    # Write down the age the plan gave it, or it would be
+                    # re-dated by the new file's mtime and never go stale
+                    old = dict(old, fetched_at=default_fetched_at.isoformat(timespec="seconds"))
+                records.append(old)
+            if symbol in to_fetch and symbol not in results:
+                failed.append(symbol)
+
+        write_csv_atomic(output_path, records, columns)
+        if self.stats["failed"] == 0:
+            self.checkpoint.remove()
+
+        changelog = {
+            "generated_at": _utcnow().isoformat(timespec="seconds"),
+            "listed": len(symbols),
+            "written": len(records),
+            "added": [s for s in plan["added"] if results.get(s)],
+            "removed": plan["removed"],
+            "refreshed": [s for s in plan["stale"] if results.get(s)],
+            "changed": changed,
+            "failed": failed,
+            "upstream_calls": self.stats["fetched"] + self.stats["failed"],
+        }
+        if changelog_path:
+            directory = os.path.dirname(os.path.abspath(changelog_path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".changelog-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(changelog, f, indent=2)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, changelog_path)
+        return changelog
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _str(value):
+    return "" if value is None else str(value)
+
+
+def _file_time(path):
+    if not os.path.exists(path):
+        return None
+    return datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+
+
+# Headers used by older versions of the generators
+_LEGACY_HEADERS = {"Ticker": "symbol", "Company Name": "name", "Sector": "sector"}
+
+
+def read_records(path):
+    """
+    Read an existing output CSV into {symbol: row dict}, mapping the older
+    "Ticker" / "Company Name" / "Sector" headers onto the current columns.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row = {_LEGACY_HEADERS.get(k, k): v for k, v in row.items()}
+            if row.get("symbol"):
+                records[row["symbol"]] = row
+    return records
+
+
+def plan_refresh(existing, symbols, max_age, now=None, default_fetched_at=None):
+    """
+    Diff the listed symbols against existing rows ({symbol: row}).
+    Returns {"added", "stale", "removed", "fresh"} symbol lists. Rows without
+    a fetched_at column are dated default_fetched_at (typically the file's
+    mtime), or treated as stale if that's unknown too.
+    """
+    now = now or _utcnow()
+    listed = set(symbols)
+    plan = {"added": [], "stale": [], "fresh": [], "removed": sorted(set(existing) - listed)}
+
+    for symbol in symbols:
+        row = existing.get(symbol)
+        if row is None:
+            plan["added"].append(symbol)
+            continue
+        fetched_at = default_fetched_at
+        if row.get("fetched_at"):
+            try:
+                fetched_at = datetime.fromisoformat(row["fetched_at"])
+            except ValueError:
+                fetched_at = None
+        if fetched_at is None or now - fetched_at > max_age:
+            plan["stale"].append(symbol)
+        else:
+            plan["fresh"].append(symbol)
+    return plan
@@ -1,19 +1,33 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Under the ASGI server the upstream-bound endpoints are served by their async
+# versions, which await the provider instead of blocking a worker thread
+if getattr(settings, "API_ASYNC_VIEWS", False):
+    search_stock, company_details, get_prices_for_symbols = (
+        views.search_stock_async, views.company_details_async, views.get_prices_for_symbols_async)
+else:
+    search_stock, company_details, get_prices_for_symbols = (
+        views.search_stock, views.company_details, views.get_prices_for_symbols)
+
 urlpatterns = [
     path('register/', views.register),
     path('login/', views.login),
-    path('search-stock/', views.search_stock),
-    path('company/<str:symbol>/', views.company_details),
+    path('search-stock/', search_stock),
+    path('company/<str:symbol>/', company_details),
     path('watchlists/', views.get_watchlists),
     path('watchlists/create/', views.create_watchlist),
+    path('watchlists/stream/', views.watchlist_stream, name='watchlist_stream'),
     path('watchlists/<int:watchlist_id>/add/', views.add_to_watchlist),
     path('watchlists/<int:watchlist_id>/remove/<int:item_id>/', views.remove_from_watchlist),
     path('watchlists/<int:watchlist_id>/add-random/', views.add_random_companies),
+    path('watchlists/<int:watchlist_id>/analytics/', views.watchlist_analytics, name='watchlist_analytics'),
     path('sectors/', views.get_sectors), 
     path("watchlists/<int:watchlist_id>/delete/", views.delete_watchlist, name="delete_watchlist"),
     path("watchlists/create-with-random/", views.create_watchlist_with_random_companies, name="create_watchlist_with_random"),
     path("sectors/<str:sector_name>/companies-fast/", views.get_companies_by_sector_fast, name="get_companies_by_sector_fast"),
-    path("prices/", views.get_prices_for_symbols, name="get_prices_for_symbols"),
+    path("history/<str:symbol>/", views.price_history, name="price_history"),
+    path("prices/", get_prices_for_symbols, name="get_prices_for_symbols"),
+    path("metrics/", views.metrics_view, name="metrics"),
 ]
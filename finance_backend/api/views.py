@@ -1,87 +1,80 @@
 # api/views.py
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import Watchlist, WatchlistItem
-from .serializers import WatchlistSerializer, WatchlistItemSerializer
+from .serializers import WatchlistSerializer, WatchlistItemSerializer, get_quote_info, STALE_MAX_AGE
+from .circuit_breaker import CircuitOpenError
+from . import analytics, company_cache, fast_json, history_store, metrics, price_engine, watchlist_feed
+from .quote_cache import quote_cache
+from .universe import COLUMNS, ORDERINGS, UniverseLoader, normalize_sector
+from .fast_json import RawJSON, json_array
+from .renderers import FastJSONRenderer, NDJSONRenderer
+from .providers import get_provider
+from .singleflight import async_upstream_flight, upstream_flight
+from .streaming import PriceHub, sse_price_events
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+import base64
+import binascii
+import hmac
+import json
+import os
 
-import requests
-import random
 import pandas as pd
-import os
-from threading import Lock
-import yfinance as yf
-import time
 
 # Path to the CSV file created by the script above.
 # Place companies.csv at the project root or adjust this path
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # api/..
 CSV_PATH = os.path.join(BASE_DIR, "all_companies.csv")
+# Optional memory-mapped copy built by `manage.py build_universe`
+COLUMNAR_PATH = os.path.join(BASE_DIR, "all_companies.bin")
 
-# Simple thread-safe in-memory cache for CSV content (so we don't hit disk repeatedly)
-_CSV_CACHE = {"ts": None, "df": None}
-_CSV_LOCK = Lock()
+# The universe is reloaded in the background only when the file changes;
+# requests always read the last published snapshot without locking.
+_UNIVERSE = UniverseLoader(CSV_PATH, COLUMNAR_PATH, check_interval=getattr(settings, "UNIVERSE_CHECK_INTERVAL", 5.0))
 
 
-def _load_companies_csv():
+def _load_universe():
     """
-    Return the DataFrame loaded from CSV. Cache for a short period (e.g., 60s).
-    Ensure that symbol, name, exchange, and sector columns exist.
-    Fallback: if sector is missing, try industry column.
+    Return the current CompanyUniverse snapshot.
     """
-    with _CSV_LOCK:
-        now = time.time()
-        if _CSV_CACHE["df"] is not None and (now - (_CSV_CACHE.get("ts") or 0) < 60):
-            return _CSV_CACHE["df"]
-
-        if not os.path.exists(CSV_PATH):
-            _CSV_CACHE["df"] = pd.DataFrame(columns=["symbol", "name", "exchange", "sector"])
-            _CSV_CACHE["ts"] = now
-            return _CSV_CACHE["df"]
-
-        df = pd.read_csv(CSV_PATH, dtype=str).fillna("")
-        df.columns = [c.strip() for c in df.columns]
-
-        # Normalize expected column names
-        rename_map = {}
-        for c in df.columns:
-            lc = c.lower()
-            if lc in ["ticker", "symbol"]:
-                rename_map[c] = "symbol"
-            elif lc in ["company name", "name", "longname"]:
-                rename_map[c] = "name"
-            elif lc in ["exchange", "exchange name"]:
-                rename_map[c] = "exchange"
-            elif lc == "sector":
-                rename_map[c] = "sector"
-            elif lc == "gics sector":
-                rename_map[c] = "sector"
-            elif lc == "industry" and "sector" not in [x.lower() for x in df.columns]:
-                # If no sector column exists, use industry as proxy
-                rename_map[c] = "sector"
-        if rename_map:
-            df = df.rename(columns=rename_map)
+    return _UNIVERSE.universe()
 
-        # Ensure required columns exist
-        for col in ("symbol", "name", "exchange", "sector"):
-            if col not in df.columns:
-                df[col] = ""
 
-        # Fallback: fill empty sectors with industry if available
-        if "industry" in df.columns:
-            df.loc[df["sector"].eq(""), "sector"] = df["industry"]
-
-        # Normalize values
-        df["sector"] = df["sector"].astype(str).str.strip()
+async def _authenticate_async(request, allow_query_token=False):
+    """
+    JWT authentication for the plain async views, which DRF's @api_view
+    can't wrap. Returns the user, or None if the token is missing or invalid.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else None
+    if raw_token is None and allow_query_token:
+        raw_token = request.GET.get("token", "").encode()
+    try:
+        if not raw_token:
+            raise InvalidToken("Token missing")
+        return await sync_to_async(auth.get_user)(auth.get_validated_token(raw_token))
+    except (AuthenticationFailed, TokenError):
+        return None
 
-        _CSV_CACHE["df"] = df
-        _CSV_CACHE["ts"] = now
-        return df
 
+def _unauthorized():
+    return JsonResponse({"error": "Invalid or missing token"}, status=status.HTTP_401_UNAUTHORIZED)
 
 
 # --------------------
@@ -124,96 +117,137 @@ def login(request):
 
 # --------------------
 # Search stock symbols
-# (unchanged)
 # --------------------
+SEARCH_LOCAL_MIN_RESULTS = getattr(settings, "SEARCH_LOCAL_MIN_RESULTS", 3)
+SEARCH_REMOTE_FALLBACK = getattr(settings, "SEARCH_REMOTE_FALLBACK", True)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def search_stock(request):
+    """
+    Search the local company universe first; only fall back to the provider when
+    there are fewer than SEARCH_LOCAL_MIN_RESULTS local matches.
+    """
     query = request.GET.get('q', '').strip()
     if not query:
         return Response({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-    url = "https://query2.finance.yahoo.com/v1/finance/search"
-    params = {"q": query, "lang": "en-US", "region": "US", "quotesCount": 10, "newsCount": 0}
-    headers = {"User-Agent": "Mozilla/5.0"}
+    limit = 10
+    companies = _load_universe().search(query, limit=limit)
+    if len(companies) >= SEARCH_LOCAL_MIN_RESULTS or not SEARCH_REMOTE_FALLBACK:
+        return Response(companies)
 
     try:
-        r = requests.get(url, params=params, headers=headers, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-
-        companies = [
-            {
-                'symbol': item.get('symbol'),
-                'name': item.get('shortname') or item.get('longname'),
-                'exchange': item.get('exchange')
-            }
-            for item in data.get('quotes', [])
-            if item.get('symbol') and (item.get('shortname') or item.get('longname'))
-        ]
-
-        if not companies:
-            return Response([], status=status.HTTP_200_OK)
-
-        return Response(companies)
+        # Keystrokes from many tabs for the same query share one upstream call
+        remote = upstream_flight.do(("search", query.lower()), get_provider().search, query, limit)
     except Exception as e:
-        return Response({'error': 'Failed to fetch from Yahoo Finance', 'details': str(e)},
+        if companies:
+            return Response(companies)
+        return Response({'error': 'Failed to fetch from market data provider', 'details': str(e)},
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    return Response(_merge_search_results(companies, remote, limit))
+
+
+def _merge_search_results(companies, remote, limit):
+    seen = {c['symbol'] for c in companies}
+    return companies + [c for c in remote if c['symbol'] not in seen][:limit - len(companies)]
+
+
+@require_GET
+async def search_stock_async(request):
+    """
+    search_stock for the ASGI server: the provider fallback is awaited on
+    the event loop instead of holding a worker thread.
+    """
+    if await _authenticate_async(request) is None:
+        return _unauthorized()
+
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    limit = 10
+    companies = _load_universe().search(query, limit=limit)
+    if len(companies) >= SEARCH_LOCAL_MIN_RESULTS or not SEARCH_REMOTE_FALLBACK:
+        return JsonResponse(companies, safe=False)
+
+    try:
+        remote = await async_upstream_flight.do(("search", query.lower()), get_provider().asearch, query, limit)
+    except Exception as e:
+        if companies:
+            return JsonResponse(companies, safe=False)
+        return JsonResponse({'error': 'Failed to fetch from market data provider', 'details': str(e)},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return JsonResponse(_merge_search_results(companies, remote, limit), safe=False)
+
 
 # --------------------
-# Company details (unchanged)
+# Company details
 # -------------------- 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def company_details(request, symbol):
-    import yfinance as yf
-
     try:
-        ticker = yf.Ticker(symbol)
+        # Profile from the shared store, price from the short-TTL tier;
+        # only a first view waits for the full upstream info call
+        info, age = company_cache.get_company_info(symbol)
+    except Exception as e:
+        body, code, headers = _company_details_fallback(symbol, e)
+        return Response(body, status=code, headers=headers)
+
+    return Response(_company_payload(info, symbol, age))
 
-        # Try new method (get_info), fallback to fast_info
-        try:
-            info = ticker.get_info() or {}
-        except Exception:
-            info = {}
-
-        if not info:
-            try:
-                fi = ticker.fast_info
-                info = {
-                    "symbol": symbol,
-                    "longName": getattr(fi, "shortName", symbol),
-                    "regularMarketPrice": getattr(fi, "last_price", None),
-                    "exchangeName": getattr(fi, "exchange", None),
-                }
-            except Exception:
-                info = {}
-
-        price_data = {
-            "symbol": info.get("symbol", symbol),
-            "longName": info.get("longName"),
-            "regularMarketPrice": info.get("regularMarketPrice"),
-            "regularMarketChange": info.get("regularMarketChange"),
-            "regularMarketChangePercent": info.get("regularMarketChangePercent"),
-            "exchangeName": info.get("exchangeName"),
-        }
-
-        profile_data = {
-            "sector": info.get("sector"),
-            "industry": info.get("industry"),
-            "longBusinessSummary": info.get("longBusinessSummary"),
-            "website": info.get("website"),
-            "country": info.get("country"),
-        }
-
-        return Response({"price": price_data, "summaryProfile": profile_data})
 
+def _company_payload(info, symbol, age=None):
+    price_data = {
+        "symbol": info.get("symbol", symbol),
+        "longName": info.get("longName"),
+        "regularMarketPrice": info.get("regularMarketPrice"),
+        "regularMarketChange": info.get("regularMarketChange"),
+        "regularMarketChangePercent": info.get("regularMarketChangePercent"),
+        "exchangeName": info.get("exchangeName"),
+    }
+
+    profile_data = {
+        "sector": info.get("sector"),
+        "industry": info.get("industry"),
+        "longBusinessSummary": info.get("longBusinessSummary"),
+        "website": info.get("website"),
+        "country": info.get("country"),
+    }
+
+    return {"price": price_data, "summaryProfile": profile_data, "stale": age is not None, "age": age}
+
+
+def _company_details_fallback(symbol, error):
+    """
+    Response for a failed upstream call: the last known info flagged as
+    stale if there is one, else 503 while the circuit is open or 500.
+    """
+    info, age = quote_cache.get_stale(symbol.upper(), STALE_MAX_AGE)
+    if info:
+        return _company_payload(info, symbol, round(age, 1)), status.HTTP_200_OK, None
+    if isinstance(error, CircuitOpenError):
+        return ({"error": "Market data temporarily unavailable", "details": str(error)},
+                status.HTTP_503_SERVICE_UNAVAILABLE, {"Retry-After": str(int(error.retry_after) + 1)})
+    return ({"error": "Failed to fetch company details", "details": str(error)},
+            status.HTTP_500_INTERNAL_SERVER_ERROR, None)
+
+
+@require_GET
+async def company_details_async(request, symbol):
+    if await _authenticate_async(request) is None:
+        return _unauthorized()
+    try:
+        info, age = await company_cache.aget_company_info(symbol)
     except Exception as e:
-        return Response(
-            {"error": "Failed to fetch company details", "details": str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        body, code, headers = _company_details_fallback(symbol, e)
+        return JsonResponse(body, status=code, headers=headers)
+
+    return JsonResponse(_company_payload(info, symbol, age))
 
 
 
@@ -223,9 +257,77 @@ def company_details(request, symbol):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_watchlists(request):
-    watchlists = Watchlist.objects.filter(user=request.user).prefetch_related('items')
-    serializer = WatchlistSerializer(watchlists, many=True)
-    return Response(serializer.data)
+    """
+    GET /api/watchlists/[?since=<version>]
+    The user's watchlists with quotes, tagged with an ETag of the feed
+    version. If-None-Match (or since=) with the current version gets a 304;
+    since= with an older version gets only the changes (api/watchlist_feed.py).
+    """
+    feed = watchlist_feed.build(request.user)
+    etag = f'"{feed.version}"'
+    since = request.query_params.get("since")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag in _parse_etags(request.headers.get("If-None-Match", "")) or since == feed.version:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    feed.save_snapshot()
+    body = feed.delta(since) if since else feed.payload()
+    return Response(body, headers=headers)
+
+
+def _parse_etags(header):
+    # Weak validators match too: a compressing proxy may have added W/
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+# --------------------
+# Live price stream for watchlists (Server-Sent Events, ASGI only)
+# --------------------
+_PRICE_HUB = None
+
+
+def _yahoo_price_source(symbol):
+    info = get_quote_info(symbol)
+    return {
+        "current_price": info.get("regularMarketPrice"),
+        "change": info.get("regularMarketChange"),
+        "change_percent": info.get("regularMarketChangePercent"),
+    }
+
+
+def get_price_hub():
+    """
+    Process-wide hub shared by every stream connection. Created lazily so it
+    binds to the ASGI server's event loop.
+    """
+    global _PRICE_HUB
+    if _PRICE_HUB is None:
+        _PRICE_HUB = PriceHub(_yahoo_price_source, interval=getattr(settings, "PRICE_STREAM_INTERVAL", 10.0))
+    return _PRICE_HUB
+
+
+async def watchlist_stream(request):
+    """
+    GET /api/watchlists/stream/
+    Push price changes for every symbol in the user's watchlists.
+    EventSource can't send headers, so the JWT may also be passed as ?token=.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Streaming requires the ASGI server"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    user = await _authenticate_async(request, allow_query_token=True)
+    if user is None:
+        return _unauthorized()
+
+    symbols = await sync_to_async(
+        lambda: set(WatchlistItem.objects.filter(watchlist__user=user).values_list("symbol", flat=True))
+    )()
+
+    response = StreamingHttpResponse(sse_price_events(get_price_hub(), symbols), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @api_view(['POST'])
@@ -260,6 +362,8 @@ def add_to_watchlist(request, watchlist_id):
         symbol=symbol,
         defaults={"name": name}
     )
+    if created:
+        watchlist_feed.touch(watchlist.id)
 
     serializer = WatchlistItemSerializer(item)
     return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
@@ -273,6 +377,7 @@ def remove_from_watchlist(request, watchlist_id, item_id):
         watchlist = Watchlist.objects.get(id=watchlist_id, user=request.user)
         item = WatchlistItem.objects.get(id=item_id, watchlist=watchlist)
         item.delete()
+        watchlist_feed.touch(watchlist.id)
         return Response({'message': 'Removed successfully'})
     except (Watchlist.DoesNotExist, WatchlistItem.DoesNotExist):
         return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -284,9 +389,7 @@ def remove_from_watchlist(request, watchlist_id, item_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_sectors(request):
-    df = _load_companies_csv()
-    sectors = sorted(set([s.strip() for s in df['sector'].astype(str).tolist() if s and s.strip() and s.strip().lower() != "unknown"]))
-    return Response(sectors)
+    return Response(_load_universe().sectors)
 
 
 # --------------------
@@ -319,25 +422,23 @@ def add_random_companies(request, watchlist_id):
     except Watchlist.DoesNotExist:
         return Response({"error": "Watchlist not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    df = _load_companies_csv()
-    mask = df['sector'].astype(str).str.strip().str.lower() == sector.lower()
-    filtered = df[mask]
-
-    if filtered.empty:
+    universe = _load_universe()
+    if not universe.has_sector(sector):
         return Response({"error": f"No companies found in sector '{sector}'"}, status=status.HTTP_404_NOT_FOUND)
 
+    # Sample from the companies not in the watchlist yet (an index-only read),
+    # so the request gets as many new ones as it asked for
     existing_symbols = set(
         WatchlistItem.objects.filter(watchlist=watchlist).values_list('symbol', flat=True)
     )
-    filtered = filtered[~filtered['symbol'].isin(existing_symbols)]
+    sample = universe.sample_sector(sector, num_companies, exclude=existing_symbols)
 
-    if filtered.empty:
+    if not sample:
         return Response(
             {"error": "All companies from this sector are already in this watchlist."},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    sample = filtered.sample(n=min(num_companies, len(filtered)))
     new_items = [
         WatchlistItem(
             watchlist=watchlist,
@@ -345,10 +446,12 @@ def add_random_companies(request, watchlist_id):
             name=row['name'],
             exchange=row['exchange']
         )
-        for _, row in sample.iterrows()
+        for row in sample
     ]
 
+    # The unique constraint still skips symbols added concurrently
     WatchlistItem.objects.bulk_create(new_items, ignore_conflicts=True)
+    watchlist_feed.touch(watchlist.id)
 
     # Return updated watchlist with enriched items
     serializer = WatchlistSerializer(Watchlist.objects.get(id=watchlist.id))
@@ -374,17 +477,12 @@ def create_watchlist_with_random_companies(request):
     except ValueError:
         return Response({"error": "num_companies must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Load companies from CSV
-    df = _load_companies_csv()
-    mask = df['sector'].astype(str).str.strip().str.lower() == sector.lower()
-    filtered = df[mask]
+    # Sample random companies from the universe index
+    sample = _load_universe().sample_sector(sector, num_companies)
 
-    if filtered.empty:
+    if not sample:
         return Response({"error": f"No companies found in sector '{sector}'"}, status=status.HTTP_404_NOT_FOUND)
 
-    # Sample random companies
-    sample = filtered.sample(n=min(num_companies, len(filtered)))
-
     # Create watchlist
     watchlist = Watchlist.objects.create(user=request.user, name=name)
 
@@ -396,9 +494,11 @@ def create_watchlist_with_random_companies(request):
             name=row['name'],
             exchange=row['exchange']
         )
-        for _, row in sample.iterrows()
+        for row in sample
     ]
     WatchlistItem.objects.bulk_create(items, ignore_conflicts=True)
+    # A feed read since the create may have cached the empty watchlist
+    watchlist_feed.touch(watchlist.id)
 
     serializer = WatchlistSerializer(watchlist)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -415,26 +515,202 @@ def delete_watchlist(request, watchlist_id):
     except Watchlist.DoesNotExist:
         return Response({'error': 'Watchlist not found'}, status=status.HTTP_404_NOT_FOUND)
 
+
+# --------------------
+# Watchlist analytics
+# --------------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def get_companies_by_sector_fast(request, sector_name):
+def watchlist_analytics(request, watchlist_id):
     """
-    Return all companies in the given sector from the CSV, without prices.
+    GET /api/watchlists/<id>/analytics/?window=1y&benchmark=SPY
+    Return, annualized volatility, max drawdown and beta against the
+    benchmark per symbol, plus their correlation matrix, from daily closes
+    over the window (api/analytics.py). Cached per symbol set, window and
+    session.
     """
-    df = _load_companies_csv()
+    try:
+        watchlist = Watchlist.objects.get(id=watchlist_id, user=request.user)
+    except Watchlist.DoesNotExist:
+        return Response({'error': 'Watchlist not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    sector_name = (sector_name or "").strip().lower()
-    mask = df['sector'].astype(str).str.strip().str.lower() == sector_name
-    filtered = df[mask]
+    window = request.query_params.get("window", analytics.DEFAULT_WINDOW)
+    if window not in analytics.WINDOWS:
+        return Response({"error": f"window must be one of {', '.join(analytics.WINDOWS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    benchmark = request.query_params.get("benchmark", "").strip().upper() or analytics.BENCHMARK
+    if len(benchmark) > 20 or not all(ch.isalnum() or ch in ".-^=" for ch in benchmark):
+        return Response({"error": "Invalid benchmark symbol"}, status=status.HTTP_400_BAD_REQUEST)
 
-    if filtered.empty:
+    symbols = list(watchlist.items.values_list("symbol", flat=True))
+    try:
+        result, age = analytics.analyze(symbols, window, benchmark)
+        stale = False
+    except Exception as e:
+        result, age = analytics.stale_result(symbols, window, benchmark, STALE_MAX_AGE)
+        if result is None:
+            if isinstance(e, CircuitOpenError):
+                return Response({"error": "Market data temporarily unavailable", "details": str(e)},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                headers={"Retry-After": str(int(e.retry_after) + 1)})
+            return Response({"error": "Failed to compute analytics", "details": str(e)},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        stale = True
+
+    return Response({
+        "watchlist": watchlist.id,
+        **result,
+        "stale": stale,
+        "age": round(age, 1) if age is not None else None,
+    }, status=status.HTTP_200_OK)
+
+
+# --------------------
+# Price history (charts)
+# --------------------
+HISTORY_PERIODS = ("1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y")
+HISTORY_INTERVALS = ("1d", "1h", "30m", "15m", "5m")
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def price_history(request, symbol):
+    """
+    GET /api/history/<symbol>/?period=1y&interval=1d
+    OHLCV bars as column arrays: "t" (bar start, epoch seconds; a daily
+    bar's is its date at 00:00 UTC), "open", "high", "low", "close" and
+    "volume". Read from the local history store (api/history_store.py),
+    which only downloads the bars it doesn't have yet.
+    """
+    symbol = symbol.strip().upper()
+    period = request.query_params.get("period", "1y")
+    interval = request.query_params.get("interval", "1d")
+    if period not in HISTORY_PERIODS or interval not in HISTORY_INTERVALS:
+        return Response({"error": f"period must be one of {', '.join(HISTORY_PERIODS)} and interval "
+                                  f"one of {', '.join(HISTORY_INTERVALS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        data = history_store.history([symbol], period, interval)
+        stale = False
+    except Exception as e:
+        data = history_store.stored_history([symbol], period, interval)
+        if data.empty:
+            if isinstance(e, CircuitOpenError):
+                return Response({"error": "Market data temporarily unavailable", "details": str(e)},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                headers={"Retry-After": str(int(e.retry_after) + 1)})
+            return Response({"error": "Failed to fetch price history", "details": str(e)},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        stale = True
+
+    bars = {"t": []} | {field.lower(): [] for field in history_store.FIELDS}
+    if data is not None and not data.empty and ("Close", symbol) in data.columns:
+        data = data[data[("Close", symbol)].notna()]
+        index = pd.DatetimeIndex(data.index)
+        bars["t"] = (index.tz_localize(None) if index.tz is not None else index).as_unit("s").asi8
+        for field in history_store.FIELDS:
+            bars[field.lower()] = data[(field, symbol)].to_numpy(dtype=float)
+    return Response({"symbol": symbol, "period": period, "interval": interval, **bars, "stale": stale})
+
+
+# --------------------
+# Companies of a sector (no prices)
+# --------------------
+COMPANIES_PAGE_SIZE = getattr(settings, "COMPANIES_PAGE_SIZE", 100)
+COMPANIES_PAGE_MAX = getattr(settings, "COMPANIES_PAGE_MAX", 1000)
+NDJSON_CHUNK_ROWS = 256   # records encoded per streamed chunk
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([FastJSONRenderer, BrowsableAPIRenderer, NDJSONRenderer])
+def get_companies_by_sector_fast(request, sector_name):
+    """
+    Return the companies in the given sector from the CSV, without prices.
+    Bodies are encoded straight from the universe's columns.
+
+    Query params (all optional):
+    - fields:    comma-separated subset of symbol,name,exchange,sector
+    - limit:     page size (max COMPANIES_PAGE_MAX); with cursor or ordering
+                 returns {"results": [...], "next": cursor or null}
+    - cursor:    "next" of the previous page
+    - ordering:  symbol (default when paging) or name; ties go by symbol
+
+    Without paging params the whole sector is returned as an array, in CSV
+    order. With Accept: application/x-ndjson (or ?format=ndjson) records
+    are streamed one per line as they are encoded; paging params apply too.
+    """
+    sector_name = normalize_sector(sector_name)
+    universe = _load_universe()
+
+    if not universe.has_sector(sector_name):
         return Response(
             {"error": f"No companies found in sector '{sector_name}'"},
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    companies = filtered[["symbol", "name", "exchange", "sector"]].to_dict(orient="records")
-    return Response(companies, status=status.HTTP_200_OK)
+    params = request.query_params
+    fields = tuple(f.strip() for f in params.get("fields", "").split(",") if f.strip()) or COLUMNS
+    unknown = [f for f in fields if f not in COLUMNS]
+    if unknown:
+        return Response({"error": f"Unknown fields: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    ndjson = request.accepted_renderer.format == "ndjson"
+    paged = any(p in params for p in ("limit", "cursor", "ordering"))
+    if not paged:
+        if ndjson:
+            return _ndjson_response(universe, universe.sector_rows[sector_name], fields)
+        return Response(universe.sector_json(sector_name, fields), status=status.HTTP_200_OK)
+
+    ordering = params.get("ordering", "symbol")
+    if ordering not in ORDERINGS:
+        return Response({"error": f"ordering must be one of {', '.join(ORDERINGS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        # Streams default to the rest of the sector
+        limit = int(params["limit"]) if "limit" in params else (None if ndjson else COMPANIES_PAGE_SIZE)
+        if limit is not None:
+            limit = max(1, min(limit, COMPANIES_PAGE_MAX))
+        after = _decode_cursor(params["cursor"], ordering) if params.get("cursor") else None
+    except ValueError:
+        return Response({"error": "Invalid limit or cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows, next_key = universe.sector_page(sector_name, ordering, after, limit)
+    next_cursor = _encode_cursor(ordering, next_key) if next_key else None
+    if ndjson:
+        response = _ndjson_response(universe, rows, fields)
+        if next_cursor:
+            response["X-Next-Cursor"] = next_cursor
+        return response
+    body = b'{"results":' + json_array(universe.rows_json(rows, fields)) + b',"next":' + fast_json.dumps(next_cursor) + b"}"
+    return Response(RawJSON(body), status=status.HTTP_200_OK)
+
+
+def _encode_cursor(ordering, key):
+    raw = json.dumps([ordering, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _decode_cursor(cursor, ordering):
+    # Raises ValueError for anything that isn't one of our cursors
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_ordering, value, symbol, row = json.loads(raw)
+    except (TypeError, binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+    if cursor_ordering != ordering or not isinstance(value, str) or not isinstance(symbol, str) \
+            or not isinstance(row, int) or isinstance(row, bool):
+        raise ValueError("invalid cursor")
+    return (value, symbol, row)
+
+
+def _ndjson_response(universe, rows, fields):
+    def lines():
+        # One chunk of records at a time: memory stays flat however big the sector
+        for i in range(0, len(rows), NDJSON_CHUNK_ROWS):
+            yield ("\n".join(universe.rows_json(rows[i:i + NDJSON_CHUNK_ROWS], fields)) + "\n").encode()
+
+    return StreamingHttpResponse(lines(), content_type=NDJSONRenderer.media_type)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -442,43 +718,80 @@ def get_prices_for_symbols(request):
     """
     Return live prices for a list of symbols.
     Body: { "symbols": ["AAPL", "MSFT", ...] }
-    """
-    import yfinance as yf
 
-    symbols = request.data.get("symbols", [])
-    if not symbols or not isinstance(symbols, list):
+    Symbols are fetched in batches on a bounded pool with a per-request
+    deadline; each entry carries a "status" (ok / no_data / error / timeout)
+    so partial results can be returned.
+    """
+    symbols = _parse_symbols(request.data)
+    if symbols is None:
         return Response({"error": "symbols list required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    prices = {}
-
-    for sym in symbols:
-        try:
-            ticker = yf.Ticker(sym)
+    prices = price_engine.fetch_prices(symbols)
 
-            # Fetch last 2 days of history to calculate change
-            hist = ticker.history(period="2d", interval="1d")
+    return Response(prices, status=status.HTTP_200_OK)
 
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-                previous_close = hist['Close'].iloc[-2] if len(hist) > 1 else current_price
-                change = current_price - previous_close
-                change_percent = (change / previous_close) * 100 if previous_close else 0
-            else:
-                current_price = change = change_percent = None
 
-        except Exception:
-            current_price = change = change_percent = None
+def _parse_symbols(data):
+    symbols = data.get("symbols", []) if isinstance(data, dict) else None
+    if not symbols or not isinstance(symbols, list):
+        return None
+    return [str(s).strip() for s in symbols if s and str(s).strip()]
 
-        prices[sym] = {
-            "current_price": current_price,
-            "change": change,
-            "change_percent": change_percent,
-        }
 
-    return Response(prices, status=status.HTTP_200_OK)
+@csrf_exempt   # JWT-authenticated like the DRF views, which are exempt too
+@require_POST
+async def get_prices_for_symbols_async(request):
+    """
+    get_prices_for_symbols for the ASGI server; chunks are downloaded on the
+    event loop (price_engine.fetch_prices_async).
+    """
+    if await _authenticate_async(request) is None:
+        return _unauthorized()
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        data = None
+    symbols = _parse_symbols(data)
+    if symbols is None:
+        return JsonResponse({"error": "symbols list required"}, status=status.HTTP_400_BAD_REQUEST)
 
+    prices = await price_engine.fetch_prices_async(symbols)
 
+    return HttpResponse(fast_json.dumps(prices), content_type="application/json", status=status.HTTP_200_OK)
 
 
+# --------------------
+# Prometheus metrics (per process)
+# --------------------
+def _metrics_allowed(request):
+    """
+    Closed unless settings let the caller in: the METRICS_TOKEN bearer
+    token, a client address in METRICS_ALLOWED_IPS or, with
+    METRICS_ALLOW_STAFF, a staff user's JWT.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+        return True
+    if request.META.get("REMOTE_ADDR") in getattr(settings, "METRICS_ALLOWED_IPS", ()):
+        return True
+    if getattr(settings, "METRICS_ALLOW_STAFF", False):
+        try:
+            authenticated = JWTAuthentication().authenticate(request)
+        except (AuthenticationFailed, TokenError):
+            return False
+        return authenticated is not None and authenticated[0].is_staff
+    return False
 
 
+def metrics_view(request):
+    """
+    GET /api/metrics/
+    Request histograms from PerfMiddleware plus cache, coalescing and
+    universe stats collected at scrape time, in the Prometheus text format.
+    Only for callers let in by _metrics_allowed.
+    """
+    if not _metrics_allowed(request):
+        return JsonResponse({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+    return HttpResponse(metrics.render(metrics.collect(_UNIVERSE, _PRICE_HUB)),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,134 @@
+# api/watchlist_feed.py
+"""
+Versioned feed behind GET /api/watchlists/.
+
+A user's feed version is a hash of their watchlists (id, version, name),
+their items and the quotes currently served for them. Watchlist.version is
+bumped with a single UPDATE on every item mutation, so an unchanged
+structure is recognised from one small query. The item rows for that
+structure are then reused from a local cache, and quotes come from the
+in-memory price tier. An idle dashboard's poll therefore costs one query,
+a few cache lookups and a hash, and gets a 304 back.
+
+?since=<version> returns only what changed since that version: added and
+removed items and items whose quote changed. The state at each version is
+kept briefly in the shared quote store. If the client's version has aged
+out (or came from before a restart) the full feed is returned with
+"full": true instead.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import Watchlist, WatchlistItem
+from .quote_cache import QuoteCache
+from .quote_store import shared_store
+from .serializers import resolve_quotes
+
+# How long a version stays usable as ?since= (seconds)
+SNAPSHOT_MAX_AGE = getattr(settings, "WATCHLIST_FEED_SNAPSHOT_MAX_AGE", 600)
+QUOTE_FIELDS = ("current_price", "change", "change_percent", "stale", "age")
+
+# (user id, watchlist heads) -> (item rows, their digest); a mutation bumps
+# a head's version, so entries never need invalidating
+_structures = QuoteCache(ttl=3600, max_size=getattr(settings, "QUOTE_CACHE_MAX_SIZE", 2048))
+_snapshots = QuoteCache(ttl=SNAPSHOT_MAX_AGE, max_size=4096, store=shared_store, namespace="watchlist_feed")
+
+
+def touch(*watchlist_ids):
+    """
+    Record that items of these watchlists were added or removed.
+    """
+    Watchlist.objects.filter(pk__in=watchlist_ids).update(version=F("version") + 1)
+
+
+class Feed:
+    def __init__(self, user_id, heads, items, structure_digest, quotes):
+        self.user_id = user_id
+        self.heads = heads   # [(id, version, name)]
+        self.items = items   # [(id, watchlist_id, symbol, name)]
+        self.quotes = quotes  # item id -> [current_price, change, change_percent, stale, age]
+        # A stale quote's age grows on every poll; leave it out so it
+        # doesn't change the version by itself
+        digest = hashlib.blake2b(structure_digest, digest_size=12)
+        digest.update(repr([quotes[item[0]][:4] for item in items]).encode())
+        self.version = digest.hexdigest()
+
+    def _item(self, item):
+        item_id, _, symbol, name = item
+        return {"id": item_id, "symbol": symbol, "name": name, **dict(zip(QUOTE_FIELDS, self.quotes[item_id]))}
+
+    def payload(self):
+        """
+        Every watchlist with its items, shaped like WatchlistSerializer.
+        """
+        by_watchlist = {}
+        for item in self.items:
+            by_watchlist.setdefault(item[1], []).append(self._item(item))
+        return [
+            {"id": wl_id, "name": name, "items": by_watchlist.get(wl_id, [])}
+            for wl_id, _, name in self.heads
+        ]
+
+    def save_snapshot(self):
+        key = f"{self.user_id}:{self.version}"
+        if _snapshots.get(key) is None:
+            _snapshots.set(key, {str(item[0]): [item[1], *self.quotes[item[0]]] for item in self.items})
+
+    def delta(self, since):
+        """
+        Changes since version `since`, or the full feed if that version is
+        no longer known.
+        """
+        old = _snapshots.get(f"{self.user_id}:{since}")
+        if old is None:
+            return {"version": self.version, "full": True, "watchlists": self.payload()}
+
+        added, changed = [], []
+        current = set()
+        for item in self.items:
+            key = str(item[0])
+            current.add(key)
+            quote = self.quotes[item[0]]
+            if key not in old:
+                added.append(dict(self._item(item), watchlist_id=item[1]))
+            elif old[key][1:5] != quote[:4]:
+                changed.append({"id": item[0], **dict(zip(QUOTE_FIELDS, quote))})
+        return {
+            "version": self.version,
+            "since": since,
+            "full": False,
+            "watchlists": [{"id": wl_id, "name": name} for wl_id, _, name in self.heads],
+            "added": added,
+            "removed": [int(key) for key in old if key not in current],
+            "changed": changed,
+        }
+
+
+def build(user):
+    heads = [list(h) for h in Watchlist.objects.filter(user=user).order_by("id").values_list("id", "version", "name")]
+    key = (user.pk, tuple(tuple(h) for h in heads))
+    cached = _structures.get(key)
+    if cached is None:
+        items = [
+            list(row) for row in WatchlistItem.objects.filter(watchlist__user=user)
+            .order_by("id").values_list("id", "watchlist_id", "symbol", "name")
+        ]
+        cached = (items, hashlib.blake2b(json.dumps([heads, items]).encode()).digest())
+        _structures.set(key, cached)
+    items, structure_digest = cached
+
+    quotes = resolve_quotes(list(dict.fromkeys(item[2] for item in items)))
+    by_item = {}
+    for item_id, _, symbol, _ in items:
+        info, age = quotes[symbol]
+        by_item[item_id] = [
+            info.get("regularMarketPrice"),
+            info.get("regularMarketChange"),
+            info.get("regularMarketChangePercent"),
+            age is not None,
+            age,
+        ]
+    return Feed(user.pk, heads, items, structure_digest, by_item)
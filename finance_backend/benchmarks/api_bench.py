@@ -0,0 +1,283 @@
+"""
+End-to-end load test for the /api endpoints.
+
+Boots the Django app in-process against a throwaway SQLite database (or a
+local Postgres with BENCH_DB=postgres) and the synthetic market-data
+provider, seeds users and watchlists, then drives realistic traffic mixes
+through the full middleware/URL/view stack with concurrent clients:
+
+- watchlist_poll:   every client polls GET /api/watchlists/ (the 10 s dashboard poll)
+- sector_browse:    GET sectors/ -> companies-fast -> POST prices/ for the sector
+- search_keystrokes: GET search-stock/ for each prefix of a company name
+- mixed:            weighted blend of the three
+
+Reports p50/p95/p99 latency, throughput, DB queries per request and
+upstream (provider) calls per request, and writes everything to
+benchmarks/results/<commit>-<timestamp>.json for compare.py.
+
+Run from finance_backend/:
+    python benchmarks/api_bench.py [--clients 8] [--duration 10] [--scenario mixed]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from api import history_store, price_engine, providers  # noqa: E402
+from api.models import Watchlist, WatchlistItem  # noqa: E402
+from api.quote_cache import quote_cache  # noqa: E402
+from api.quote_store import shared_store  # noqa: E402
+from api.views import _load_universe  # noqa: E402
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+
+class CountingProvider(providers.MarketDataProvider):
+    """
+    Wraps a provider and counts upstream calls per method.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = f"counting({inner.name})"
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def _count(self, method):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+    def total(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def search(self, query, limit=10):
+        self._count("search")
+        return self.inner.search(query, limit)
+
+    def info(self, symbol):
+        self._count("info")
+        return self.inner.info(symbol)
+
+    def history(self, symbols, period="2d", interval="1d"):
+        self._count("history")
+        return self.inner.history(symbols, period, interval)
+
+
+# --------------------
+# Seeding
+# --------------------
+def seed(users, watchlists_per_user, items_per_watchlist, rng):
+    call_command("migrate", verbosity=0, interactive=False)
+    User.objects.filter(username__startswith="bench-").delete()
+
+    universe = _load_universe()
+    records = list(universe.records)
+    tokens = []
+    for u in range(users):
+        user = User.objects.create_user(username=f"bench-{u}@example.com", password="bench")
+        for w in range(watchlists_per_user):
+            watchlist = Watchlist.objects.create(user=user, name=f"Watchlist {w}")
+            WatchlistItem.objects.bulk_create([
+                WatchlistItem(watchlist=watchlist, symbol=r["symbol"], name=r["name"], exchange=r["exchange"])
+                for r in rng.sample(records, items_per_watchlist)
+            ])
+        tokens.append(str(RefreshToken.for_user(user).access_token))
+    return tokens
+
+
+# --------------------
+# Traffic
+# --------------------
+class Recorder:
+    def __init__(self):
+        self.samples = []   # (route, seconds, status, db_queries)
+        self._lock = threading.Lock()
+
+    def add(self, route, seconds, status, queries):
+        with self._lock:
+            self.samples.append((route, seconds, status, queries))
+
+
+def _request(client, recorder, route, method, path, **kwargs):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        elapsed = time.perf_counter() - started
+    recorder.add(route, elapsed, response.status_code, len(queries.captured_queries))
+    return response
+
+
+def watchlist_poll(client, recorder, rng, universe):
+    _request(client, recorder, "GET watchlists/", "get", "/api/watchlists/")
+
+
+def sector_browse(client, recorder, rng, universe):
+    _request(client, recorder, "GET sectors/", "get", "/api/sectors/")
+    sector = rng.choice(universe.sectors)
+    response = _request(client, recorder, "GET companies-fast/", "get", f"/api/sectors/{sector}/companies-fast/")
+    symbols = [c["symbol"] for c in json.loads(response.content)] if response.status_code == 200 else []
+    if symbols:
+        _request(client, recorder, "POST prices/", "post", "/api/prices/",
+                 data=json.dumps({"symbols": symbols}), content_type="application/json")
+
+
+def search_keystrokes(client, recorder, rng, universe):
+    name = universe.record(rng.randrange(len(universe)))["name"]
+    for i in range(1, min(len(name), 8) + 1):
+        _request(client, recorder, "GET search-stock/", "get", "/api/search-stock/", data={"q": name[:i]})
+
+
+SCENARIOS = {
+    "watchlist_poll": [(watchlist_poll, 1)],
+    "sector_browse": [(sector_browse, 1)],
+    "search_keystrokes": [(search_keystrokes, 1)],
+    "mixed": [(watchlist_poll, 6), (sector_browse, 1), (search_keystrokes, 3)],
+}
+
+
+def run_scenario(name, tokens, clients, duration, seed_value):
+    universe = _load_universe()
+    recorder = Recorder()
+    quote_cache.clear()
+    price_engine._PRICES.clear()
+    shared_store.clear()
+    if history_store.store is not None:
+        history_store.store.clear()
+    counting = CountingProvider(providers.build_provider())
+    previous = providers.set_provider(counting)
+    deadline = time.monotonic() + duration
+    actions, weights = zip(*SCENARIOS[name])
+
+    def client_loop(i):
+        rng = random.Random(seed_value + i)
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {tokens[i % len(tokens)]}")
+        try:
+            while time.monotonic() < deadline:
+                rng.choices(actions, weights)[0](client, recorder, rng, universe)
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(client_loop, range(clients)))
+    finally:
+        providers.set_provider(previous)
+    wall = time.perf_counter() - started
+
+    return summarize(recorder.samples, wall, counting)
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def _stats(samples, wall):
+    latencies = sorted(s[1] for s in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if s[2] >= 500),
+        "throughput_rps": len(samples) / wall if wall else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "db_queries_per_request": sum(s[3] for s in samples) / len(samples),
+    }
+
+
+def summarize(samples, wall, counting):
+    result = {"wall_seconds": wall, "overall": _stats(samples, wall) if samples else {}, "routes": {}}
+    for route in sorted({s[0] for s in samples}):
+        result["routes"][route] = _stats([s for s in samples if s[0] == route], wall)
+    result["upstream_calls"] = dict(counting.calls)
+    result["upstream_calls_per_request"] = counting.total() / len(samples) if samples else 0.0
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def print_report(name, result):
+    print(f"\n== {name} ({result['wall_seconds']:.1f} s, "
+          f"{result['upstream_calls_per_request']:.2f} upstream calls/request) ==")
+    print(f"{'route':<22} {'reqs':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db q/req':>9}")
+    for route, s in list(result["routes"].items()) + [("overall", result["overall"])]:
+        print(f"{route:<22} {s['requests']:6d} {s['throughput_rps']:8.1f} {s['p50_ms']:8.1f} "
+              f"{s['p95_ms']:8.1f} {s['p99_ms']:8.1f} {s['db_queries_per_request']:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS) + ["all"], default="all")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--watchlists", type=int, default=5, help="watchlists per user")
+    parser.add_argument("--items", type=int, default=10, help="symbols per watchlist")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="results file (default: benchmarks/results/<commit>-<ts>.json)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tokens = seed(args.users, args.watchlists, args.items, rng)
+
+    names = sorted(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = {}
+    for name in names:
+        results[name] = run_scenario(name, tokens, args.clients, args.duration, args.seed)
+        print_report(name, results[name])
+
+    commit = _git_commit()
+    payload = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "provider": settings.MARKET_DATA_PROVIDER,
+            "upstream_latency": settings.MARKET_DATA_SYNTHETIC_LATENCY,
+            "args": vars(args),
+        },
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Cost of the watchlist analytics (api/analytics.py) by watchlist size.
+
+For each --sizes symbol count and --windows window, synthetic daily closes
+are generated once, then reduced with:
+
+- per_symbol  the straightforward version: one pandas pass per symbol
+              (pct_change, std, cummax, cov with the benchmark) plus
+              DataFrame.corr
+- vectorized  analytics.compute over the whole frame at once
+
+and analytics.analyze is timed cold (the history call, no provider latency)
+and warm (served from the cache). Times are medians of --repeat runs.
+
+Run from finance_backend/:
+    python benchmarks/bench_analytics.py [--sizes 10,50,200,500] [--windows 1y,5y]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+os.environ["BENCH_UPSTREAM_LATENCY"] = "0"
+os.environ["QUOTE_STORE"] = "none"
+
+
+def _median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def per_symbol(closes, benchmark):
+    import numpy as np
+
+    bench = closes[benchmark].pct_change(fill_method=None)
+    stats = {}
+    for symbol in closes.columns:
+        prices = closes[symbol]
+        returns = prices.ffill().pct_change(fill_method=None).where(prices.notna())
+        valid = prices.dropna()
+        both = returns.notna() & bench.notna()
+        stats[symbol] = {
+            "return": valid.iloc[-1] / valid.iloc[0] - 1 if len(valid) else None,
+            "volatility": returns.std() * np.sqrt(252),
+            "max_drawdown": (valid / valid.cummax() - 1).min(),
+            "beta": returns[both].cov(bench[both]) / bench[both].var(),
+            "bars": int(returns.notna().sum()),
+        }
+    correlation = closes.ffill().pct_change(fill_method=None).where(closes.notna()).corr(min_periods=2)
+    return stats, correlation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,50,200,500", help="watchlist sizes")
+    parser.add_argument("--windows", default="1y,5y")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from api import analytics, providers
+
+    provider = providers.SyntheticProvider(end_date="2026-10-16")
+    providers.set_provider(provider)
+
+    print(f"{'symbols':>7} {'window':>6} {'bars':>5} {'per_symbol ms':>14} {'vectorized ms':>14} "
+          f"{'cold ms':>8} {'warm ms':>8}")
+    for window in args.windows.split(","):
+        for size in [int(s) for s in args.sizes.split(",")]:
+            symbols = [f"AN{i:04d}" for i in range(size)]
+            closes = analytics.load_closes([*symbols, analytics.BENCHMARK], window)
+            slow = _median_ms(lambda: per_symbol(closes, analytics.BENCHMARK), args.repeat)
+            fast = _median_ms(lambda: analytics.compute(closes, analytics.BENCHMARK), args.repeat)
+
+            def cold():
+                analytics._results._data.clear()
+                analytics.analyze(symbols, window)
+
+            cold_ms = _median_ms(cold, args.repeat)
+            warm_ms = _median_ms(lambda: analytics.analyze(symbols, window), args.repeat)
+            print(f"{size:7d} {window:>6} {len(closes):5d} {slow:14.2f} {fast:14.2f} {cold_ms:8.2f} {warm_ms:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Upstream traffic and read cost of the local history store (api/history_store.py).
+
+A day of traffic for --symbols symbols is replayed at fixed clock times
+against the synthetic provider, once straight to the provider and once
+through the store (starting empty):
+
+- analytics  a --window history of every symbol, after the close
+- poll       the price engine's 2-bar history, --polls times after the close
+- next day   the same poll mid-session the next day (one new forming bar)
+- chart      a --window chart of one symbol, mid-session
+
+For each step the upstream calls made and the bars they returned are
+counted. Then the store is timed on warm reads: history() of every symbol
+over the window (no upstream call) and a single symbol's range read, the
+chart's case. Times are medians of --repeat runs.
+
+Run from finance_backend/:
+    python benchmarks/bench_history_store.py [--symbols 500] [--window 1y] [--polls 20]
+"""
+import argparse
+from datetime import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+os.environ["BENCH_UPSTREAM_LATENCY"] = "0"
+os.environ["BENCH_HISTORY_STORE_DIR"] = tempfile.mkdtemp(prefix="bench-history-")
+
+
+def _median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--window", default="1y")
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from api import history_store, market_hours, providers
+
+    class CountingProvider(providers.SyntheticProvider):
+        calls = returned = 0
+
+        def history(self, symbols, period="2d", interval="1d"):
+            data = super().history(symbols, period, interval)
+            CountingProvider.calls += 1
+            CountingProvider.returned += int(data["Close"].notna().to_numpy().sum())
+            return data
+
+    provider = CountingProvider()
+    providers.set_provider(provider)
+    symbols = [f"HS{i:04d}" for i in range(args.symbols)]
+    after_close = datetime(2026, 10, 16, 18, 0, tzinfo=market_hours.MARKET_TZ)
+    next_day = datetime(2026, 10, 19, 12, 0, tzinfo=market_hours.MARKET_TZ)
+    steps = [
+        ("analytics", "2026-10-16", lambda fetch: fetch(symbols, args.window, after_close)),
+        ("poll", "2026-10-16", lambda fetch: [fetch(symbols, "2d", after_close) for _ in range(args.polls)]),
+        ("next day", "2026-10-19", lambda fetch: fetch(symbols, "2d", next_day)),
+        ("chart", "2026-10-19", lambda fetch: fetch(symbols[:1], args.window, next_day)),
+    ]
+
+    def direct(symbols, period, now):
+        return providers.get_provider().history(symbols, period=period, interval="1d")
+
+    def stored(symbols, period, now):
+        return history_store.history(symbols, period=period, interval="1d", now=now)
+
+    print(f"{args.symbols} symbols, window {args.window}, {args.polls} polls\n")
+    print(f"{'step':<10} {'direct calls':>12} {'direct bars':>12} {'store calls':>12} {'store bars':>11}")
+    totals = [0, 0, 0, 0]
+    for name, end_date, step in steps:
+        provider.end_date = end_date
+        counts = []
+        for fetch in (direct, stored):
+            CountingProvider.calls = CountingProvider.returned = 0
+            step(fetch)
+            counts += [CountingProvider.calls, CountingProvider.returned]
+        totals = [a + b for a, b in zip(totals, counts)]
+        print(f"{name:<10} {counts[0]:12d} {counts[1]:12d} {counts[2]:12d} {counts[3]:11d}")
+    print(f"{'total':<10} {totals[0]:12d} {totals[1]:12d} {totals[2]:12d} {totals[3]:11d}")
+
+    on_disk = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(history_store.store.root) for name in names
+    )
+    print(f"\nstore: {on_disk / 1024:.0f} KiB on disk, {history_store.stats()}")
+
+    provider.end_date = "2026-10-16"
+    CountingProvider.calls = 0
+    whole = _median_ms(lambda: stored(symbols, args.window, after_close), args.repeat)
+    one = _median_ms(lambda: history_store.store.read(symbols[0], start=history_store.window_start(args.window, after_close)),
+                     args.repeat * 100)
+    assert CountingProvider.calls == 0
+    print(f"\nwarm history() of {args.symbols} symbols over {args.window}: {whole:.2f} ms")
+    print(f"range read of one symbol over {args.window}: {one * 1000:.1f} us")
+    history_store.store.clear()
+
+
+if __name__ == "__main__":
+    main()
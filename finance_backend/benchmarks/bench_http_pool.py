@@ -0,0 +1,135 @@
+"""
+Latency of upstream calls with a fresh connection per call (requests.get,
+as search_stock used to do) versus the shared keep-alive session in
+api.http_client, against a local stand-in for the Yahoo search API.
+
+The stand-in server delays each new connection by --handshake-ms to model
+DNS + TCP + TLS setup to a remote host (on loopback it is otherwise ~free),
+and answers every request after --service-ms with a search-style JSON body.
+With --error-rate it also returns 503 for that fraction of requests, to
+show what the retry policy recovers.
+
+Run from finance_backend/:
+    python benchmarks/bench_http_pool.py [--calls 200] [--threads 8] [--handshake-ms 40]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+from api import http_client  # noqa: E402
+
+BODY = json.dumps({"quotes": [
+    {"symbol": f"SYM{i}", "shortname": f"Company {i}", "exchange": "NMS"} for i in range(10)
+]}).encode()
+
+
+def start_server(handshake, service, error_rate):
+    connections = {"count": 0}
+    lock = threading.Lock()
+    rng = random.Random(1)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            with lock:
+                connections["count"] += 1
+            time.sleep(handshake)
+
+        def do_GET(self):
+            time.sleep(service)
+            with lock:
+                fail = rng.random() < error_rate
+            body = b'{"error": "unavailable"}' if fail else BODY
+            self.send_response(503 if fail else 200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, connections
+
+
+def run(label, call, url, calls, threads, connections):
+    before = connections["count"]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            call(url, params={"q": f"query{i}"}).raise_for_status()
+        except requests.RequestException:
+            with lock:
+                errors += 1
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(calls)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{label:<28} {statistics.median(latencies) * 1000:8.1f} {p95 * 1000:8.1f} "
+          f"{calls / wall:8.1f} {connections['count'] - before:7d} {errors:7d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--handshake-ms", type=float, default=40.0, help="simulated connection setup cost")
+    parser.add_argument("--service-ms", type=float, default=5.0, help="server time per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses")
+    args = parser.parse_args()
+
+    server, connections = start_server(args.handshake_ms / 1000, args.service_ms / 1000, args.error_rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/finance/search"
+    timeout = (3.05, 10)
+
+    def fresh(u, **kw):
+        return requests.get(u, timeout=timeout, **kw)
+
+    session = http_client.build_session(pool_size=args.threads)
+    no_retry = http_client.build_session(pool_size=args.threads, retries=0)
+
+    def pooled(u, **kw):
+        return session.get(u, timeout=timeout, **kw)
+
+    def pooled_no_retry(u, **kw):
+        return no_retry.get(u, timeout=timeout, **kw)
+
+    print(f"{args.calls} calls, {args.threads} threads, {args.handshake_ms:.0f} ms connection setup, "
+          f"{args.service_ms:.0f} ms service time, {args.error_rate:.0%} errors\n")
+    print(f"{'client':<28} {'p50 ms':>8} {'p95 ms':>8} {'calls/s':>8} {'conns':>7} {'errors':>7}")
+    run("requests.get (fresh conn)", fresh, url, args.calls, args.threads, connections)
+    run("pooled session, no retries", pooled_no_retry, url, args.calls, args.threads, connections)
+    run("pooled session + retries", pooled, url, args.calls, args.threads, connections)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Multi-process benchmark of the shared quote store (api/quote_store.py).
+
+contention  --procs processes each hammer one SQLiteQuoteStore file for
+            --duration seconds: --read-ratio of operations read a batch of
+            --batch random symbols, the rest write one. Reports read and
+            write latency, throughput and writes dropped on lock timeout.
+
+workers     --workers processes, each like a gunicorn worker, poll
+            price_engine.fetch_prices() for the same --symbols every
+            --interval seconds (staggered starts) against the synthetic
+            provider, with a --ttl second quote TTL. Once with
+            QUOTE_STORE=none and once with sqlite; reports upstream
+            history calls per poll.
+
+Run from finance_backend/:
+    python benchmarks/bench_quote_store.py [--procs 1,2,4,8] [--workers 8]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] if values else 0.0
+
+
+def _setup(store_path, store="sqlite"):
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    os.environ["BENCH_QUOTE_STORE_PATH"] = store_path
+    os.environ["QUOTE_STORE"] = store
+    import django
+    django.setup()
+
+
+def contention_proc(store_path, seed, duration, read_ratio, batch, symbols):
+    _setup(store_path)
+    from api.quote_store import shared_store
+
+    rng = random.Random(seed)
+    names = [f"S{i:04d}" for i in range(symbols)]
+    quote = {"current_price": 123.45, "change": 1.2, "change_percent": 0.98, "status": "ok"}
+    reads, writes = [], []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        if rng.random() < read_ratio:
+            keys = rng.sample(names, batch)
+            started = time.perf_counter()
+            shared_store.get_many("price", keys, 30)
+            reads.append(time.perf_counter() - started)
+        else:
+            started = time.perf_counter()
+            shared_store.set_many("price", {rng.choice(names): quote})
+            writes.append(time.perf_counter() - started)
+    return {"reads": reads, "writes": writes, "errors": shared_store.stats()["errors"]}
+
+
+def worker_proc(store_path, store, seed, duration, interval, ttl, symbols):
+    os.environ["BENCH_QUOTE_CACHE_TTL"] = str(ttl)
+    _setup(store_path, store)
+    from api import price_engine, providers
+
+    class CountingProvider(providers.MarketDataProvider):
+        def __init__(self, inner):
+            self.inner = inner
+            self.name = inner.name
+            self.calls = 0
+
+        def history(self, symbols, period="2d", interval="1d"):
+            self.calls += 1
+            return self.inner.history(symbols, period, interval)
+
+    counting = CountingProvider(providers.build_provider())
+    providers.set_provider(counting)
+    names = [f"WQ{i:03d}" for i in range(symbols)]
+    time.sleep(random.Random(seed).uniform(0, interval))   # workers don't start in lockstep
+    deadline = time.monotonic() + duration
+    polls = 0
+    while time.monotonic() < deadline:
+        price_engine.fetch_prices(names)
+        polls += 1
+        time.sleep(interval)
+    return {"history_calls": counting.calls, "polls": polls}
+
+
+def _spawn(args_list):
+    procs = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), *args], cwd=BACKEND_DIR,
+                         stdout=subprocess.PIPE, text=True)
+        for args in args_list
+    ]
+    results = []
+    for proc in procs:
+        out, _ = proc.communicate()
+        if proc.returncode:
+            raise SystemExit(f"child failed with {proc.returncode}")
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procs", default="1,2,4,8", help="process counts for the contention test")
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--read-ratio", type=float, default=0.9)
+    parser.add_argument("--batch", type=int, default=10, help="symbols per read")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between polls per worker")
+    parser.add_argument("--ttl", type=float, default=2.0, help="quote TTL for the workers test")
+    parser.add_argument("--worker-duration", type=float, default=10.0)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--store-path", help=argparse.SUPPRESS)
+    parser.add_argument("--store", default="sqlite", help=argparse.SUPPRESS)
+    parser.add_argument("--seed", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "contention":
+        print(json.dumps(contention_proc(args.store_path, args.seed, args.duration, args.read_ratio,
+                                         args.batch, args.symbols)))
+        return
+    if args.child == "worker":
+        print(json.dumps(worker_proc(args.store_path, args.store, args.seed, args.duration,
+                                     args.interval, args.ttl, 50)))
+        return
+
+    tmp = tempfile.mkdtemp(prefix="quote-store-bench-")
+    print(f"contention: {args.read_ratio:.0%} reads of {args.batch} symbols, {args.duration:.0f} s per run\n")
+    print(f"{'procs':>5} {'ops/s':>9} {'read p50 us':>12} {'read p99 us':>12} "
+          f"{'write p50 us':>13} {'write p99 us':>13} {'dropped':>8}")
+    for procs in [int(p) for p in args.procs.split(",")]:
+        path = os.path.join(tmp, f"contention-{procs}.sqlite3")
+        results = _spawn([
+            ["--child", "contention", "--store-path", path, "--seed", str(i), "--duration", str(args.duration),
+             "--read-ratio", str(args.read_ratio), "--batch", str(args.batch), "--symbols", str(args.symbols)]
+            for i in range(procs)
+        ])
+        reads = [t for r in results for t in r["reads"]]
+        writes = [t for r in results for t in r["writes"]]
+        print(f"{procs:5d} {(len(reads) + len(writes)) / args.duration:9.0f} "
+              f"{_percentile(reads, 50) * 1e6:12.1f} {_percentile(reads, 99) * 1e6:12.1f} "
+              f"{_percentile(writes, 50) * 1e6:13.1f} {_percentile(writes, 99) * 1e6:13.1f} "
+              f"{sum(r['errors'] for r in results):8d}")
+
+    duration = args.worker_duration
+    print(f"\nworkers: {args.workers} processes polling 50 symbols every {args.interval:.1f} s for "
+          f"{duration:.0f} s, {args.ttl:.0f} s TTL\n")
+    print(f"{'store':<8} {'polls':>6} {'history calls':>14} {'calls/poll':>11}")
+    for store in ("none", "sqlite"):
+        path = os.path.join(tmp, f"workers-{store}.sqlite3")
+        results = _spawn([
+            ["--child", "worker", "--store", store, "--store-path", path, "--seed", str(i),
+             "--duration", str(duration), "--interval", str(args.interval), "--ttl", str(args.ttl)]
+            for i in range(args.workers)
+        ])
+        polls = sum(r["polls"] for r in results)
+        calls = sum(r["history_calls"] for r in results)
+        print(f"{store:<8} {polls:6d} {calls:14d} {calls / polls:11.2f}")
+    print(f"\n(store files in {tmp})")
+
+
+if __name__ == "__main__":
+    main()
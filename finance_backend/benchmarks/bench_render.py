@@ -0,0 +1,163 @@
+"""
+Render time and payload size of the largest responses.
+
+sectors  the --sectors biggest sectors of all_companies.csv (optionally
+         with the universe tiled --scale times), rendered as before (record
+         dicts through DRF's JSONRenderer) and from the column arrays
+         (CompanyUniverse.sector_json). The encoded columns and records are
+         built once per universe snapshot; that cost is reported separately.
+         Then the payload's size and compression time with gzip and, if
+         the brotli package is installed, brotli at the middleware's levels.
+
+stream   the biggest sector through companies-fast's NDJSON stream against
+         its one-piece array, with --fields projected: time to the first
+         chunk and to the whole body, and peak memory allocated (tracemalloc)
+         while producing it.
+
+prices   a /api/prices/ body for --symbols symbols, with numpy float values
+         as they come out of the change math, through DRF's JSONRenderer
+         (stdlib json) and FastJSONRenderer (orjson when installed).
+
+Times are the median of --repeat runs. Run from finance_backend/:
+    python benchmarks/bench_render.py [--sectors 5] [--scale 1] [--fields symbol,name] [--symbols 2000]
+"""
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+
+def _median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def bench_sectors(args):
+    from rest_framework.renderers import JSONRenderer
+
+    from api import middleware
+    from api.universe import COLUMNS, CompanyUniverse, read_companies_csv
+
+    df = read_companies_csv(os.path.join(BACKEND_DIR, "all_companies.csv"))
+    universe = CompanyUniverse.from_dataframe(df)
+    if args.scale > 1:
+        universe = CompanyUniverse({c: [v for _ in range(args.scale) for v in universe.columns[c]] for c in COLUMNS})
+
+    started = time.perf_counter()
+    universe.json_records
+    print(f"{len(universe)} companies; encoded columns and records built once in "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms\n")
+
+    biggest = sorted(universe.sector_rows, key=lambda s: len(universe.sector_rows[s]), reverse=True)[:args.sectors]
+    renderer = JSONRenderer()
+    print(f"{'sector':<24} {'rows':>6} {'before ms':>10} {'columns ms':>11} {'speedup':>8}")
+    payloads = {}
+    for sector in biggest:
+        before = _median_ms(lambda: renderer.render(universe.companies_in_sector(sector)), args.repeat)
+        after = _median_ms(lambda: universe.sector_json(sector), args.repeat)
+        payloads[sector] = bytes(universe.sector_json(sector))
+        assert payloads[sector] == renderer.render(universe.companies_in_sector(sector))
+        print(f"{sector or '(blank)':<24} {len(universe.sector_rows[sector]):6d} {before:10.3f} {after:11.3f} {before / after:7.1f}x")
+
+    codecs = [("gzip", lambda body: gzip.compress(body, compresslevel=middleware.GZIP_LEVEL, mtime=0))]
+    if middleware.brotli is not None:
+        codecs.append(("br", lambda body: middleware.brotli.compress(body, quality=middleware.BROTLI_QUALITY)))
+    else:
+        print("\n(brotli not installed; gzip only)")
+    print(f"\n{'sector':<24} {'json bytes':>11}" + "".join(f" {name + ' bytes':>11} {name + ' ms':>8}" for name, _ in codecs))
+    for sector, body in payloads.items():
+        line = f"{sector or '(blank)':<24} {len(body):11d}"
+        for _, compress in codecs:
+            line += f" {len(compress(body)):11d} {_median_ms(lambda: compress(body), args.repeat):8.3f}"
+        print(line)
+
+
+def bench_stream(args):
+    import tracemalloc
+
+    from api.universe import COLUMNS, CompanyUniverse, read_companies_csv
+    from api.views import _ndjson_response
+
+    universe = CompanyUniverse.from_dataframe(read_companies_csv(os.path.join(BACKEND_DIR, "all_companies.csv")))
+    if args.scale > 1:
+        universe = CompanyUniverse({c: [v for _ in range(args.scale) for v in universe.columns[c]] for c in COLUMNS})
+    fields = tuple(args.fields.split(","))
+    sector = max(universe.sector_rows, key=lambda s: len(universe.sector_rows[s]))
+    rows = universe.sector_rows[sector]
+    universe.json_columns
+
+    def array():
+        yield universe.sector_json(sector, fields)
+
+    def ndjson():
+        return _ndjson_response(universe, rows, fields).streaming_content
+
+    print(f"\nstream: {len(rows)} rows of {sector or '(blank)'!r}, fields {','.join(fields)}\n")
+    print(f"{'mode':<8} {'first chunk ms':>15} {'total ms':>9} {'peak KiB':>9}")
+    for name, produce in (("array", array), ("ndjson", ndjson)):
+        firsts, totals = [], []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            chunks = iter(produce())
+            next(chunks)
+            firsts.append(time.perf_counter() - started)
+            for _ in chunks:
+                pass
+            totals.append(time.perf_counter() - started)
+        tracemalloc.start()
+        for _ in produce():
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:<8} {statistics.median(firsts) * 1000:15.3f} {statistics.median(totals) * 1000:9.3f} "
+              f"{peak / 1024:9.0f}")
+
+
+def bench_prices(args):
+    import numpy as np
+    from rest_framework.renderers import JSONRenderer
+
+    from api import fast_json
+    from api.renderers import FastJSONRenderer
+
+    rng = np.random.default_rng(7)
+    values = rng.uniform(1, 500, size=(args.symbols, 3))
+    prices = {
+        f"SYM{i:05d}": {"current_price": p, "change": c, "change_percent": pct, "status": "ok"}
+        for i, (p, c, pct) in enumerate(values)
+    }
+    print(f"\nprices: {args.symbols} symbols, {fast_json.orjson and 'orjson' or 'stdlib json'} fast path\n")
+    print(f"{'renderer':<18} {'ms':>8} {'bytes':>9}")
+    for name, renderer in (("JSONRenderer", JSONRenderer()), ("FastJSONRenderer", FastJSONRenderer())):
+        body = renderer.render(prices)
+        print(f"{name:<18} {_median_ms(lambda: renderer.render(prices), args.repeat):8.3f} {len(body):9d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sectors", type=int, default=5, help="number of biggest sectors to render")
+    parser.add_argument("--scale", type=int, default=1, help="tile the universe this many times")
+    parser.add_argument("--fields", default="symbol,name", help="fields projected in the stream test")
+    parser.add_argument("--symbols", type=int, default=2000, help="symbols in the prices body")
+    parser.add_argument("--repeat", type=int, default=50, help="runs per measurement (median reported)")
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    bench_sectors(args)
+    bench_stream(args)
+    bench_prices(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark the local search index on the full all_companies.csv.
+
+Run from finance_backend/:
+    python benchmarks/bench_search.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from api.search_index import SearchIndex  # noqa: E402
+from api.views import _load_universe  # noqa: E402
+
+# Keystroke sequences as the dashboard sends them, plus a few typos
+QUERIES = [
+    "a", "ap", "app", "appl", "apple",
+    "m", "mi", "mic", "micro", "microsoft",
+    "n", "nv", "nvd", "nvda",
+    "bank", "bank of", "therapeutics", "acquisition corp",
+    "aple", "microsfot", "nvdia", "tesal",
+    "zzzz",
+]
+REPEAT = 200
+
+
+def main():
+    universe = _load_universe()
+
+    started = time.perf_counter()
+    index = SearchIndex(universe.columns["symbol"], universe.columns["name"], universe.columns["exchange"])
+    build = time.perf_counter() - started
+    print(f"{len(universe)} companies, index built in {build * 1000:.1f} ms\n")
+
+    print(f"{'query':<20} {'median us':>10} {'max us':>10}  top results")
+    all_times = []
+    for query in QUERIES:
+        times = []
+        for _ in range(REPEAT):
+            t0 = time.perf_counter()
+            results = index.search(query)
+            times.append(time.perf_counter() - t0)
+        all_times.extend(times)
+        top = ", ".join(r["symbol"] for r in results[:4])
+        print(f"{query:<20} {statistics.median(times) * 1e6:10.1f} {max(times) * 1e6:10.1f}  {top}")
+
+    all_times.sort()
+    print(f"\noverall p50 {all_times[len(all_times) // 2] * 1e6:.1f} us, "
+          f"p99 {all_times[int(len(all_times) * 0.99)] * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
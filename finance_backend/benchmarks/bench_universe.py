@@ -0,0 +1,66 @@
+"""
+Micro-benchmark: per-request sector lookups with the old per-request pandas
+filtering vs the precomputed CompanyUniverse index.
+
+Run from finance_backend/:
+    python benchmarks/bench_universe.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from api.universe import read_companies_csv  # noqa: E402
+from api.views import CSV_PATH, _load_universe  # noqa: E402
+
+REPEAT = 200
+
+
+def pandas_sector(df, sector):
+    mask = df['sector'].astype(str).str.strip().str.lower() == sector.lower()
+    return df[mask][["symbol", "name", "exchange", "sector"]].to_dict(orient="records")
+
+
+def pandas_sample(df, sector, n=10):
+    mask = df['sector'].astype(str).str.strip().str.lower() == sector.lower()
+    filtered = df[mask]
+    return [row for _, row in filtered.sample(n=min(n, len(filtered))).iterrows()]
+
+
+def pandas_sectors(df):
+    return sorted(set([s.strip() for s in df['sector'].astype(str).tolist() if s and s.strip() and s.strip().lower() != "unknown"]))
+
+
+def bench(label, fn):
+    per_call = min(timeit.repeat(fn, number=REPEAT, repeat=3)) / REPEAT
+    print(f"  {label:<32} {per_call * 1e6:10.1f} us")
+    return per_call
+
+
+def main():
+    df = read_companies_csv(CSV_PATH)
+    universe = _load_universe()
+    biggest = max(universe.sectors, key=lambda s: len(universe.companies_in_sector(s)))
+    print(f"{len(universe)} companies, {len(universe.sectors)} sectors, biggest sector: "
+          f"{biggest} ({len(universe.companies_in_sector(biggest))} rows)\n")
+
+    cases = [
+        ("companies-fast", lambda: pandas_sector(df, biggest), lambda: universe.companies_in_sector(biggest)),
+        ("random sample (n=10)", lambda: pandas_sample(df, biggest), lambda: universe.sample_sector(biggest, 10)),
+        ("sectors", lambda: pandas_sectors(df), lambda: universe.sectors),
+    ]
+    for name, before, after in cases:
+        print(name)
+        t_before = bench("before (pandas per request)", before)
+        t_after = bench("after (CompanyUniverse)", after)
+        print(f"  speedup: {t_before / t_after:.0f}x\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compare loading the company universe from all_companies.csv vs the
+memory-mapped columnar file: load time and per-worker memory.
+
+Each measurement runs in a fresh process (like a new gunicorn worker) and
+reports the memory added by the load, split into private pages (duplicated in
+every worker) and shared file-backed pages (shared through the page cache).
+The totals include the search index, built in every worker on its first
+search; its build time and memory are also shown on their own.
+
+Run from finance_backend/:
+    python manage.py build_universe
+    python benchmarks/bench_universe_format.py
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CSV_PATH = os.path.join(BACKEND_DIR, "all_companies.csv")
+RUNS = 5
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {backend!r})
+
+def mem():
+    # kB values from /proc; Linux only
+    out = {{}}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0].rstrip(":") in ("Rss", "Private_Clean", "Private_Dirty", "Shared_Clean", "Shared_Dirty"):
+                out[parts[0].rstrip(":")] = int(parts[1])
+    return out
+
+import numpy, pandas  # noqa: F401  (both paths pay for these imports anyway)
+from api.universe import CompanyUniverse, read_companies_csv
+
+before = mem()
+started = time.perf_counter()
+if {mode!r} == "csv":
+    universe = CompanyUniverse.from_dataframe(read_companies_csv({path!r}))
+else:
+    universe = CompanyUniverse.from_columnar({path!r})
+# Touch every record so lazily mapped pages are counted too
+for i in range(len(universe)):
+    universe.record(i)
+elapsed = time.perf_counter() - started
+loaded = mem()
+started = time.perf_counter()
+universe.search_index
+index_seconds = time.perf_counter() - started
+after = mem()
+print(json.dumps({{"seconds": elapsed, "index_seconds": index_seconds, "before": before, "loaded": loaded, "after": after}}))
+"""
+
+
+def measure(mode, path):
+    results = []
+    for _ in range(RUNS):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD.format(backend=BACKEND_DIR, mode=mode, path=path)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(out))
+    best = min(results, key=lambda r: r["seconds"])
+
+    def delta(key, start="before"):
+        return best["after"].get(key, 0) - best[start].get(key, 0)
+
+    return {
+        "load_ms": best["seconds"] * 1000,
+        "index_ms": best["index_seconds"] * 1000,
+        "index_kb": delta("Rss", "loaded"),
+        "rss_kb": delta("Rss"),
+        "private_kb": delta("Private_Clean") + delta("Private_Dirty"),
+        "shared_kb": delta("Shared_Clean") + delta("Shared_Dirty"),
+    }
+
+
+def main():
+    from api.universe import read_companies_csv, write_universe_columnar
+
+    with tempfile.TemporaryDirectory() as tmp:
+        columnar_path = os.path.join(tmp, "all_companies.bin")
+        write_universe_columnar(read_companies_csv(CSV_PATH), columnar_path)
+        print(f"CSV {os.path.getsize(CSV_PATH) / 1024:.0f} kB, "
+              f"columnar {os.path.getsize(columnar_path) / 1024:.0f} kB\n")
+
+        print(f"{'source':<10} {'load ms':>8} {'RSS +kB':>8} {'private +kB':>12} {'shared +kB':>11} "
+              f"{'index ms':>9} {'index +kB':>10}")
+        for mode, path in (("csv", CSV_PATH), ("columnar", columnar_path)):
+            r = measure(mode, path)
+            print(f"{mode:<10} {r['load_ms']:8.1f} {r['rss_kb']:8d} {r['private_kb']:12d} {r['shared_kb']:11d} "
+                  f"{r['index_ms']:9.1f} {r['index_kb']:10d}")
+
+
+if __name__ == "__main__":
+    main()
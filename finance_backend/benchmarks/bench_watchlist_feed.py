@@ -0,0 +1,111 @@
+"""
+Cost of the dashboard's 10 s /api/watchlists/ poll: the full serializer
+payload as it was before versioning, the versioned feed in full, a 304
+revalidation with If-None-Match, and a ?since= delta after a few quotes
+moved.
+
+Seeds one user with --watchlists x --items items, warms the price tier
+with one prefetch cycle, then times each variant (median of --repeat).
+
+Run from finance_backend/:
+    python benchmarks/bench_watchlist_feed.py [--watchlists 5] [--items 50] [--changed 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.test import Client  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from api import prefetch, price_engine  # noqa: E402
+from api.models import Watchlist, WatchlistItem  # noqa: E402
+from api.serializers import WatchlistSerializer  # noqa: E402
+from api.views import _load_universe  # noqa: E402
+
+
+def _time(fn, repeat):
+    timings, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--watchlists", type=int, default=5)
+    parser.add_argument("--items", type=int, default=50, help="items per watchlist")
+    parser.add_argument("--changed", type=int, default=5, help="quotes moved before the delta poll")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    call_command("migrate", verbosity=0, interactive=False)
+    User.objects.filter(username="bench-feed@example.com").delete()
+    user = User.objects.create_user(username="bench-feed@example.com", password="bench")
+    records = list(_load_universe().records)
+    for w in range(args.watchlists):
+        watchlist = Watchlist.objects.create(user=user, name=f"Watchlist {w}")
+        WatchlistItem.objects.bulk_create([
+            WatchlistItem(watchlist=watchlist, symbol=r["symbol"], name=r["name"], exchange=r["exchange"])
+            for r in records[w * args.items:(w + 1) * args.items]
+        ])
+    prefetch.prefetch_once()
+
+    auth = {"Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+    client = Client(headers=auth)
+    first = client.get("/api/watchlists/")
+    etag = first["ETag"]
+    version = etag.strip('"')
+
+    def serializer_payload():
+        watchlists = Watchlist.objects.filter(user=user).prefetch_related("items")
+        return len(JSONRenderer().render(WatchlistSerializer(watchlists, many=True).data))
+
+    def full():
+        return len(client.get("/api/watchlists/").content)
+
+    def revalidate():
+        response = client.get("/api/watchlists/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        return len(response.content)
+
+    def delta():
+        return len(client.get(f"/api/watchlists/?since={version}").content)
+
+    def move_quotes():
+        symbols = WatchlistItem.objects.filter(watchlist__user=user).values_list("symbol", flat=True)
+        price_engine._PRICES.set_many({
+            symbol: {"current_price": 1.0 + i, "change": 0.0, "change_percent": 0.0, "status": "ok"}
+            for i, symbol in enumerate(symbols[:args.changed])
+        })
+
+    print(f"{args.watchlists} watchlists x {args.items} items, median of {args.repeat} polls\n")
+    print(f"{'poll':<36} {'ms':>8} {'bytes':>8}")
+    for label, fn in [
+        ("serializer payload (before, no HTTP)", serializer_payload),
+        ("feed, full", full),
+        ("feed, If-None-Match -> 304", revalidate),
+        (f"feed, ?since= ({args.changed} quotes moved)", delta),
+    ]:
+        if fn is delta:
+            move_quotes()
+        ms, size = _time(fn, args.repeat)
+        print(f"{label:<36} {ms:8.2f} {size:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Query plans and timings of the hot WatchlistItem queries on a large seeded
+dataset, with the schema before and after the (watchlist, symbol) unique
+constraint and symbol index (migration 0005).
+
+Each schema runs in its own process against its own database, migrated to
+that point and seeded with --users x --watchlists x --items rows. For each
+query the plan (QuerySet.explain()) and the median of --repeat runs are
+reported:
+
+- watchlist_items:   items of one user's watchlists (the get_watchlists prefetch)
+- item_lookup:       one (watchlist, symbol) row (add_to_watchlist's get_or_create)
+- user_symbols:      every symbol a user watches (the watchlist stream)
+- distinct_symbols:  distinct symbols across all watchlists (price polling)
+- add_random:        add_random_companies' writes, rolled back: symbol
+                     pre-read + insert before, insert relying on the
+                     constraint after
+
+Run from finance_backend/:
+    python benchmarks/bench_watchlist_queries.py [--users 2000] [--watchlists 3] [--items 50]
+Set BENCH_DB=postgres to run against a local Postgres (see benchmarks/settings.py).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMAS = {"before": "0004_companyprofile", "after": "0005_watchlistitem_unique_symbol"}
+
+
+def _median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def run_schema(schema, users, watchlists, items, repeat):
+    if os.environ.get("BENCH_DB") == "postgres":
+        os.environ["BENCH_DB_NAME"] = f"finance_bench_{schema}"
+    else:
+        path = os.path.join(tempfile.gettempdir(), f"finance_bench_queries_{schema}.sqlite3")
+        if os.path.exists(path):
+            os.remove(path)
+        os.environ["BENCH_SQLITE_PATH"] = path
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    import django
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import transaction
+
+    from api.models import Watchlist, WatchlistItem
+    from api.views import _load_universe
+
+    call_command("migrate", "api", SCHEMAS[schema], verbosity=0, interactive=False)
+    call_command("migrate", "auth", verbosity=0, interactive=False)
+
+    # Seed
+    rng = random.Random(7)
+    records = list(_load_universe().records)
+    seed_started = time.perf_counter()
+    User.objects.filter(username__startswith="bench-q-").delete()
+    User.objects.bulk_create(
+        [User(username=f"bench-q-{u}", password="!") for u in range(users)], batch_size=5000,
+    )
+    user_ids = list(User.objects.filter(username__startswith="bench-q-").values_list("id", flat=True))
+    Watchlist.objects.bulk_create(
+        [Watchlist(user_id=uid, name=f"Watchlist {w}") for uid in user_ids for w in range(watchlists)],
+        batch_size=5000,
+    )
+    rows = []
+    for watchlist_id in Watchlist.objects.filter(user_id__in=user_ids).values_list("id", flat=True).iterator():
+        rows.extend(
+            WatchlistItem(watchlist_id=watchlist_id, symbol=r["symbol"], name=r["name"], exchange=r["exchange"])
+            for r in rng.sample(records, items)
+        )
+        if len(rows) >= 20000:
+            WatchlistItem.objects.bulk_create(rows, batch_size=5000)
+            rows = []
+    WatchlistItem.objects.bulk_create(rows, batch_size=5000)
+    seed_seconds = time.perf_counter() - seed_started
+
+    user = User.objects.get(username=f"bench-q-{users // 2}")
+    user_watchlists = list(Watchlist.objects.filter(user=user).values_list("id", flat=True))
+    watchlist_id = user_watchlists[0]
+    symbol = WatchlistItem.objects.filter(watchlist_id=watchlist_id).values_list("symbol", flat=True).first()
+    new_rows = rng.sample(records, 10)
+
+    def add_random():
+        with transaction.atomic():
+            sample = new_rows
+            if schema == "before":
+                existing = set(WatchlistItem.objects.filter(watchlist_id=watchlist_id).values_list("symbol", flat=True))
+                sample = [r for r in new_rows if r["symbol"] not in existing]
+            WatchlistItem.objects.bulk_create([
+                WatchlistItem(watchlist_id=watchlist_id, symbol=r["symbol"], name=r["name"], exchange=r["exchange"])
+                for r in sample
+            ], ignore_conflicts=True)
+            transaction.set_rollback(True)
+
+    queries = {
+        "watchlist_items": WatchlistItem.objects.filter(watchlist_id__in=user_watchlists),
+        "item_lookup": WatchlistItem.objects.filter(watchlist_id=watchlist_id, symbol=symbol),
+        "user_symbols": WatchlistItem.objects.filter(watchlist__user=user).values_list("symbol", flat=True),
+        "distinct_symbols": WatchlistItem.objects.values_list("symbol", flat=True).distinct(),
+    }
+    results = {}
+    for name, qs in queries.items():
+        results[name] = {
+            "plan": qs.explain(),
+            "ms": _median_ms(lambda: list(qs.all()), repeat),
+        }
+    results["add_random"] = {"plan": "", "ms": _median_ms(add_random, repeat)}
+
+    return {
+        "schema": schema,
+        "rows": WatchlistItem.objects.count(),
+        "seed_seconds": seed_seconds,
+        "queries": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--watchlists", type=int, default=3, help="watchlists per user")
+    parser.add_argument("--items", type=int, default=50, help="items per watchlist")
+    parser.add_argument("--repeat", type=int, default=50, help="runs per query (median reported)")
+    parser.add_argument("--schema", choices=SCHEMAS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.schema:
+        print(json.dumps(run_schema(args.schema, args.users, args.watchlists, args.items, args.repeat)))
+        return
+
+    runs = {}
+    for schema in SCHEMAS:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--schema", schema, "--users", str(args.users),
+             "--watchlists", str(args.watchlists), "--items", str(args.items), "--repeat", str(args.repeat)],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout
+        runs[schema] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"{runs['after']['rows']} watchlist items ({args.users} users x {args.watchlists} watchlists "
+          f"x {args.items} items), median of {args.repeat} runs\n")
+    print(f"{'query':<18} {'before ms':>10} {'after ms':>10}")
+    for name in runs["after"]["queries"]:
+        print(f"{name:<18} {runs['before']['queries'][name]['ms']:10.3f} {runs['after']['queries'][name]['ms']:10.3f}")
+    for schema in SCHEMAS:
+        print(f"\n--- plans ({schema}) ---")
+        for name, result in runs[schema]["queries"].items():
+            if result["plan"]:
+                print(f"{name}:\n  " + result["plan"].replace("\n", "\n  "))
+
+
+if __name__ == "__main__":
+    main()
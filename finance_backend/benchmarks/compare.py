@@ -0,0 +1,64 @@
+"""
+Diff two api_bench.py result files, e.g. before/after a commit:
+
+    python benchmarks/compare.py benchmarks/results/abc123-*.json benchmarks/results/def456-*.json
+
+Prints each scenario/route's p50, p95, p99, throughput, DB queries per
+request and upstream calls per request side by side with the relative change.
+"""
+import argparse
+import json
+
+METRICS = [
+    ("p50_ms", "p50 ms"),
+    ("p95_ms", "p95 ms"),
+    ("p99_ms", "p99 ms"),
+    ("throughput_rps", "req/s"),
+    ("db_queries_per_request", "db q/req"),
+]
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _change(old, new):
+    if old in (None, 0) or new is None:
+        return ""
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def _row(label, old, new):
+    old_s = "-" if old is None else f"{old:.2f}"
+    new_s = "-" if new is None else f"{new:.2f}"
+    print(f"    {label:<16} {old_s:>12} {new_s:>12} {_change(old, new):>9}")
+
+
+def compare(base, head):
+    print(f"base: {base['meta']['commit']} ({base['meta']['timestamp']})")
+    print(f"head: {head['meta']['commit']} ({head['meta']['timestamp']})")
+    for scenario in sorted(set(base["scenarios"]) | set(head["scenarios"])):
+        old = base["scenarios"].get(scenario, {})
+        new = head["scenarios"].get(scenario, {})
+        print(f"\n== {scenario} ==")
+        _row("upstream/req", old.get("upstream_calls_per_request"), new.get("upstream_calls_per_request"))
+        routes = sorted(set(old.get("routes", {})) | set(new.get("routes", {}))) + ["overall"]
+        for route in routes:
+            old_route = old.get("overall", {}) if route == "overall" else old.get("routes", {}).get(route, {})
+            new_route = new.get("overall", {}) if route == "overall" else new.get("routes", {}).get(route, {})
+            print(f"  {route}")
+            for key, label in METRICS:
+                _row(label, old_route.get(key), new_route.get(key))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    args = parser.parse_args()
+    compare(_load(args.base), _load(args.head))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Settings for the API benchmarks: the real project settings, but with a
+throwaway SQLite database (or a local Postgres when BENCH_DB=postgres) and
+the synthetic market-data provider, so runs need no network.
+"""
+import os
+import tempfile
+
+from finance_backend.settings import *  # noqa: F401,F403
+from finance_backend.settings import DATABASES as _PROJECT_DATABASES
+
+if os.environ.get("BENCH_DB") == "postgres":
+    DATABASES = {"default": dict(_PROJECT_DATABASES["default"], NAME=os.environ.get("BENCH_DB_NAME", "finance_bench"))}
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("BENCH_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "finance_bench.sqlite3")),
+        }
+    }
+
+MARKET_DATA_PROVIDER = "synthetic"
+# Simulated upstream round trip per provider call (seconds)
+MARKET_DATA_SYNTHETIC_LATENCY = float(os.environ.get("BENCH_UPSTREAM_LATENCY", "0.05"))
+
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+
+QUOTE_CACHE_TTL = float(os.environ.get("BENCH_QUOTE_CACHE_TTL", QUOTE_CACHE_TTL))  # noqa: F405
+
+# Keep synthetic quotes out of the project's shared quote store
+QUOTE_STORE = os.environ.get("QUOTE_STORE", "sqlite")
+QUOTE_STORE_PATH = os.environ.get(
+    "BENCH_QUOTE_STORE_PATH", os.path.join(tempfile.gettempdir(), "finance_bench_quotes.sqlite3")
+)
+
+# Synthetic bars go to their own history store
+HISTORY_STORE_DIR = os.environ.get(
+    "BENCH_HISTORY_STORE_DIR", os.path.join(tempfile.gettempdir(), "finance_bench_history")
+)
@@ -0,0 +1,228 @@
+"""
+Concurrency of the upstream-bound endpoints under WSGI and ASGI.
+
+Every request goes to the synthetic provider with a fixed simulated upstream
+latency (BENCH_UPSTREAM_LATENCY, default 1 s), using distinct symbols and
+queries so nothing is coalesced or cached. Each mode runs in its own process:
+
+- wsgi: sync views on a WSGI handler with --threads worker threads (like
+        gunicorn --threads); extra clients queue for a thread
+- asgi: the async views (API_ASYNC_VIEWS=1) on one event loop
+
+--clients concurrent clients each send requests back to back, cycling
+through company/<symbol>/, search-stock/ (remote fallback) and prices/.
+Reports throughput, latency percentiles (including time queued for a
+worker) and the peak number of upstream calls in flight.
+
+Run from finance_backend/:
+    python benchmarks/wsgi_vs_asgi.py [--clients 200] [--threads 8] [--requests 600]
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ["wsgi", "asgi"]
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _workload(n):
+    """
+    n (method, path, body) tuples over distinct synthetic symbols.
+    """
+    requests = []
+    for i in range(n):
+        symbol = f"ZB{i:05d}"
+        kind = i % 3
+        if kind == 0:
+            requests.append(("get", f"/api/company/{symbol}/", None))
+        elif kind == 1:
+            requests.append(("get", f"/api/search-stock/?q=zqx{i}", None))
+        else:
+            body = json.dumps({"symbols": [f"{symbol}{j}" for j in range(5)]})
+            requests.append(("post", "/api/prices/", body))
+    return requests
+
+
+class InFlightProvider:
+    """
+    Wraps a provider and tracks the peak number of concurrent calls.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def _exit(self):
+        with self._lock:
+            self.current -= 1
+
+    def _sync(self, method, *args):
+        self._enter()
+        try:
+            return getattr(self.inner, method)(*args)
+        finally:
+            self._exit()
+
+    async def _async(self, method, *args):
+        self._enter()
+        try:
+            return await getattr(self.inner, method)(*args)
+        finally:
+            self._exit()
+
+    def search(self, query, limit=10):
+        return self._sync("search", query, limit)
+
+    def info(self, symbol):
+        return self._sync("info", symbol)
+
+    def history(self, symbols, period="2d", interval="1d"):
+        return self._sync("history", symbols, period, interval)
+
+    async def asearch(self, query, limit=10):
+        return await self._async("asearch", query, limit)
+
+    async def ainfo(self, symbol):
+        return await self._async("ainfo", symbol)
+
+    async def ahistory(self, symbols, period="2d", interval="1d"):
+        return await self._async("ahistory", symbols, period, interval)
+
+
+def run_mode(mode, clients, threads, total):
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    os.environ["API_ASYNC_VIEWS"] = "1" if mode == "asgi" else "0"
+    import django
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.test import AsyncClient, Client
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api import providers
+
+    call_command("migrate", verbosity=0, interactive=False)
+    user, _ = User.objects.get_or_create(username="bench-asgi@example.com")
+    auth = f"Bearer {RefreshToken.for_user(user).access_token}"
+
+    tracker = InFlightProvider(providers.build_provider())
+    providers.set_provider(tracker)
+
+    work = _workload(total)
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def record(started, code):
+        with lock:
+            latencies.append(time.perf_counter() - started)
+            statuses[code] = statuses.get(code, 0) + 1
+
+    started = time.perf_counter()
+    if mode == "wsgi":
+        # The worker's threads; requests beyond that wait in FIFO order
+        workers = ThreadPoolExecutor(max_workers=threads)
+        local = threading.local()
+        queue = iter(work)
+
+        def handle(method, path, body):
+            if not hasattr(local, "client"):
+                local.client = Client(headers={"Authorization": auth})
+            kwargs = {"data": body, "content_type": "application/json"} if body else {}
+            return getattr(local.client, method)(path, **kwargs)
+
+        def client_loop():
+            while True:
+                with lock:
+                    item = next(queue, None)
+                if item is None:
+                    return
+                t0 = time.perf_counter()
+                response = workers.submit(handle, *item).result()
+                record(t0, response.status_code)
+
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            for _ in range(clients):
+                pool.submit(client_loop)
+        workers.shutdown()
+    else:
+        async def main():
+            queue = iter(work)
+            # Default headers on AsyncClient come out as HTTP_HTTP_*; pass them per request
+            client = AsyncClient()
+
+            async def client_loop():
+                for method, path, body in queue:
+                    t0 = time.perf_counter()
+                    kwargs = {"data": body, "content_type": "application/json"} if body else {}
+                    response = await getattr(client, method)(path, headers={"Authorization": auth}, **kwargs)
+                    record(t0, response.status_code)
+
+            await asyncio.gather(*(client_loop() for _ in range(clients)))
+
+        asyncio.run(main())
+    wall = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "statuses": statuses,
+        "wall_seconds": wall,
+        "throughput_rps": len(latencies) / wall,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "peak_upstream_in_flight": tracker.peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="concurrent clients")
+    parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads")
+    parser.add_argument("--requests", type=int, default=600, help="requests per mode")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.clients, args.threads, args.requests)))
+        return
+
+    latency = os.environ.setdefault("BENCH_UPSTREAM_LATENCY", "1.0")
+    print(f"{args.requests} requests, {args.clients} clients, {args.threads} WSGI threads, "
+          f"{float(latency) * 1000:.0f} ms simulated upstream latency\n")
+    print(f"{'mode':<10} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak in flight':>15}  statuses")
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--mode", mode, "--clients", str(args.clients),
+             "--threads", str(args.threads), "--requests", str(args.requests)],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:<10} {r['throughput_rps']:8.1f} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} "
+              f"{r['p99_ms']:9.1f} {r['peak_upstream_in_flight']:15d}  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,13 @@ ASGI config for financebackend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve with an ASGI server (e.g. ``uvicorn finance_backend.asgi:application``)
+to enable the live price stream at /api/watchlists/stream/. Set
+API_ASYNC_VIEWS=1 as well to serve the upstream-bound endpoints with their
+async views:
+
+    API_ASYNC_VIEWS=1 uvicorn finance_backend.asgi:application --port 5000
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -11,6 +18,11 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'financebackend.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_backend.settings')
 
 application = get_asgi_application()
+
+# After setup: the in-process quote prefetcher, if enabled
+from api import prefetch  # noqa: E402
+
+prefetch.start_for_server()
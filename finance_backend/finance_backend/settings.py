@@ -2,6 +2,8 @@
 import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 STATIC_URL = '/static/'
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -31,11 +33,18 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    # orjson-backed JSON (numpy values, NaN as null); see api/fast_json.py
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",      # must be near top
+    'api.middleware.PerfMiddleware',              # timings for /api/metrics/
+    'api.middleware.CompressionMiddleware',       # gzip / brotli for large bodies
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,3 +94,127 @@ TEMPLATES = [
     },
 ]
 
+
+# Quote cache used by the watchlist serializers (seconds / number of symbols)
+QUOTE_CACHE_TTL = 30
+QUOTE_CACHE_MAX_SIZE = 2048
+# Seconds an empty quote (unknown symbol or failed lookup) is reused before retrying
+QUOTE_CACHE_NEGATIVE_TTL = 5
+
+# Batched price engine behind /api/prices/
+PRICE_ENGINE_CHUNK_SIZE = 50     # symbols per multi-ticker download
+PRICE_ENGINE_MAX_WORKERS = 4     # concurrent downloads per process
+PRICE_ENGINE_DEADLINE = 8.0      # seconds before partial results are returned
+
+# Seconds between upstream polls per symbol for /api/watchlists/stream/
+PRICE_STREAM_INTERVAL = 10.0
+
+# search-stock answers from the local company index; Yahoo is only queried
+# when fewer than SEARCH_LOCAL_MIN_RESULTS local matches are found
+SEARCH_LOCAL_MIN_RESULTS = 3
+SEARCH_REMOTE_FALLBACK = True
+
+# How often (seconds) to stat all_companies.csv for changes
+UNIVERSE_CHECK_INTERVAL = 5.0
+
+# Market data backend: "yahoo", "synthetic" (offline, deterministic),
+# "replay" (recorded responses only) or "record" (yahoo + save responses)
+MARKET_DATA_PROVIDER = os.environ.get("MARKET_DATA_PROVIDER", "yahoo")
+MARKET_DATA_REPLAY_DIR = BASE_DIR / "market_data_recordings"
+MARKET_DATA_SYNTHETIC_LATENCY = 0.0   # seconds slept per synthetic call
+
+# Per-request profiling (api.middleware.PerfMiddleware): this fraction of
+# requests runs under cProfile; dumps of those slower than
+# PERF_PROFILE_MIN_SECONDS are written to PERF_PROFILE_DIR. 0 disables it.
+PERF_PROFILE_SAMPLE_RATE = float(os.environ.get("PERF_PROFILE_SAMPLE_RATE", "0"))
+PERF_PROFILE_MIN_SECONDS = 1.0
+PERF_PROFILE_DIR = BASE_DIR / "profiles"
+
+# /api/metrics/ answers 403 unless the scraper sends "Authorization: Bearer
+# <METRICS_TOKEN>", connects from one of METRICS_ALLOWED_IPS, or (with
+# METRICS_ALLOW_STAFF) sends a staff user's JWT. All off by default.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get("METRICS_ALLOWED_IPS", "").split(",") if ip.strip()]
+METRICS_ALLOW_STAFF = False
+
+# Serve search-stock/, company/<symbol>/ and prices/ with async views that
+# keep upstream calls on the event loop. Enable when running under uvicorn
+# (see asgi.py); under WSGI each async view would get its own event loop.
+API_ASYNC_VIEWS = os.environ.get("API_ASYNC_VIEWS", "0") == "1"
+UPSTREAM_ASYNC_MAX_CONNECTIONS = 100   # pooled connections per event loop
+
+# Shared upstream HTTP session (api/http_client.py): keep-alive pool size
+# (connections per host), retries with jittered exponential backoff on
+# connection errors / 429 / 5xx, and the default (connect, read) timeout
+UPSTREAM_HTTP_POOL_SIZE = 32
+UPSTREAM_HTTP_RETRIES = 2
+UPSTREAM_HTTP_BACKOFF = 0.3          # seconds; doubles per retry
+UPSTREAM_HTTP_BACKOFF_JITTER = 0.2   # up to this many random seconds added
+UPSTREAM_HTTP_TIMEOUT = (3.05, 10)
+
+# Circuit breaker around the market-data provider (api/circuit_breaker.py):
+# after this many consecutive failures calls fail fast for the reset timeout,
+# then a single probe is let through. While it is open, or when a call fails,
+# responses fall back to cached values up to UPSTREAM_STALE_MAX_AGE old,
+# flagged with "stale": true and their "age" in seconds.
+UPSTREAM_BREAKER_FAILURES = 5
+UPSTREAM_BREAKER_RESET_TIMEOUT = 30.0   # seconds
+UPSTREAM_STALE_MAX_AGE = 6 * 3600       # seconds
+
+# company/<symbol>/ cache (api/company_cache.py): profile fields live in the
+# CompanyProfile table, prices in process; expired entries are served while
+# a background refresh runs
+COMPANY_PROFILE_TTL = 7 * 24 * 3600   # seconds
+COMPANY_PRICE_TTL = 15                # seconds
+
+# Quote store shared by all worker processes (api/quote_store.py): "sqlite"
+# (a WAL-mode file on this host) or "none" (per-process caches only)
+QUOTE_STORE = os.environ.get("QUOTE_STORE", "sqlite")
+QUOTE_STORE_PATH = BASE_DIR / "quote_store.sqlite3"
+
+# Background quote prefetcher (api/prefetch.py): refreshes the prices of
+# every watchlisted symbol into the shared quote store. Run it with
+# `manage.py prefetch_quotes`, or set QUOTE_PREFETCH_IN_PROCESS=1 to run it
+# inside each server process instead.
+QUOTE_PREFETCH_IN_PROCESS = os.environ.get("QUOTE_PREFETCH_IN_PROCESS", "0") == "1"
+QUOTE_PREFETCH_INTERVAL = 15.0          # seconds between cycles, market open
+QUOTE_PREFETCH_CLOSED_INTERVAL = 600.0  # seconds between cycles, market closed
+QUOTE_PREFETCH_BATCH_SIZE = 200         # symbols per price-engine call
+QUOTE_PREFETCH_MARKET_TZ = "America/New_York"
+QUOTE_PREFETCH_MARKET_OPEN = "09:30"
+QUOTE_PREFETCH_MARKET_CLOSE = "16:00"
+
+# GET /api/watchlists/ feed versions (api/watchlist_feed.py): how long a
+# version stays usable as ?since= before the full feed is sent instead
+WATCHLIST_FEED_SNAPSHOT_MAX_AGE = 600   # seconds
+
+# The dashboard revalidates its watchlist poll with If-None-Match and reads
+# the ETag of the response; streamed company listings carry their next
+# page's cursor in X-Next-Cursor
+CORS_ALLOW_HEADERS = (*default_headers, "if-none-match")
+CORS_EXPOSE_HEADERS = ["ETag", "X-Next-Cursor"]
+
+# Response compression (api.middleware.CompressionMiddleware): JSON and text
+# bodies of at least this many bytes are sent brotli- (if the brotli package
+# is installed) or gzip-encoded, as the client accepts
+RESPONSE_COMPRESS_MIN_SIZE = 1024   # bytes
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_BROTLI_QUALITY = 5         # 0-11; higher levels cost too much per request
+
+# Paging of /api/sectors/<name>/companies-fast/ (?limit=&cursor=)
+COMPANIES_PAGE_SIZE = 100   # records per page when ?limit= isn't given
+COMPANIES_PAGE_MAX = 1000
+
+# GET /api/watchlists/<id>/analytics/ (api/analytics.py)
+ANALYTICS_DEFAULT_WINDOW = "1y"       # 1mo, 3mo, 6mo, 1y, 2y or 5y
+ANALYTICS_BENCHMARK = "SPY"           # beta is measured against this ticker
+ANALYTICS_INTRADAY_MAX_AGE = 300      # seconds a result is reused while the market is open
+ANALYTICS_CACHE_TTL = 24 * 3600       # seconds
+
+# Local OHLCV history (api/history_store.py): one append-only bar file per
+# symbol and interval, so prices, charts and analytics only download the
+# bars not stored yet. Daily bars are stored once their session has been
+# closed for HISTORY_STORE_SETTLE seconds.
+HISTORY_STORE_ENABLED = os.environ.get("HISTORY_STORE_ENABLED", "1") == "1"
+HISTORY_STORE_DIR = BASE_DIR / "history"
+HISTORY_STORE_SETTLE = 1800   # seconds
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'financebackend.settings')
 
 application = get_wsgi_application()
+
+# After setup: the in-process quote prefetcher, if enabled
+from api import prefetch  # noqa: E402
+
+prefetch.start_for_server()
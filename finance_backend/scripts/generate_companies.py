@@ -1,6 +1,15 @@
+import argparse
+from datetime import timedelta
+import json
+import os
+import sys
+
 import pandas as pd
-import yfinance as yf
-from tqdm import tqdm
+
+# Allow `python scripts/generate_companies.py` from finance_backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.universe_builder import UniverseBuilder, YahooInfoFetcher  # noqa: E402
 
 # URLs for ticker lists
 NASDAQ_URL = "ftp://ftp.nasdaqtrader.com/symboldirectory/nasdaqlisted.txt"
@@ -17,40 +26,63 @@ def fetch_all_tickers():
     other_df = other_df[other_df['Test Issue'] == 'N']
     other_tickers = other_df['ACT Symbol'].tolist()
 
-    all_tickers = list(set(nasdaq_tickers + other_tickers))
+    all_tickers = sorted(set(nasdaq_tickers + other_tickers))
     print(f"✅ Total tickers fetched: {len(all_tickers)}")
     return all_tickers
 
-def fetch_ticker_data(tickers, output_path="all_companies.csv"):
-    data = []
-
-    for symbol in tqdm(tickers, desc="Fetching data from Yahoo Finance"):
-        try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-
-            # Fetch current price and day's change
-            price = info.get("regularMarketPrice")
-            change = info.get("regularMarketChange")
-            percent_change = info.get("regularMarketChangePercent")
-
-            data.append({
-                "symbol": symbol,
-                "name": info.get("shortName", "N/A"),
-                "exchange": info.get("exchange", "UNKNOWN"),
-                "sector": info.get("sector", "Unknown"),
-                "industry": info.get("industry", "Unknown"),
-                "price": price,
-                "daily_change": change,
-                "daily_change_percent": percent_change
-            })
-        except Exception as e:
-            print(f"⚠️ Skipping {symbol}: {e}")
-
-    df_out = pd.DataFrame(data)
-    df_out.to_csv(output_path, index=False)
-    print(f"\n📁 CSV saved to {output_path}")
+def fetch_ticker_data(tickers, output_path="all_companies.csv", workers=8, rate=5.0, checkpoint_path=None):
+    """
+    Fetch metadata for every ticker concurrently and write output_path.
+    Progress is checkpointed to checkpoint_path (default: <output>.checkpoint.jsonl),
+    so rerunning after an interruption only fetches the remaining tickers.
+    """
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint.jsonl"
+    builder = UniverseBuilder(YahooInfoFetcher(), max_workers=workers, rate=rate, checkpoint_path=checkpoint_path)
+    records = builder.build(tickers, output_path)
+
+    print(f"\n📁 CSV saved to {output_path} ({len(records)} companies)")
+    if builder.stats["resumed"]:
+        print(f"↩️  Resumed {builder.stats['resumed']} tickers from {checkpoint_path}")
+    if builder.stats["failed"]:
+        print(f"⚠️ {builder.stats['failed']} tickers failed; rerun to retry them")
+
+def refresh_ticker_data(tickers, output_path="all_companies.csv", max_age_days=30, changelog_path=None,
+                        workers=8, rate=5.0, checkpoint_path=None):
+    """
+    Incremental refresh of an existing output_path: fetch only new tickers and
+    rows older than max_age_days, drop delisted tickers, and write a changelog
+    (default: <output>.changelog.json).
+    """
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint.jsonl"
+    changelog_path = changelog_path or output_path + ".changelog.json"
+    builder = UniverseBuilder(YahooInfoFetcher(), max_workers=workers, rate=rate, checkpoint_path=checkpoint_path)
+    changelog = builder.refresh(
+        tickers, output_path, output_path,
+        max_age=timedelta(days=max_age_days), changelog_path=changelog_path,
+    )
+
+    print(f"\n📁 CSV saved to {output_path} ({changelog['written']} companies)")
+    print(f"➕ {len(changelog['added'])} added, ➖ {len(changelog['removed'])} removed, "
+          f"🔄 {len(changelog['refreshed'])} refreshed, ✏️ {len(changelog['changed'])} changed")
+    print(f"🌐 {changelog['upstream_calls']} upstream calls; changelog at {changelog_path}")
+    if changelog["failed"]:
+        print(f"⚠️ {len(changelog['failed'])} tickers failed: {json.dumps(changelog['failed'][:20])}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build all_companies.csv from NASDAQ listings + Yahoo Finance")
+    parser.add_argument("--output", default="all_companies.csv")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent fetches")
+    parser.add_argument("--rate", type=float, default=5.0, help="max requests per second per host")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default: <output>.checkpoint.jsonl)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only fetch new tickers and rows older than --max-age-days, drop delisted ones")
+    parser.add_argument("--max-age-days", type=float, default=30, help="refetch rows older than this (incremental)")
+    parser.add_argument("--changelog", default=None, help="changelog file (default: <output>.changelog.json)")
+    args = parser.parse_args()
+
     tickers = fetch_all_tickers()
-    fetch_ticker_data(tickers)
+    if args.incremental and os.path.exists(args.output):
+        refresh_ticker_data(tickers, args.output, max_age_days=args.max_age_days, changelog_path=args.changelog,
+                            workers=args.workers, rate=args.rate, checkpoint_path=args.checkpoint)
+    else:
+        fetch_ticker_data(tickers, args.output, workers=args.workers, rate=args.rate, checkpoint_path=args.checkpoint)
@@ -1,5 +1,5 @@
 // src/Dashboard.js
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import {
   FiTrendingUp,
@@ -14,6 +14,8 @@ import {
 } from "react-icons/fi";
 import "./Dashboard.css";
 
+const SECTOR_PAGE_SIZE = 200; // companies per companies-fast page (and per prices request)
+
 export default function Dashboard() {
   const navigate = useNavigate();
   const token = localStorage.getItem("token");
@@ -40,6 +42,8 @@ export default function Dashboard() {
   const [sectorCompanies, setSectorCompanies] = useState([]);
   const [loadingSectorCompanies, setLoadingSectorCompanies] = useState(false);
   const [selectedCompanies, setSelectedCompanies] = useState([]); // Selected companies in modal
+  const watchlistsEtag = useRef(null); // ETag of the last /api/watchlists/ response rendered
+  const sectorLoad = useRef(0); // bumped per sector load, so a stale load stops paging
 
   // Redirect if not logged in
   useEffect(() => {
@@ -53,19 +57,61 @@ export default function Dashboard() {
     fetchSectors();
   }, []);
 
-  // Auto-refresh watchlists
+  // Distinct symbols across all watchlists; the price stream is re-opened when this changes
+  const watchedSymbols = [
+    ...new Set(watchlists.flatMap((wl) => wl.items.map((item) => item.symbol))),
+  ].sort().join(",");
+
+  // Live prices: stream only price changes, fall back to polling if the stream is unavailable
   useEffect(() => {
-    const interval = setInterval(() => {
-      fetchWatchlists();
-    }, 10000);
-    return () => clearInterval(interval);
-  }, []);
+    if (!token || !watchedSymbols) return;
+    let interval = null;
+    const source = new EventSource(
+      `http://localhost:5000/api/watchlists/stream/?token=${encodeURIComponent(token)}`
+    );
+    source.addEventListener("price", (e) => {
+      const quote = JSON.parse(e.data);
+      setWatchlists((prev) =>
+        prev.map((wl) => ({
+          ...wl,
+          items: wl.items.map((item) =>
+            item.symbol === quote.symbol
+              ? {
+                  ...item,
+                  current_price: quote.current_price,
+                  change: quote.change,
+                  change_percent: quote.change_percent,
+                }
+              : item
+          ),
+        }))
+      );
+    });
+    source.onerror = () => {
+      source.close();
+      if (!interval) {
+        interval = setInterval(() => {
+          fetchWatchlists();
+        }, 10000);
+      }
+    };
+    return () => {
+      source.close();
+      if (interval) clearInterval(interval);
+    };
+  }, [token, watchedSymbols]);
 
   const fetchWatchlists = async () => {
     try {
+      const headers = { Authorization: `Bearer ${token}` };
+      // Revalidate against the last version we rendered; 304 means nothing changed
+      if (watchlistsEtag.current) headers["If-None-Match"] = watchlistsEtag.current;
       const res = await fetch("http://localhost:5000/api/watchlists/", {
-        headers: { Authorization: `Bearer ${token}` },
+        headers,
+        cache: "no-store",
       });
+      if (res.status === 304) return;
+      watchlistsEtag.current = res.ok ? res.headers.get("ETag") : null;
       const data = await res.json();
       if (Array.isArray(data)) {
         setWatchlists(data.map((wl) => ({ ...wl, items: wl.items || [] })));
@@ -120,22 +166,32 @@ export default function Dashboard() {
     // ✅ Open modal immediately (spinner will show)
     setSectorModalOpen(true);
 
+    const load = ++sectorLoad.current;
+    setSectorCompanies([]);
+    setSelectedCompanies([]); // reset selection
+
     try {
-      const res = await fetch(`http://localhost:5000/api/sectors/${encodeURIComponent(selectedSector)}/companies-fast/`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      const data = await res.json();
-      if (Array.isArray(data)) {
-        setSectorCompanies(data);          // no prices yet
-        fetchLivePrices(data.map((c) => c.symbol)); // fetch prices separately
-      } else {
-        setSectorCompanies([]);
-      }
-      setSelectedCompanies([]); // reset selection
+      // Page through the sector; each page is shown as soon as it arrives
+      // and gets its own prices request
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ limit: SECTOR_PAGE_SIZE, fields: "symbol,name,exchange" });
+        if (cursor) params.set("cursor", cursor);
+        const res = await fetch(
+          `http://localhost:5000/api/sectors/${encodeURIComponent(selectedSector)}/companies-fast/?${params}`,
+          { headers: { Authorization: `Bearer ${token}` } }
+        );
+        const data = await res.json();
+        if (load !== sectorLoad.current || !Array.isArray(data.results)) break;
+        setSectorCompanies((prev) => [...prev, ...data.results]); // no prices yet
+        setLoadingSectorCompanies(false);
+        fetchLivePrices(data.results.map((c) => c.symbol)); // fetch prices separately
+        cursor = data.next;
+      } while (cursor);
     } catch (err) {
       console.error(err);
     } finally {
-      setLoadingSectorCompanies(false);
+      if (load === sectorLoad.current) setLoadingSectorCompanies(false);
     }
   };
 